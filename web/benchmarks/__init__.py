@@ -0,0 +1,6 @@
+"""Performance benchmarks.
+
+Every module is runnable on its own against the configured settings::
+
+    $ python -m benchmarks.highlighting --help
+"""
@@ -0,0 +1,84 @@
+"""Requests per second and per core with each way of authenticating.
+
+    $ python -m benchmarks.authentication --number 200
+
+Times ``is_authenticated`` alone, then a whole cached GET of the user list
+through the test client, for HTTP Basic (PBKDF2 on every call), API keys
+and tokens. Each run is single threaded, so the rates are per core.
+``cold`` rates verify the credential on every call, ``warm`` ones read it
+from the credential cache as the API does after the first call.
+"""
+import argparse
+import base64
+
+from benchmarks.utils import best_of, emit, setup_django
+
+USERNAME = 'benchmark-auth'
+PASSWORD = 'benchmark@123'
+
+
+def get_user():
+    """The benchmark user, with its API key."""
+    from web.users.models import User
+
+    user, created = User.objects.get_or_create(username=USERNAME, defaults={'email': 'benchmark-auth@example.com'})
+    if created or not user.check_password(PASSWORD):
+        user.set_password(PASSWORD)
+        user.save()
+    return user
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=100, help='calls per timing')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import Client, RequestFactory
+    from tastypie.authentication import BasicAuthentication
+    from core.api.authentication import CachedApiKeyAuthentication, CredentialCache, issue_token
+
+    user = get_user()
+    basic = 'Basic ' + base64.b64encode('{0}:{1}'.format(USERNAME, PASSWORD).encode('utf-8')).decode('ascii')
+    headers = {
+        'basic': basic,
+        'api_key': 'ApiKey {0}:{1}'.format(USERNAME, user.api_key.key),
+        'token': 'Bearer ' + issue_token(user),
+    }
+
+    factory = RequestFactory()
+    cold = CachedApiKeyAuthentication(credentials=CredentialCache(local_timeout=0, shared_timeout=0))
+    warm = CachedApiKeyAuthentication()
+
+    def rate(authentication, header):
+        def call():
+            assert authentication.is_authenticated(factory.get('/', HTTP_AUTHORIZATION=header)) is True
+        call()
+        return 1.0 / best_of(call, number=args.number)
+
+    results = {
+        'is_authenticated_per_sec': {
+            'basic': rate(BasicAuthentication(), headers['basic']),
+            'api_key_cold': rate(cold, headers['api_key']),
+            'api_key_warm': rate(warm, headers['api_key']),
+            'token_cold': rate(cold, headers['token']),
+            'token_warm': rate(warm, headers['token']),
+        },
+        'requests_per_sec': {},
+    }
+
+    client = Client()
+    for name in ('basic', 'api_key', 'token'):
+        def request(header=headers[name]):
+            response = client.get('/api/v1/users/', {'limit': 1}, HTTP_AUTHORIZATION=header)
+            assert response.status_code == 200, response.status_code
+        request()
+        results['requests_per_sec'][name] = 1.0 / best_of(request, number=args.number)
+
+    emit('authentication', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Generate a reproducible synthetic corpus of entries for the benchmarks.
+
+    $ python -m benchmarks.corpus --size 100k --seed 1
+    $ python -m benchmarks.corpus --clear
+
+Entry ``i`` of a seed is always the same, comments included, so a corpus
+can be grown from 10k to 100k without changing the first 10k entries.
+Generated entries have a slug starting with ``bench-`` and belong to the
+``benchmark`` users.
+"""
+import argparse
+import bisect
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.utils import emit, setup_django
+
+SIZES = {'10k': 10000, '100k': 100000, '1m': 1000000}
+
+SLUG_PREFIX = 'bench-'
+AUTHORS = 20
+BATCH_SIZE = 1000
+VOCABULARY_SIZE = 20000
+
+# Words every query mix can rely on, spread through the corpus.
+COMMON_WORDS = ['django', 'search', 'haystack', 'python', 'index', 'query', 'cache', 'model', 'view', 'template']
+
+SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo', 'xa', 'zu']
+
+START_DATE = datetime(2012, 1, 1)
+
+# Most entries have no comment; the others up to MAX_COMMENTS, some of them spam.
+MAX_COMMENTS = 4
+SPAM_RATE = 0.1
+
+
+def parse_size(value):
+    """Return the number of entries of a size such as ``10k`` or ``2500``."""
+    value = value.lower()
+    if value in SIZES:
+        return SIZES[value]
+    return int(value)
+
+
+def build_vocabulary(seed):
+    """Return the words of the corpus, most frequent first."""
+    rng = random.Random(seed)
+    words = list(COMMON_WORDS)
+    seen = set(words)
+
+    while len(words) < VOCABULARY_SIZE:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+
+    return words
+
+
+class CorpusGenerator(object):
+    """Generates entry ``i`` of a seeded corpus."""
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.vocabulary = build_vocabulary(seed)
+        # Zipf-like word frequencies, as in natural text.
+        total = 0.0
+        self.cumulative = []
+        for rank in range(1, len(self.vocabulary) + 1):
+            total += 1.0 / rank
+            self.cumulative.append(total)
+
+    def words(self, rng, count):
+        """Return ``count`` words drawn from the vocabulary."""
+        total = self.cumulative[-1]
+        return [self.vocabulary[bisect.bisect_left(self.cumulative, rng.random() * total)] for _ in range(count)]
+
+    def entry_fields(self, i):
+        """Return the field values of entry ``i``."""
+        rng = random.Random('%s-%d' % (self.seed, i))
+        title = ' '.join(self.words(rng, rng.randint(3, 8))).capitalize()
+        paragraphs = [' '.join(self.words(rng, rng.randint(40, 120))) for _ in range(rng.randint(1, 6))]
+
+        return {
+            'title': title[:100],
+            'slug': '%s%d-%d' % (SLUG_PREFIX, self.seed, i),
+            'text': ''.join('<p>%s.</p>' % paragraph for paragraph in paragraphs),
+            'summary': paragraphs[0][:200],
+            'published_date': START_DATE + timedelta(minutes=rng.randint(0, 5 * 365 * 24 * 60)),
+            'author': i % AUTHORS,
+        }
+
+    def comments(self, i):
+        """Return the ``(text, is_spam)`` comments of entry ``i``."""
+        rng = random.Random('%s-%d-comments' % (self.seed, i))
+        return [
+            (' '.join(self.words(rng, rng.randint(5, 30))), rng.random() < SPAM_RATE)
+            for _ in range(max(0, rng.randint(-MAX_COMMENTS, MAX_COMMENTS)))]
+
+
+def get_authors():
+    """Return the benchmark users, creating them when needed."""
+    from web.users.models import User
+
+    authors = []
+    for number in range(AUTHORS):
+        user, _ = User.objects.get_or_create(username='benchmark%d' % number)
+        authors.append(user)
+    return authors
+
+
+def create_comments(comments):
+    """Insert ``(entry_id, text, is_spam)`` comments without sending signals.
+
+    bulk_create refuses models with a parent table, so the BaseComment rows
+    are bulk created and the Comment rows inserted with one executemany.
+    Their ids are read back as the ones above the last id, so nothing else
+    may create comments meanwhile.
+    """
+    from django.db import connection, transaction
+    from web.blog.models import BaseComment, Comment
+
+    if not comments:
+        return
+
+    quote_name = connection.ops.quote_name
+    fields = Comment._meta.local_concrete_fields
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        quote_name(Comment._meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)))
+
+    with transaction.atomic():
+        last = BaseComment.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        BaseComment.objects.bulk_create([
+            BaseComment(entry_id=entry_id, text=text, user_name='benchmark', user_url='http://example.com/')
+            for entry_id, text, _ in comments])
+        ids = BaseComment.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True)
+
+        rows = []
+        for pk, (_, _, is_spam) in zip(ids, comments):
+            comment = Comment(basecomment_ptr_id=pk, is_spam=is_spam, is_public=True)
+            rows.append([field.get_db_prep_save(getattr(comment, field.attname), connection) for field in fields])
+
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+
+def generate_corpus(size, seed=0, stream=None):
+    """Make sure the first ``size`` entries of a seeded corpus exist, return how many were created."""
+    from web.blog.models import Entry
+
+    existing = Entry.default.filter(slug__startswith='%s%d-' % (SLUG_PREFIX, seed)).count()
+    if existing >= size:
+        return 0
+
+    generator = CorpusGenerator(seed)
+    authors = get_authors()
+
+    for start in range(existing, size, BATCH_SIZE):
+        entries = []
+        for i in range(start, min(start + BATCH_SIZE, size)):
+            fields = generator.entry_fields(i)
+            fields['created_by'] = authors[fields.pop('author')]
+            entries.append(Entry(**fields))
+        last = Entry.default.order_by('-pk').values_list('pk', flat=True).first() or 0
+        # bulk_create sends no post_save signal, so nothing is indexed yet.
+        Entry.default.bulk_create(entries)
+
+        ids = dict(Entry.default.filter(pk__gt=last).values_list('slug', 'pk'))
+        create_comments([
+            (ids[entry.slug], text, is_spam)
+            for i, entry in enumerate(entries, start)
+            for text, is_spam in generator.comments(i)])
+
+        if stream is not None:
+            stream.write('%d/%d\n' % (start + len(entries), size))
+
+    return size - existing
+
+
+def clear_corpus():
+    """Delete every generated entry."""
+    from web.blog.models import Entry
+
+    return Entry.default.filter(slug__startswith=SLUG_PREFIX).delete()
+
+
+def main():
+    """Generate or clear a corpus."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', default='10k', help='10k, 100k, 1m or a number of entries')
+    parser.add_argument('--seed', type=int, default=0, help='corpus seed')
+    parser.add_argument('--clear', action='store_true', help='delete the generated entries instead')
+    args = parser.parse_args()
+
+    setup_django()
+
+    if args.clear:
+        clear_corpus()
+        return
+
+    size = parse_size(args.size)
+    created = generate_corpus(size, seed=args.seed)
+    emit('corpus', {'size': size, 'seed': args.seed, 'created': created})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Compare haystack's Highlighter with FastHighlighter on the largest entries.
+
+    $ python -m benchmarks.highlighting --entries 20 --query "django search"
+"""
+import argparse
+
+from benchmarks.utils import best_of, emit, setup_django
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20, help='number of largest entries to use')
+    parser.add_argument('--query', default='django search index', help='query to highlight')
+    parser.add_argument('--number', type=int, default=10, help='calls per timing')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db.models.functions import Length
+    from haystack.utils import Highlighter
+    from web.blog.highlighting import FastHighlighter
+    from web.blog.models import Entry
+
+    entries = Entry.default.annotate(text_length=Length('text')).order_by('-text_length')[:args.entries]
+
+    results = []
+    for entry in entries:
+        baseline = best_of(lambda: Highlighter(args.query).highlight(entry.text), number=args.number)
+        fast = best_of(lambda: FastHighlighter(args.query).highlight(entry.text), number=args.number)
+        results.append({
+            'entry': entry.pk,
+            'text_length': entry.text_length,
+            'haystack_ms': baseline * 1000,
+            'fast_ms': fast * 1000,
+            'speedup': baseline / fast if fast else None,
+        })
+
+    emit('highlighting', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""Indexing throughput, query latency and memory of every search backend.
+
+    $ python -m benchmarks.search --size 10k
+    $ python -m benchmarks.search --size 100k --using default --fake-elasticsearch --latency 2
+
+For each connection of ``HAYSTACK_CONNECTIONS`` (or the ones given with
+``--using``) the index is cleared and rebuilt from the entries, then the
+fixed query mix is run through ``search_entries``. With
+``--fake-elasticsearch`` the Elasticsearch connections point at the local
+stand-in of web.blog.tests.fake_elasticsearch instead of a real node.
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_corpus, parse_size
+from benchmarks.utils import emit, percentile, setup_django
+
+# (query, filters), the same for every run and every backend.
+QUERY_MIX = [
+    ('django', {}),
+    ('django search', {}),
+    ('haystack index query', {}),
+    ('"django search"', {}),
+    ('python -cache', {}),
+    ('template', {'author': 'benchmark1'}),
+    ('model view', {'month': '2014-06'}),
+    ('django', {'min_comments': 1}),
+    ('search', {'author': 'benchmark3', 'month': '2013-01'}),
+    ('nomatchforthisword', {}),
+]
+
+INDEX_BATCH_SIZE = 1000
+
+
+def index_entries(alias):
+    """Clear the index of a connection and index every entry again; return ``(documents, seconds)``."""
+    from haystack import connections
+    from web.blog.models import Entry
+
+    backend = connections[alias].get_backend()
+    index = connections[alias].get_unified_index().get_index(Entry)
+    backend.clear(models=[Entry])
+
+    queryset = index.index_queryset(using=alias).order_by('pk')
+    documents = 0
+    last_pk = 0
+    started = time.perf_counter()
+
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:INDEX_BATCH_SIZE])
+        if not batch:
+            break
+        backend.update(index, batch, commit=False)
+        documents += len(batch)
+        last_pk = batch[-1].pk
+
+    backend.update(index, [], commit=True)
+    return documents, time.perf_counter() - started
+
+
+def run_queries(alias, rounds):
+    """Run the query mix ``rounds`` times; return the latencies in milliseconds."""
+    from web.blog.search import search_entries
+
+    samples = []
+    for _ in range(rounds):
+        for query, filters in QUERY_MIX:
+            started = time.perf_counter()
+            search_entries(query, using=alias, **filters)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def benchmark_connection(alias, rounds):
+    """Return the results of one connection."""
+    from django.conf import settings
+
+    tracemalloc.start()
+    documents, seconds = index_entries(alias)
+    _, index_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    run_queries(alias, 1)  # warm up the connection and the caches
+
+    tracemalloc.start()
+    samples = run_queries(alias, rounds)
+    _, query_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'connection': alias,
+        'engine': settings.HAYSTACK_CONNECTIONS[alias]['ENGINE'],
+        'documents': documents,
+        'indexing_seconds': seconds,
+        'indexing_docs_per_sec': documents / seconds if seconds else None,
+        'indexing_peak_memory_kb': index_peak // 1024,
+        'queries': len(samples),
+        'query_p50_ms': percentile(samples, 50),
+        'query_p95_ms': percentile(samples, 95),
+        'query_p99_ms': percentile(samples, 99),
+        'query_peak_memory_kb': query_peak // 1024,
+        # ru_maxrss is in kilobytes on Linux.
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', help='generate the corpus first: 10k, 100k, 1m or a number of entries')
+    parser.add_argument('--seed', type=int, default=0, help='corpus seed')
+    parser.add_argument('--using', action='append', help='connection to benchmark, may be repeated')
+    parser.add_argument('--rounds', type=int, default=20, help='runs of the query mix')
+    parser.add_argument('--fake-elasticsearch', action='store_true', help='use the local stand-in for Elasticsearch')
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added by the stand-in per request')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from haystack import connections
+
+    if args.size:
+        generate_corpus(parse_size(args.size), seed=args.seed)
+
+    aliases = args.using or sorted(settings.HAYSTACK_CONNECTIONS)
+    fake = None
+
+    if args.fake_elasticsearch:
+        from haystack.backends.elasticsearch_backend import ElasticsearchSearchBackend
+        from web.blog.tests.fake_elasticsearch import FakeElasticsearch
+
+        fake = FakeElasticsearch(latency=args.latency / 1000.0).start()
+        for alias in aliases:
+            if issubclass(connections[alias].backend, ElasticsearchSearchBackend):
+                settings.HAYSTACK_CONNECTIONS[alias]['URL'] = fake.url
+                connections.reload(alias)
+
+    try:
+        results = [benchmark_connection(alias, args.rounds) for alias in aliases]
+    finally:
+        if fake is not None:
+            fake.stop()
+
+    emit('search', {
+        'size': args.size,
+        'seed': args.seed,
+        'fake_elasticsearch': args.fake_elasticsearch,
+        'latency_ms': args.latency,
+        'connections': results,
+    })
+
+
+if __name__ == '__main__':
+    main()
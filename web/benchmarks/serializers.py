@@ -0,0 +1,98 @@
+"""Compare tastypie's Serializer with FastSerializer on a 1,000 object list response.
+
+    $ python -m benchmarks.serializers --objects 1000
+
+When msgpack is installed, the JSON and MessagePack bodies of the same
+response are also compared: size, gzipped size, encoding and decoding.
+"""
+import argparse
+import datetime
+import gzip
+
+from benchmarks.utils import best_of, emit, setup_django
+
+
+def build_response(count):
+    """Return a list response shaped like the EntryResource one, with ``count`` bundles."""
+    from tastypie.bundle import Bundle
+
+    published = datetime.datetime(2016, 4, 8, 22, 5, 12, 345678)
+    objects = []
+    for pk in range(1, count + 1):
+        objects.append(Bundle(data={
+            'id': pk,
+            'title': u'Django entry number %d — search, cache & co' % pk,
+            'slug': 'django-entry-number-%d' % pk,
+            'summary': u'Summary of the entry %d. ' % pk * 5,
+            'text': u'<p>Body of the entry %d, with some text.</p>' % pk * 20,
+            'published_date': published + datetime.timedelta(minutes=pk),
+            'created_date': published,
+            'is_published': True,
+            'is_comments_allowed': pk % 2 == 0,
+            'meta_keywords': None,
+            'user': '/api/v1/user_profile/%d/' % (pk % 20 + 1),
+            'resource_uri': '/api/v1/entry/%d/' % pk,
+        }))
+
+    return {
+        'meta': {'limit': count, 'next': None, 'offset': 0, 'previous': None, 'total_count': count},
+        'objects': objects,
+    }
+
+
+def compare_formats(serializer, data, number):
+    """Return the size and the timings of the JSON and MessagePack bodies of ``data``."""
+    formats = {}
+    for name, content_type in (('json', 'application/json'), ('msgpack', 'application/x-msgpack')):
+        body = serializer.serialize(data, content_type)
+        raw = body if isinstance(body, bytes) else body.encode('utf-8')
+        formats[name] = {
+            'bytes': len(raw),
+            'gzip_bytes': len(gzip.compress(raw)),
+            'encode_ms': best_of(lambda: serializer.serialize(data, content_type), number=number) * 1000,
+            # What a client pays: bytes off the wire to Python objects.
+            'decode_ms': best_of(lambda: serializer.deserialize(raw, content_type), number=number) * 1000,
+        }
+    return formats
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=1000, help='objects in the list response')
+    parser.add_argument('--number', type=int, default=10, help='calls per timing')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from tastypie.serializers import Serializer
+    from core.api import serializers
+    from core.api.serializers import FastSerializer
+
+    data = build_response(args.objects)
+    baseline = best_of(lambda: Serializer(['json']).serialize(data, 'application/json'), number=args.number)
+    fast = best_of(lambda: FastSerializer(['json']).serialize(data, 'application/json'), number=args.number)
+
+    if serializers.ujson is not None:
+        encoder = 'ujson'
+    elif serializers.simplejson is not None:
+        encoder = 'simplejson'
+    else:
+        encoder = 'json'
+
+    results = {
+        'objects': args.objects,
+        'encoder': encoder,
+        'tastypie_ms': baseline * 1000,
+        'fast_ms': fast * 1000,
+        'speedup': baseline / fast if fast else None,
+    }
+
+    if serializers.msgpack is not None:
+        results['formats'] = compare_formats(FastSerializer(['json', 'msgpack']), data, args.number)
+
+    emit('serializers', results)
+
+
+if __name__ == '__main__':
+    main()
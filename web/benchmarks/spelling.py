@@ -0,0 +1,81 @@
+"""Time the spelling dictionary of the published entries.
+
+    $ python -m benchmarks.spelling --words 200 --seed 1
+
+Reports the time to build the dictionary, to load it from the bytes
+update_index shares, and per lookup of misspelled corpus terms, against a
+scan of the whole vocabulary with the same edit distance.
+"""
+import argparse
+import random
+from collections import Counter
+from time import perf_counter
+
+from benchmarks.utils import best_of, emit, percentile, setup_django
+
+
+def misspell(word, rng):
+    """Return the word with one character deleted, replaced or swapped with the next one."""
+    position = rng.randrange(len(word) - 1)
+    edit = rng.choice(('delete', 'replace', 'swap'))
+    if edit == 'delete':
+        return word[:position] + word[position + 1:]
+    if edit == 'replace':
+        return word[:position] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[position + 1:]
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=200, help='misspelled words to look up')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the misspellings')
+    parser.add_argument('--number', type=int, default=3, help='calls per timing of build and load')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from web.blog.models import Entry
+    from web.blog.spelling import MAX_DISTANCE, SpellingDictionary, edit_distance
+    from web.blog.utils import tokenize
+
+    terms = Counter()
+    for title, text in Entry.objects.values_list('title', 'text').iterator():
+        terms.update(tokenize(title))
+        terms.update(tokenize(text))
+
+    build_seconds = best_of(lambda: SpellingDictionary.build(terms), number=args.number)
+    dictionary = SpellingDictionary.build(terms)
+    content = dictionary.dumps()
+    load_seconds = best_of(lambda: SpellingDictionary.loads(content), number=args.number)
+
+    rng = random.Random(args.seed)
+    candidates = sorted(term for term in terms if len(term) >= 4)
+    words = [misspell(rng.choice(candidates), rng) for _ in range(args.words)] if candidates else []
+
+    lookups = []
+    scans = []
+    for word in words:
+        started = perf_counter()
+        dictionary.lookup(word)
+        lookups.append((perf_counter() - started) * 1000)
+
+        started = perf_counter()
+        for term in terms:
+            edit_distance(word, term, MAX_DISTANCE)
+        scans.append((perf_counter() - started) * 1000)
+
+    emit('spelling', {
+        'terms': len(terms),
+        'dictionary_bytes': len(content),
+        'build_ms': build_seconds * 1000,
+        'load_ms': load_seconds * 1000,
+        'lookup_p50_ms': percentile(lookups, 50),
+        'lookup_p99_ms': percentile(lookups, 99),
+        'scan_p50_ms': percentile(scans, 50),
+        'scan_p99_ms': percentile(scans, 99),
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Time ``reverse()`` against ``build_url`` on the routes built for every entry.
+
+    $ python -m benchmarks.urls --number 10000
+
+Times the entry permalink, the author page and an API detail URI, as
+well as ``Entry.get_absolute_url``. The first ``build_url`` call of a
+route compiles it, so it is made before the timings.
+"""
+import argparse
+import datetime
+
+from benchmarks.utils import best_of, emit, setup_django
+
+ROUTES = [
+    ('blog:entry_details', {'year': '2016', 'month': '04', 'day': '08', 'slug': 'django-entry-number-1'}),
+    ('blog:author', {'username': 'benchmark1'}),
+    ('api_dispatch_detail', {'api_name': 'v1', 'resource_name': 'entry', 'pk': 1}),
+]
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=10000, help='calls per timing')
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.core.urlresolvers import reverse
+    from web.blog.models import Entry
+    from web.blog.urlbuilder import build_url
+
+    results = []
+    for viewname, kwargs in ROUTES:
+        assert build_url(viewname, **kwargs) == reverse(viewname, kwargs=kwargs)
+        baseline = best_of(lambda: reverse(viewname, kwargs=kwargs), number=args.number)
+        compiled = best_of(lambda: build_url(viewname, **kwargs), number=args.number)
+        results.append({
+            'route': viewname,
+            'reverse_us': baseline * 1e6,
+            'build_url_us': compiled * 1e6,
+            'speedup': baseline / compiled if compiled else None,
+        })
+
+    entry = Entry(slug='django-entry-number-1', created_date=datetime.datetime(2016, 4, 8, 22, 5, 12))
+    created_date = entry.created_date
+
+    def permalink_with_reverse():
+        return reverse('blog:entry_details', args=[
+            created_date.year, created_date.strftime('%m'), created_date.strftime('%d'), entry.slug])
+
+    assert entry.get_absolute_url() == permalink_with_reverse()
+    baseline = best_of(permalink_with_reverse, number=args.number)
+    compiled = best_of(entry.get_absolute_url, number=args.number)
+    results.append({
+        'route': 'Entry.get_absolute_url',
+        'reverse_us': baseline * 1e6,
+        'build_url_us': compiled * 1e6,
+        'speedup': baseline / compiled if compiled else None,
+    })
+
+    emit('urls', {'number': args.number, 'routes': results})
+
+
+if __name__ == '__main__':
+    main()
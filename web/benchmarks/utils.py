@@ -0,0 +1,35 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import os
+import sys
+import timeit
+
+
+def setup_django(settings_module='config.settings.dev'):
+    """Configure Django the same way manage.py does."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+
+    import django
+    django.setup()
+
+
+def best_of(func, number=10, repeat=3):
+    """Return the best average time, in seconds, of ``number`` calls of func."""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def percentile(samples, percent):
+    """Return the nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, int(round(percent / 100.0 * len(ordered))) - 1)
+    return ordered[rank]
+
+
+def emit(name, results, stream=None):
+    """Write the results as one JSON document so that runs can be diffed."""
+    stream = stream or sys.stdout
+    json.dump({'benchmark': name, 'results': results}, stream, indent=2, sort_keys=True, default=str)
+    stream.write('\n')
@@ -253,6 +253,9 @@ ADMIN_URL = r'^admin/'
 # This setting controls the default number of records Tastypie will show in a list view.
 API_LIMIT_PER_PAGE = 5
 
+# Server-Timing headers and per-endpoint histograms of the phases of the API requests.
+API_INSTRUMENTATION = env.bool('API_INSTRUMENTATION', False)
+
 #  Allows you to override the canned error response when an unhandled exception is raised.
 TASTYPIE_CANNED_ERROR = "Oops, we broke it!"
 
@@ -261,13 +264,24 @@ TASTYPIE_DEFAULT_FORMATS = ['json', 'xml']
 
 HAYSTACK_CONNECTIONS = {
     'default': {
-        'ENGINE': 'haystack.backends.elasticsearch_backend.ElasticsearchSearchEngine',
+        'ENGINE': 'web.blog.search_backends.EntrySearchEngine',
         'URL': 'http://192.168.99.101:9200',
         'INDEX_NAME': 'haystack',
+        # See web.blog.search_backends: indexing and search deadlines, pool and circuit breaker.
+        'TIMEOUT': 30,
+        'SEARCH_TIMEOUT': 2,
+        'POOL_SIZE': 10,
+        'FAILURE_THRESHOLD': 5,
+        'RESET_TIMEOUT': 30,
+        # search_after cursors need Elasticsearch 5+, the facets of haystack 2.4 need 1.x.
+        'SEARCH_AFTER': False,
     },
 }
 
-HAYSTACK_SIGNAL_PROCESSOR = 'haystack.signals.RealtimeSignalProcessor'
+HAYSTACK_SIGNAL_PROCESSOR = 'web.blog.signals.BlogSignalProcessor'
+
+# Used by haystack's {% highlight %} tag; single-pass and bounded to the start of the text.
+HAYSTACK_CUSTOM_HIGHLIGHTER = 'web.blog.highlighting.FastHighlighter'
 
 SOCIALACCOUNT_PROVIDERS = {
     'facebook': {
@@ -0,0 +1,229 @@
+"""Authentication of the API resources.
+
+``BasicAuthentication`` runs the password hasher (PBKDF2) on every call.
+``CachedApiKeyAuthentication`` accepts the tastypie API key of a user or a
+short-lived signed token, and remembers the user of every verified
+credential: a few seconds in the process, minutes in the shared cache.
+The shared entries hold the credentials generation of the user, bumped by
+web.users.models when the user or their API key is saved, so a password or
+key change is seen by every worker within ``LOCAL_TIMEOUT`` seconds.
+"""
+import hashlib
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import signals
+from django.utils.crypto import constant_time_compare, salted_hmac
+from tastypie.authentication import ApiKeyAuthentication
+from tastypie.models import ApiKey
+
+from web.blog.cache import UNTRACKED_FIELDS, get_generation
+from web.users.models import User, credentials_generation
+
+TOKEN_SALT = 'core.api.authentication.token'
+
+# Seconds a token is accepted for.
+TOKEN_MAX_AGE = 3600
+
+# Seconds a verified credential is remembered by the process, then by the shared cache.
+LOCAL_TIMEOUT = 5
+SHARED_TIMEOUT = 300
+
+# Credentials remembered by one process.
+LOCAL_MAX_SIZE = 10000
+
+
+def bearer_token(request):
+    """Return the bearer token of the request, None without one."""
+    auth_type, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if auth_type.lower() == 'bearer' and token.strip():
+        return token.strip()
+    return None
+
+
+def password_fingerprint(user):
+    """Changes with the password of the user, so that tokens die with it."""
+    return salted_hmac(TOKEN_SALT, user.password).hexdigest()[:16]
+
+
+def issue_token(user, max_age=TOKEN_MAX_AGE):
+    """Sign a token of the user, valid for ``max_age`` seconds or until the password changes."""
+    data = {'u': user.pk, 'f': password_fingerprint(user), 'e': int(time.time() + max_age)}
+    return signing.dumps(data, salt=TOKEN_SALT)
+
+
+class CredentialCache(object):
+    """Users of verified credentials, kept per process and in the shared cache."""
+
+    def __init__(self, local_timeout=LOCAL_TIMEOUT, shared_timeout=SHARED_TIMEOUT, max_size=LOCAL_MAX_SIZE):
+        self.local_timeout = local_timeout
+        self.shared_timeout = shared_timeout
+        self.max_size = max_size
+        self.local = {}
+        self.lock = threading.Lock()
+
+    def key(self, credential):
+        """Cache key of a credential; the credential itself is never stored."""
+        return 'api-auth:{0}'.format(hashlib.sha256(credential.encode('utf-8')).hexdigest())
+
+    def get(self, credential):
+        """Return the user of a credential verified before, None when unknown or stale."""
+        key = self.key(credential)
+        now = time.time()
+
+        with self.lock:
+            entry = self.local.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        shared = cache.get(key)
+        if shared is None:
+            return None
+
+        user, generation = shared
+        if generation != get_generation(credentials_generation(user.pk)):
+            return None
+
+        self.remember(key, user, now)
+        return user
+
+    def set(self, credential, user, generation, expires=None):
+        """Remember the user of a credential verified at the given credentials generation.
+
+        ``expires`` is the time the credential itself expires at, if it does.
+        """
+        key = self.key(credential)
+        now = time.time()
+        timeout = self.shared_timeout if expires is None else min(self.shared_timeout, int(expires - now))
+        if timeout <= 0:
+            return
+
+        cache.set(key, (user, generation), timeout)
+        self.remember(key, user, now, expires)
+
+    def remember(self, key, user, now, expires=None):
+        """Keep a user in the process."""
+        until = now + self.local_timeout if expires is None else min(now + self.local_timeout, expires)
+        with self.lock:
+            if len(self.local) >= self.max_size:
+                self.local.clear()
+            self.local[key] = (user, until)
+
+    def clear(self):
+        """Forget everything this process remembers."""
+        with self.lock:
+            self.local.clear()
+
+
+credential_cache = CredentialCache()
+
+
+def forget_local_credentials(sender, **kwargs):
+    """Changes made by this process are seen by it at once, not after LOCAL_TIMEOUT."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and UNTRACKED_FIELDS.issuperset(update_fields):
+        return
+
+    credential_cache.clear()
+
+
+for model in (User, ApiKey):
+    signals.post_save.connect(forget_local_credentials, sender=model, dispatch_uid='forget_local_credentials')
+    signals.post_delete.connect(forget_local_credentials, sender=model, dispatch_uid='forget_local_credentials')
+
+
+class CachedApiKeyAuthentication(ApiKeyAuthentication):
+    """API key or token authentication without a password hash.
+
+    Accepts ``Authorization: ApiKey <username>:<api key>``, the ``username``
+    and ``api_key`` parameters, or ``Authorization: Bearer <token>`` with a
+    token from ``issue_token``.
+    """
+
+    def __init__(self, token_max_age=TOKEN_MAX_AGE, credentials=None, **kwargs):
+        super(CachedApiKeyAuthentication, self).__init__(**kwargs)
+        self.token_max_age = token_max_age
+        self.credentials = credentials or credential_cache
+
+    def extract_token(self, request):
+        """Return the bearer token of the request, None without one."""
+        return bearer_token(request)
+
+    def is_authenticated(self, request, **kwargs):
+        """Check the token or the API key, from the cache when it was verified before."""
+        token = self.extract_token(request)
+
+        if token is not None:
+            credential = 'token:' + token
+        else:
+            try:
+                username, api_key = self.extract_credentials(request)
+            except ValueError:
+                return self._unauthorized()
+            if not username or not api_key:
+                return self._unauthorized()
+            credential = 'key:{0}:{1}'.format(username, api_key)
+
+        user = self.credentials.get(credential)
+
+        if user is None:
+            if token is not None:
+                user, generation, expires = self.verify_token(token)
+            else:
+                user, generation = self.verify_key(username, api_key)
+                expires = None
+            if user is None:
+                return self._unauthorized()
+            self.credentials.set(credential, user, generation, expires)
+
+        if not self.check_active(user):
+            return False
+
+        request.user = user
+        return True
+
+    def verify_key(self, username, api_key):
+        """Return the user of an API key and their credentials generation, ``(None, None)`` when wrong."""
+        try:
+            key = ApiKey.objects.select_related('user').get(**{'user__' + get_user_model().USERNAME_FIELD: username})
+        except ApiKey.DoesNotExist:
+            return None, None
+
+        generation = get_generation(credentials_generation(key.user_id))
+        if not constant_time_compare(key.key, api_key):
+            return None, None
+        return key.user, generation
+
+    def verify_token(self, token):
+        """Return the user of a token, their credentials generation and the token expiry.
+
+        ``(None, None, None)`` when the token is invalid or expired.
+        """
+        try:
+            data = signing.loads(token, salt=TOKEN_SALT, max_age=self.token_max_age)
+        except signing.BadSignature:
+            return None, None, None
+
+        if not isinstance(data, dict) or not isinstance(data.get('e'), int) or data['e'] <= time.time():
+            return None, None, None
+
+        User = get_user_model()
+        try:
+            user = User.objects.get(pk=data.get('u'))
+        except (User.DoesNotExist, TypeError, ValueError):
+            return None, None, None
+
+        generation = get_generation(credentials_generation(user.pk))
+        if not constant_time_compare(password_fingerprint(user), data.get('f') or ''):
+            return None, None, None
+        return user, generation, data['e']
+
+    def get_identifier(self, request):
+        """Username of the authenticated user."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated():
+            return user.get_username()
+        return super(CachedApiKeyAuthentication, self).get_identifier(request)
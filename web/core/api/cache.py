@@ -0,0 +1,71 @@
+"""Cache classes of the API resources."""
+import hashlib
+import json
+
+from django.core.cache import caches
+from tastypie.cache import SimpleCache
+
+from web.blog.cache import get_generations, model_generation
+
+# Request parameters which never change a response.
+IGNORED_PARAMS = frozenset(['api_key'])
+
+
+class GenerationCache(SimpleCache):
+    """SimpleCache whose keys embed the generation counters of the models a resource reads.
+
+    Saving or deleting a row of one of those models bumps its counter, so
+    the keys built before are never read again and simply expire.
+
+    The instances are built when the resources are imported; the cache
+    backend is looked up on use, so that it follows changes of ``CACHES``.
+    """
+
+    def __init__(self, models=(), cache_name='default', timeout=300, public=None, private=True, *args, **kwargs):
+        self.cache_name = cache_name
+        super(GenerationCache, self).__init__(cache_name, timeout, public, private, *args, **kwargs)
+        self.generations = [model_generation(model) for model in models]
+
+    @property
+    def cache(self):
+        """The backend of ``cache_name``."""
+        return caches[self.cache_name]
+
+    @cache.setter
+    def cache(self, backend):
+        # SimpleCache.__init__ keeps the backend of import time; it is looked up on use instead.
+        pass
+
+    def versioned_key(self, key):
+        """Prefix a key with the current generations."""
+        token = '.'.join(str(value) for value in get_generations(self.generations))
+        return 'api:{0}:{1}'.format(token, key)
+
+    def get(self, key, **kwargs):
+        """Gets a key of the current generations from the cache."""
+        return super(GenerationCache, self).get(self.versioned_key(key), **kwargs)
+
+    def set(self, key, value, timeout=None):
+        """Sets a key of the current generations in the cache."""
+        super(GenerationCache, self).set(self.versioned_key(key), value, timeout)
+
+    def cache_control(self):
+        """Responses are per authenticated client: private unless told otherwise, no shared cache age."""
+        control = {'max_age': self.timeout}
+
+        if self.public:
+            control['public'] = True
+            control['s_maxage'] = self.timeout
+        elif self.private:
+            control['private'] = True
+
+        return control
+
+    def response_key(self, resource_name, request_type, request, kwargs, format):
+        """Key of a whole response: resource, normalised query string, URL kwargs and format."""
+        params = sorted(
+            (name, request.GET.getlist(name)) for name in request.GET if name not in IGNORED_PARAMS)
+        url_kwargs = sorted((name, getattr(value, 'pk', value)) for name, value in kwargs.items())
+        raw = json.dumps([request_type, format, params, url_kwargs], default=str, sort_keys=True)
+
+        return 'response:{0}:{1}'.format(resource_name, hashlib.md5(raw.encode('utf-8')).hexdigest())
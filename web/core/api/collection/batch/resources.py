@@ -0,0 +1,175 @@
+"""Several API calls in one request."""
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.urlresolvers import Resolver404, resolve, reverse
+from django.db import close_old_connections
+from django.utils.six.moves.urllib.parse import urlsplit
+from tastypie.authentication import BasicAuthentication, MultiAuthentication
+from tastypie.resources import Resource
+
+from core.api.authentication import CachedApiKeyAuthentication, bearer_token, issue_token
+from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import InstrumentedMixin
+from core.api.serializers import FastSerializer, loads
+
+# Most sub-requests in one batch.
+MAX_SUB_REQUESTS = 20
+
+# Threads running the GET sub-requests of every batch of this process.
+MAX_WORKERS = 4
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """The thread pool of the process, started on first use."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+class BatchResource(InstrumentedMixin, Resource):
+    """Run several calls of this API in one request.
+
+    :argument
+    {
+        "requests": [
+            {"method": "GET", "path": "/api/v1/user_profile/"},
+            {"method": "GET", "path": "/api/v1/entry/?limit=5"},
+            {"method": "PATCH", "path": "/api/v1/entry/", "body": {"objects": []}}
+        ]
+    }
+
+    :return
+    {
+        "responses": [{"status": 200, "headers": {"Content-Type": "application/json"}, "body": {}}]
+    }
+
+    The batch is authenticated once; the sub-requests carry a token of
+    the user instead of the credentials. Until the first write, runs of
+    consecutive GETs go concurrently to a bounded thread pool; every other
+    method runs alone, in order, once the calls before it are done. The
+    writes are only visible in the transaction of the batch, so every call
+    after the first write runs in order in this thread.
+    """
+
+    class Meta:
+        """Meta."""
+
+        resource_name = 'batch'
+        list_allowed_methods = ['post']
+        detail_allowed_methods = []
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
+        include_resource_uri = False
+        serializer = FastSerializer()
+
+    def post_list(self, request, **kwargs):
+        """Run the sub-requests and return their responses in order."""
+        data = self.deserialize(request, request.body, format=request.META.get('CONTENT_TYPE', 'application/json'))
+        calls = data.get('requests') if isinstance(data, dict) else None
+
+        if not isinstance(calls, list) or not calls:
+            raise CustomBadRequest(code='invalid_batch', message='Must provide the list of requests.')
+        if len(calls) > MAX_SUB_REQUESTS:
+            raise CustomBadRequest(
+                code='invalid_batch', message='At most {0} requests per batch.'.format(MAX_SUB_REQUESTS))
+
+        # A token is only minted from the password or the API key, bearers pass on their own.
+        authorization = 'Bearer {0}'.format(bearer_token(request) or issue_token(request.user))
+        sub_requests = [self.build_sub_request(request, call, authorization) for call in calls]
+
+        responses = []
+        concurrent = []
+        written = False
+        for sub_request in sub_requests:
+            if sub_request.method == 'GET' and not written:
+                concurrent.append(sub_request)
+                continue
+            responses.extend(self.run_concurrently(concurrent))
+            concurrent = []
+            responses.append(self.run(sub_request))
+            written = written or sub_request.method != 'GET'
+        responses.extend(self.run_concurrently(concurrent))
+
+        return self.create_response(request, {'responses': responses})
+
+    def build_sub_request(self, request, call, authorization):
+        """Request of one call, with the environment of the batch."""
+        if not isinstance(call, dict):
+            raise CustomBadRequest(code='invalid_batch', message='Every request should be a dictionary.')
+
+        method = str(call.get('method', 'GET')).upper()
+        if method not in METHODS:
+            raise CustomBadRequest(code='invalid_batch', message='Unsupported method {0}.'.format(method))
+
+        prefix = reverse('api_{0}_top_level'.format(self._meta.api_name), kwargs={'api_name': self._meta.api_name})
+        batch_path = self.get_resource_uri()
+        url = urlsplit(str(call.get('path', '')))
+
+        if not url.path.startswith(prefix) or url.path.startswith(batch_path):
+            raise CustomBadRequest(
+                code='invalid_batch', message='Requests should be calls of {0}, not of the batch.'.format(prefix))
+
+        body = call.get('body')
+        content = b'' if body is None else FastSerializer().to_json(body).encode('utf-8')
+
+        environ = dict(request.META)
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(content)),
+            # Whatever the format of the batch, its responses embed the decoded bodies.
+            'HTTP_ACCEPT': 'application/json',
+            'HTTP_AUTHORIZATION': authorization,
+            'wsgi.input': io.BytesIO(content),
+        })
+        sub_request = WSGIRequest(environ)
+        sub_request.user = request.user
+        return sub_request
+
+    def run(self, sub_request):
+        """Dispatch a request to the view of its path; return its status, headers and body."""
+        try:
+            match = resolve(sub_request.path_info)
+        except Resolver404:
+            return {'status': 404, 'headers': {}, 'body': None}
+
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            # Exports are too large to embed; their query has not run yet.
+            response.close()
+            return {'status': 400, 'headers': {}, 'body': {'code': 'streaming_response', 'message': 'Not in a batch.'}}
+
+        headers = dict((name, response[name]) for name in ('Content-Type', 'Location') if response.has_header(name))
+        content = response.content.decode(response.charset or 'utf-8')
+
+        if content and headers.get('Content-Type', '').startswith('application/json'):
+            body = loads(content)
+        else:
+            body = content or None
+
+        return {'status': response.status_code, 'headers': headers, 'body': body}
+
+    def run_in_thread(self, sub_request):
+        """``run`` from a pool thread, leaving its database connection in a reusable state."""
+        try:
+            return self.run(sub_request)
+        finally:
+            close_old_connections()
+
+    def run_concurrently(self, sub_requests):
+        """Run GET requests on the pool, a single one in this thread."""
+        if len(sub_requests) < 2:
+            return [self.run(sub_request) for sub_request in sub_requests]
+        return list(get_executor().map(self.run_in_thread, sub_requests))
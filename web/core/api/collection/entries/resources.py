@@ -1,22 +1,46 @@
 """Entry Resource."""
+from contextlib import ExitStack
+
 from django.conf.urls import url
-from tastypie import fields
+from django.core.urlresolvers import Resolver404, resolve
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import six, timezone
+from haystack import signal_processor
+from haystack.signals import RealtimeSignalProcessor
+from tastypie import fields, http
+from tastypie.exceptions import ImmediateHttpResponse
 from tastypie.resources import ModelResource, ALL_WITH_RELATIONS
-from tastypie.authentication import BasicAuthentication
-from tastypie.serializers import Serializer
-from web.users.models import User
+from tastypie.authentication import BasicAuthentication, MultiAuthentication
+from web.users.models import User, get_user_id
+from web.blog.cache import bump_generation, model_generation
 from web.blog.models import Entry
 from web.blog.forms import EntryForm
+from web.blog.search_indexes import EntryIndex
+from core.api.authentication import CachedApiKeyAuthentication
 from core.api.collection.users.resources import UserProfileResource
-from core.api.validations import EntryValidation
+from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import InstrumentedMixin
+from core.api.validations import EntryBatchValidation, EntryValidation
 from core.api.authorizations import CustomAuthorization
+from core.api.cache import GenerationCache
+from core.api.mixins import BundleCacheMixin, FieldsetMixin, ResponseCacheMixin, UrlBuilderMixin
 from core.api.paginators import EntryPaginator
+from core.api.serializers import FastSerializer
+from core.api.throttles import RedisThrottle
 from tastypie.utils import trailing_slash
 
 
-class EntryResource(ModelResource):
+class EntryResource(InstrumentedMixin, UrlBuilderMixin, ResponseCacheMixin, FieldsetMixin, BundleCacheMixin,
+                    ModelResource):
     """docstring for EntryResource."""
 
+    # Most entries a PATCH or DELETE on the list may change.
+    MAX_BATCH_SIZE = 5000
+
+    # Entries changed by one UPDATE statement.
+    UPDATE_CHUNK_SIZE = 500
+
     user = fields.ForeignKey(UserProfileResource, 'created_by')
 
     class Meta:
@@ -24,13 +48,16 @@ class EntryResource(ModelResource):
 
         queryset = Entry.objects.all()
         resource_name = 'entry'
-        authentication = BasicAuthentication()
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
         authorization = CustomAuthorization()
         validation = EntryValidation(form_class=EntryForm)
-        list_allowed_methods = ['get']
+        batch_validation = EntryBatchValidation()
+        list_allowed_methods = ['get', 'patch', 'delete']
         details_allowed_methods = ['get', 'put', 'delete']
-        serializer = Serializer(['json'])
+        serializer = FastSerializer(['json', 'msgpack'])
         paginator_class = EntryPaginator
+        cache = GenerationCache(models=[Entry, User])
+        throttle = RedisThrottle(throttle_at=300, timeframe=60, scope='entry')
         filtering = {
             'user': ALL_WITH_RELATIONS,
             'published_date': ['exact', 'lt', 'lte', 'gte', 'gt'],
@@ -48,8 +75,151 @@ class EntryResource(ModelResource):
             ),
         ]
 
+    def patch_list(self, request, **kwargs):
+        """Change and delete entries of the user in one transaction.
+
+        :argument
+        {
+            "objects": [{"resource_uri": "/api/v1/entry/1/", "title": "Django 1.8"}],
+            "deleted_objects": ["/api/v1/entry/2/"]
+        }
+
+        Entries may also be given by ``id``. Nothing is changed unless every
+        entry belongs to the user and every change is valid.
+        """
+        data = self.deserialize_batch(request)
+        changes = data.get('objects', [])
+        deleted = data.get('deleted_objects', [])
+
+        if not isinstance(changes, list) or not isinstance(deleted, list):
+            raise CustomBadRequest(code='invalid_batch', message='objects and deleted_objects should be lists.')
+
+        updates = {}
+        for change in changes:
+            if not isinstance(change, dict):
+                raise CustomBadRequest(code='invalid_batch', message='Every object should be a dictionary.')
+            values = dict(change)
+            reference = values.pop('resource_uri', None) or values.pop('id', None)
+            values.pop('id', None)
+            updates[self.entry_pk(reference)] = values
+
+        return self.apply_batch(request, updates, [self.entry_pk(reference) for reference in deleted])
+
+    def delete_list(self, request, **kwargs):
+        """Delete the entries of the user listed in ``objects``, by resource URI or id."""
+        objects = self.deserialize_batch(request).get('objects')
+
+        if not isinstance(objects, list):
+            raise CustomBadRequest(code='invalid_batch', message='Must provide the list of objects to delete.')
+
+        return self.apply_batch(request, {}, [self.entry_pk(reference) for reference in objects])
+
+    def deserialize_batch(self, request):
+        """Body of a batch request."""
+        if not request.body:
+            raise CustomBadRequest(code='invalid_batch', message='Must provide the objects of the batch.')
+
+        data = self.deserialize(request, request.body, format=request.META.get('CONTENT_TYPE', 'application/json'))
+        if not isinstance(data, dict):
+            raise CustomBadRequest(code='invalid_batch', message='The batch should be a dictionary.')
+        return data
+
+    def entry_pk(self, reference):
+        """Primary key of an entry given by id or resource URI."""
+        if isinstance(reference, six.integer_types) and not isinstance(reference, bool):
+            return reference
+
+        if isinstance(reference, six.string_types):
+            if reference.isdigit():
+                return int(reference)
+            try:
+                match = resolve(reference)
+            except Resolver404:
+                match = None
+            if match and match.kwargs.get('resource_name') == self._meta.resource_name:
+                pk = match.kwargs.get('pk', '')
+                if pk.isdigit():
+                    return int(pk)
+
+        raise CustomBadRequest(code='invalid_reference', message='Not an entry: {0}.'.format(reference))
+
+    def apply_batch(self, request, updates, deleted):
+        """Authorize, validate and apply a batch.
+
+        One query loads and authorizes the entries, the changes go in
+        UPDATE statements of ``UPDATE_CHUNK_SIZE`` entries and the search
+        index gets one bulk request.
+        """
+        pks = set(updates) | set(deleted)
 
-class EntryAuthorResource(ModelResource):
+        if not pks:
+            raise CustomBadRequest(code='invalid_batch', message='The batch is empty.')
+        if len(pks) > self.MAX_BATCH_SIZE:
+            raise CustomBadRequest(
+                code='invalid_batch', message='At most {0} entries per batch.'.format(self.MAX_BATCH_SIZE))
+        if set(updates) & set(deleted):
+            raise CustomBadRequest(code='invalid_batch', message='An entry cannot be changed and deleted.')
+
+        entries = Entry.default.in_bulk(list(pks))
+
+        missing = sorted(pks - set(entries))
+        if missing:
+            raise CustomBadRequest(code='not_found', message='Some entries do not exist.', details=missing)
+
+        foreign = sorted(pk for pk, entry in entries.items() if entry.created_by_id != request.user.pk)
+        if foreign:
+            raise CustomBadRequest(code='authorization_error', message='Some entries are not yours.', details=foreign)
+
+        changed, errors = self._meta.batch_validation.clean(entries, updates)
+        if errors:
+            raise CustomBadRequest(code='invalid_objects', message='Some changes are not valid.', details=errors)
+
+        changed = dict((pk, values) for pk, values in changed.items() if values)
+
+        # Other realtime processors index each change as it comes; the others do not index on save.
+        batch = getattr(signal_processor, 'batch', None)
+        realtime = batch is not None or isinstance(signal_processor, RealtimeSignalProcessor)
+        with batch() if batch is not None else ExitStack():
+            with transaction.atomic():
+                self.update_entries(changed)
+                if deleted:
+                    Entry.default.filter(pk__in=deleted).delete()
+
+            if changed and realtime:
+                for entry in EntryIndex().load_for_update(list(changed)):
+                    signal_processor.handle_save(Entry, entry)
+
+        if changed:
+            # QuerySet.update() sends no post_save.
+            bump_generation(model_generation(Entry))
+
+        return self.create_response(
+            request, {'updated': sorted(changed), 'deleted': sorted(deleted)}, response_class=http.HttpAccepted)
+
+    def update_entries(self, changed):
+        """Write ``{pk: {field: value}}`` with one UPDATE per chunk of entries."""
+        pks = sorted(changed)
+        now = timezone.now()
+
+        for start in range(0, len(pks), self.UPDATE_CHUNK_SIZE):
+            chunk = pks[start:start + self.UPDATE_CHUNK_SIZE]
+            names = set(name for pk in chunk for name in changed[pk])
+            columns = {'modified_date': now}
+
+            for name in names:
+                whens = [When(pk=pk, then=Value(changed[pk][name])) for pk in chunk if name in changed[pk]]
+                columns[name] = Case(*whens, default=F(name), output_field=Entry._meta.get_field(name))
+
+            Entry.default.filter(pk__in=chunk).update(**columns)
+
+
+# Serves the entry lists of the authors; the registered instance serves /entry/.
+entry_resource = EntryResource()
+
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+
+
+class EntryAuthorResource(InstrumentedMixin, UrlBuilderMixin, ModelResource):
     """Entry Author Resource.
 
     list:
@@ -65,7 +235,8 @@ class EntryAuthorResource(ModelResource):
         return [
             url(
                 r"^(?P<resource_name>%s)/(?P<username>[\w\d_.-]+)/$" % self._meta.resource_name,
-                self.wrap_view('get_entry_list'),
+                # Read only: no transaction, so that a 404 from the cached lookup costs no query.
+                transaction.non_atomic_requests(self.wrap_view('get_entry_list')),
                 name="entry-author"
             ),
         ]
@@ -79,11 +250,25 @@ class EntryAuthorResource(ModelResource):
         Return the realted entry resources.
         """
         self.method_check(request, ['get'])
-        user = User.objects.get(username=kwargs['username'])
-        return EntryResource().get_list(request, user=user)
+        # get_list skips the dispatch of the entry resource, and its checks with it.
+        entry_resource.is_authenticated(request)
+        entry_resource.throttle_check(request)
+        username = kwargs['username']
+
+        # Longer usernames cannot exist; no need to look them up.
+        user_id = get_user_id(username) if len(username) <= USERNAME_MAX_LENGTH else None
+        if user_id is None:
+            raise ImmediateHttpResponse(http.HttpNotFound())
+
+        response = entry_resource.get_list(request, user=str(user_id))
+        entry_resource.log_throttled_access(request)
+        return response
 
     class Meta:
         """META."""
 
         resource_name = 'entry-author'
-        authentication = BasicAuthentication()
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
+        serializer = FastSerializer()
+        # Only for the Cache-Control header, the entries are cached by EntryResource.
+        cache = GenerationCache(models=[Entry, User])
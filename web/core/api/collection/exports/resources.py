@@ -0,0 +1,141 @@
+"""Whole tables, streamed as NDJSON."""
+import datetime
+
+from django.conf.urls import url
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from tastypie.authentication import BasicAuthentication, MultiAuthentication
+from tastypie.exceptions import ImmediateHttpResponse
+from tastypie.http import HttpForbidden, HttpNotFound
+from tastypie.resources import Resource
+from tastypie.utils import trailing_slash
+
+from web.blog.models import Comment, Entry
+from core.api.authentication import CachedApiKeyAuthentication
+from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import InstrumentedMixin
+from core.api.serializers import FastSerializer
+
+# Rows read per query.
+CHUNK_SIZE = 1000
+
+# name: (queryset, field compared with ``since``)
+EXPORTS = {
+    'entries': (Entry.default.all(), 'modified_date'),
+    'comments': (Comment.default.all(), 'created_date'),
+}
+
+
+def root_pk(model):
+    """Primary key column of a model; the one of its first parent for multi-table inheritance."""
+    pk = model._meta.pk
+    while pk.rel is not None and pk.rel.parent_link:
+        pk = pk.rel.to._meta.pk
+    return pk.attname
+
+
+def export_columns(model):
+    """Columns of a model, without the links to its parents."""
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not (field.rel is not None and getattr(field.rel, 'parent_link', False))]
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Rows of a queryset in primary key order, one chunk of ``chunk_size`` rows in memory at a time.
+
+    Every chunk is its own query, resuming after the last key of the one
+    before, so it costs the same at the end of the table as at its start.
+    """
+    key = root_pk(queryset.model)
+    queryset = queryset.order_by(key).values(*export_columns(queryset.model))
+    last = None
+
+    while True:
+        chunk = queryset if last is None else queryset.filter(**{key + '__gt': last})
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield row
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][key]
+
+
+class ExportResource(InstrumentedMixin, Resource):
+    """Every entry or comment as one JSON object per line, for staff users.
+
+    list:
+        example: http://192.168.99.101:8000/api/v1/export/entries/
+        example: http://192.168.99.101:8000/api/v1/export/comments/?since=2016-04-08T00:00:00
+
+    ``since`` keeps the entries modified, or the comments written, from
+    that date or datetime on.
+    """
+
+    class Meta:
+        """Meta."""
+
+        resource_name = 'export'
+        list_allowed_methods = []
+        detail_allowed_methods = []
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
+        include_resource_uri = False
+        serializer = FastSerializer()
+
+    def prepend_urls(self):
+        """Adding custom endpoints or overriding the buil-in ones."""
+        return [
+            url(
+                r'^(?P<resource_name>{0})/(?P<table>\w+){1}$'.format(
+                    self._meta.resource_name,
+                    trailing_slash()),
+                self.wrap_view('export'),
+                name='api_export'
+            ),
+        ]
+
+    def export(self, request, table=None, **kwargs):
+        """Stream a table."""
+        self.method_check(request, ['get'])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        if not request.user.is_staff:
+            raise ImmediateHttpResponse(HttpForbidden())
+        if table not in EXPORTS:
+            raise ImmediateHttpResponse(HttpNotFound())
+
+        queryset, since_field = EXPORTS[table]
+        since = self.since(request)
+        if since is not None:
+            queryset = queryset.filter(**{since_field + '__gte': since})
+
+        self.log_throttled_access(request)
+        response = StreamingHttpResponse(self.lines(queryset), content_type='application/x-ndjson')
+        # Let the rows through proxies as they come.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def since(self, request):
+        """Datetime of the ``since`` parameter, None without it."""
+        value = request.GET.get('since')
+        if not value:
+            return None
+
+        try:
+            since = parse_datetime(value)
+            if since is None:
+                day = parse_date(value)
+                since = datetime.datetime.combine(day, datetime.time()) if day is not None else None
+        except ValueError:
+            since = None
+
+        if since is None:
+            raise CustomBadRequest(code='invalid_since', message='since should be a date or a datetime.')
+        return since
+
+    def lines(self, queryset):
+        """NDJSON lines of the rows."""
+        serializer = self._meta.serializer
+        for row in iter_rows(queryset):
+            yield serializer.to_json(row) + '\n'
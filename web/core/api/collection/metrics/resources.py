@@ -0,0 +1,37 @@
+"""Operational metrics of this process."""
+from tastypie.authentication import BasicAuthentication, MultiAuthentication
+from tastypie.exceptions import ImmediateHttpResponse
+from tastypie.http import HttpForbidden
+from tastypie.resources import Resource
+
+from web.blog.search_backends import search_metrics
+from core.api.authentication import CachedApiKeyAuthentication
+from core.api.instrumentation import InstrumentedMixin, api_metrics
+from core.api.serializers import FastSerializer
+
+
+class MetricsResource(InstrumentedMixin, Resource):
+    """Counters of the worker answering, for staff users.
+
+    search: per haystack connection, the circuit breaker state, calls,
+    failures, timeouts, rejected calls and seconds spent open.
+    api: per endpoint and phase, histograms of the durations in milliseconds
+    and query counts, when API_INSTRUMENTATION is on.
+    """
+
+    class Meta:
+        """Meta."""
+
+        resource_name = 'metrics'
+        list_allowed_methods = ['get']
+        detail_allowed_methods = []
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
+        include_resource_uri = False
+        serializer = FastSerializer()
+
+    def get_list(self, request, **kwargs):
+        """Return the metrics."""
+        if not request.user.is_staff:
+            raise ImmediateHttpResponse(HttpForbidden())
+
+        return self.create_response(request, {'search': search_metrics(), 'api': api_metrics()})
@@ -1,15 +1,30 @@
 """Adding search functionality."""
 from django.conf.urls import url
-from django.core.paginator import Paginator, InvalidPage
 from django.http import Http404
 
 from tastypie.resources import ModelResource
 from tastypie.utils import trailing_slash
 from haystack.query import SearchQuerySet
+from web.blog.autocomplete import suggestions
+from web.blog.forms import SearchFilterForm
 from web.blog.models import Entry
+from web.blog.search import PAGE_SIZE, InvalidCursor, search_entries, search_entries_after
+from web.blog.search_backends import SearchUnavailable
+from web.blog.spelling import speller
+from core.api.exceptions import CustomBadRequest, CustomServiceUnavailable
+from core.api.instrumentation import InstrumentedMixin
+from core.api.mixins import BundleCacheMixin, FieldsetMixin, UrlBuilderMixin
+from core.api.serializers import FastSerializer
+from core.api.throttles import RedisThrottle
 
+# Most suggestions a client can ask for.
+MAX_SUGGESTIONS = 10
 
-class SearchEntriesResource(ModelResource):
+# Prefixes shorter than this never fall back to the search backend.
+MIN_FALLBACK_LENGTH = 3
+
+
+class SearchEntriesResource(InstrumentedMixin, UrlBuilderMixin, FieldsetMixin, BundleCacheMixin, ModelResource):
     """docstring for SearchEntriesResource."""
 
     class Meta:
@@ -17,6 +32,9 @@ class SearchEntriesResource(ModelResource):
 
         queryset = Entry.objects.all()
         resource_name = 'all_entries'
+        serializer = FastSerializer()
+        # Every search reaches Elasticsearch.
+        throttle = RedisThrottle(throttle_at=60, timeframe=60, scope='search')
 
     def prepend_urls(self):
         """Prepend urls."""
@@ -24,33 +42,138 @@ class SearchEntriesResource(ModelResource):
             url(
                 r'^(?P<resource_name>{0})/search{1}'.format(self._meta.resource_name, trailing_slash()),
                 self.wrap_view('get_search_entries'),
-                name='api_get_search_entries')
+                name='api_get_search_entries'),
+            url(
+                r'^(?P<resource_name>{0})/autocomplete{1}$'.format(self._meta.resource_name, trailing_slash()),
+                self.wrap_view('get_autocomplete'),
+                name='api_get_autocomplete'),
         ]
 
     def get_search_entries(self, request, **kwargs):
-        """Get search."""
+        """Get search.
+
+        Filters: ``author`` (username), ``month`` (YYYY-MM), ``min_comments`` and
+        ``comments``, the exact number of comments the ``comment_count`` facet counts by.
+        The hits, ``meta.total_count`` and ``meta.facets`` come from one search request.
+        Without hits, ``meta.suggestion`` holds a corrected query when there is one.
+        While the search backend is down, cached pages are served with
+        ``meta.stale`` set, other requests get a 503.
+
+        With a ``cursor`` parameter (empty for the first page) the results are
+        paged by cursor instead: ``meta.next`` is the cursor of the following
+        page, and there is no total nor facets.
+        """
         self.method_check(request, allowed=['get'])
         self.is_authenticated(request)
         self.throttle_check(request)
 
-        sqs = SearchQuerySet().models(Entry).load_all().auto_query(request.GET.get('q', ''))
-        paginator = Paginator(sqs, 20)
+        filters = SearchFilterForm(request.GET)
+        if not filters.is_valid():
+            raise CustomBadRequest(code='invalid_filter', message=filters.errors.as_text())
+
+        if 'cursor' in request.GET:
+            return self.get_search_entries_after(request, filters.cleaned_data)
 
         try:
-            page = paginator.page(int(request.GET.get('page', 1)))
-        except InvalidPage:
+            page_number = int(request.GET.get('page', 1))
+        except ValueError:
+            raise CustomBadRequest(code='invalid_page', message='The page should be a number.')
+
+        if page_number < 1:
             raise Http404('Sorry, no results on that page.')
 
-        objects = []
+        try:
+            page = search_entries(
+                request.GET.get('q', ''),
+                offset=(page_number - 1) * PAGE_SIZE,
+                limit=PAGE_SIZE,
+                **filters.cleaned_data)
+        except SearchUnavailable:
+            raise CustomServiceUnavailable(code='search_unavailable', message='Search is temporarily unavailable.')
+
+        if page_number > 1 and not page.hits:
+            raise Http404('Sorry, no results on that page.')
 
-        for result in page.object_list:
-            bundle = self.build_bundle(obj=result.object, request=request)
-            bundle = self.full_dehydrate(bundle)
-            objects.append(bundle)
+        objects = self.dehydrate_objects([result.object for result in page.hits], request, for_list=False)
 
         object_list = {
+            'meta': {
+                'page': page_number,
+                'limit': PAGE_SIZE,
+                'total_count': page.total,
+                'facets': page.facets,
+                'stale': page.stale,
+            },
             'objects': objects
         }
 
+        if not page.total:
+            object_list['meta']['suggestion'] = speller.suggest(request.GET.get('q', ''))
+
         self.log_throttled_access(request)
         return self.create_response(request, object_list)
+
+    def get_search_entries_after(self, request, filters):
+        """Get the page of search results following ``request.GET['cursor']``."""
+        try:
+            page = search_entries_after(
+                request.GET.get('q', ''),
+                cursor=request.GET['cursor'],
+                limit=PAGE_SIZE,
+                **filters)
+        except InvalidCursor as e:
+            raise CustomBadRequest(code='invalid_cursor', message=str(e))
+        except SearchUnavailable:
+            raise CustomServiceUnavailable(code='search_unavailable', message='Search is temporarily unavailable.')
+
+        objects = self.dehydrate_objects([result.object for result in page.hits], request, for_list=False)
+
+        object_list = {
+            'meta': {
+                'limit': PAGE_SIZE,
+                'next': page.next,
+            },
+            'objects': objects
+        }
+
+        if not request.GET['cursor'] and not objects:
+            object_list['meta']['suggestion'] = speller.suggest(request.GET.get('q', ''))
+
+        self.log_throttled_access(request)
+        return self.create_response(request, object_list)
+
+    def get_autocomplete(self, request, **kwargs):
+        """Suggest titles and terms completing the prefix in ``q``.
+
+        Answers come from the in-memory trie of the worker; only prefixes it
+        knows nothing about go to the title n-grams in the search backend.
+        ``limit`` is between 1 and MAX_SUGGESTIONS.
+        """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        query = request.GET.get('q', '')
+
+        try:
+            limit = int(request.GET.get('limit', MAX_SUGGESTIONS))
+        except ValueError:
+            raise CustomBadRequest(code='invalid_limit', message='The limit should be a number.')
+
+        if limit < 1:
+            raise CustomBadRequest(code='invalid_limit', message='The limit should be at least 1.')
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        matches = suggestions.suggest(query, limit)
+
+        if not matches and len(query.strip()) >= MIN_FALLBACK_LENGTH:
+            sqs = SearchQuerySet().models(Entry).autocomplete(title_auto=query)
+            try:
+                # Slicing runs the search.
+                matches = [result.title for result in sqs[:limit]]
+            except SearchUnavailable:
+                # Suggestions are optional, the search box works without them.
+                pass
+
+        self.log_throttled_access(request)
+        return self.create_response(request, {'query': query, 'suggestions': matches})
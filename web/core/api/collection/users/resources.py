@@ -2,18 +2,24 @@
 from django.conf.urls import url
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth import authenticate, login, logout
-from tastypie import fields
+from tastypie import fields, http
+from tastypie.exceptions import ImmediateHttpResponse
 from tastypie.utils import trailing_slash
 from tastypie.resources import ModelResource, ALL
-from tastypie.authentication import BasicAuthentication
+from tastypie.authentication import BasicAuthentication, MultiAuthentication
 from tastypie.authorization import Authorization
 
 from web.users.models import User
+from core.api.authentication import TOKEN_MAX_AGE, CachedApiKeyAuthentication, bearer_token, issue_token
+from core.api.cache import GenerationCache
 from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import InstrumentedMixin
+from core.api.mixins import FieldsetMixin, ResponseCacheMixin, UrlBuilderMixin
+from core.api.serializers import FastSerializer
 from core.api.utils import minimum_password_length, validate_password
 
 
-class UserProfileResource(ModelResource):
+class UserProfileResource(InstrumentedMixin, UrlBuilderMixin, FieldsetMixin, ModelResource):
     """User Resource.
 
     list:
@@ -32,11 +38,14 @@ class UserProfileResource(ModelResource):
         queryset = User.objects.all()
 
         # Authentication
-        authentication = BasicAuthentication()
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
 
         # Authorization
         authorization = Authorization()
 
+        # Serialization
+        serializer = FastSerializer()
+
         # Resource name
         resource_name = 'user_profile'
 
@@ -83,6 +92,12 @@ class UserProfileResource(ModelResource):
                 "resource_type": "list",
                 "methods": "GET",
                 "description": "Logout"
+            },
+            {
+                "name": "token",
+                "http_method": "POST",
+                "resource_type": "list",
+                "description": "Short-lived token for the 'Authorization: Bearer <token>' header"
             }
         ]
 
@@ -114,6 +129,15 @@ class UserProfileResource(ModelResource):
                 ),
                 self.wrap_view('logout'),
                 name='api_logout',
+            ),
+            # Token
+            url(
+                r'^(?P<resource_name>{0})/token{1}$'.format(
+                    self._meta.resource_name,
+                    trailing_slash()
+                ),
+                self.wrap_view('token'),
+                name='api_token',
             )
         ]
 
@@ -184,6 +208,29 @@ class UserProfileResource(ModelResource):
                 {'success': False}
             )
 
+    def token(self, request, **kwargs):
+        """Issue a token, valid until it expires or the password changes.
+
+        Needs the password or the API key: a token cannot renew itself.
+
+        :return
+        {
+            "token": "eyJ1Ijo...",
+            "expires_in": 3600
+        }
+        """
+        self.method_check(request, ['post'])
+        if bearer_token(request) is not None:
+            raise ImmediateHttpResponse(http.HttpUnauthorized())
+        self.is_authenticated(request)
+        return self.create_response(
+            request,
+            {
+                'token': issue_token(request.user),
+                'expires_in': TOKEN_MAX_AGE,
+            }
+        )
+
     def obj_update(self, bundle, request=None, **kwargs):
         """Update user profile."""
         bundle = super(UserProfileResource, self).obj_update(bundle, request, **kwargs)
@@ -194,7 +241,7 @@ class UserProfileResource(ModelResource):
         return bundle
 
 
-class UserResource(ModelResource):
+class UserResource(InstrumentedMixin, UrlBuilderMixin, ResponseCacheMixin, FieldsetMixin, ModelResource):
     """User Resource.
 
     list:
@@ -214,11 +261,17 @@ class UserResource(ModelResource):
         queryset = User.objects.all()
 
         # Authentication
-        authentication = BasicAuthentication()
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
 
         # Authorization
         authorization = Authorization()
 
+        # Serialization
+        serializer = FastSerializer()
+
+        # Caching
+        cache = GenerationCache(models=[User])
+
         # Resource name
         resource_name = 'users'
 
@@ -237,7 +290,7 @@ class UserResource(ModelResource):
         }
 
 
-class CreateUserResource(ModelResource):
+class CreateUserResource(InstrumentedMixin, UrlBuilderMixin, FieldsetMixin, ModelResource):
     """Creating new User."""
 
     # user = fields.ForeignKey(UserProfileResource, 'user', full=True)
@@ -252,11 +305,14 @@ class CreateUserResource(ModelResource):
         allowed_return_data = True
 
         # Authentication
-        authentication = BasicAuthentication()
+        authentication = MultiAuthentication(BasicAuthentication(), CachedApiKeyAuthentication())
 
         # Authorization
         authorization = Authorization()
 
+        # Serialization
+        serializer = FastSerializer()
+
         # Resource name
         resource_name = 'create_user'
 
@@ -0,0 +1,109 @@
+"""Swagger documentation of the API, built once per process.
+
+tastypie_swagger introspects the resources on every request of the
+resource listing or of a schema. These views render each document once,
+keep its bytes and their gzipped copy in memory, and answer with an ETag
+so that browsers and crawlers revalidate for a 304 instead of downloading
+it again. The documents change with the code only, so a deploy, which
+restarts the processes, is what refreshes them.
+"""
+import hashlib
+import re
+import threading
+
+from django.conf.urls import url
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.text import compress_string
+from tastypie_swagger.views import ResourcesView, SchemaView, SwaggerView
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+# Seconds browsers and proxies may use a document before revalidating it.
+MAX_AGE = 300
+
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+class Document(object):
+    """A rendered JSON document, with its gzipped copy and the ETags of both."""
+
+    def __init__(self, content):
+        self.content = content
+        self.gzipped = compress_string(content)
+        digest = hashlib.md5(content).hexdigest()
+        self.etag = '"{0}"'.format(digest)
+        self.gzipped_etag = '"{0}-gzip"'.format(digest)
+
+    def response(self, request):
+        """The document, gzipped when the client accepts it, or a 304 when it has it already."""
+        gzipped = bool(ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        etag = self.gzipped_etag if gzipped else self.etag
+
+        if etag in [value.strip() for value in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(self.gzipped if gzipped else self.content, content_type='application/json')
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+        return response
+
+
+def clear_documents():
+    """Forget the rendered documents."""
+    with _documents_lock:
+        _documents.clear()
+
+
+class CachedDocumentMixin(object):
+    """Render the JSON document of the view once per ``document_key``; errors are not kept."""
+
+    # First part of the keys of the documents of the view.
+    document_name = None
+
+    def document_key(self, request, **kwargs):
+        """``document_name`` and the URL arguments; documents depending on more of the request add it."""
+        return (self.document_name or type(self).__name__,) + tuple(value for _, value in sorted(kwargs.items()))
+
+    def get(self, request, *args, **kwargs):
+        key = self.document_key(request, **kwargs)
+        document = _documents.get(key)
+
+        if document is None:
+            rendered = super(CachedDocumentMixin, self).get(request, *args, **kwargs)
+            if rendered.status_code != 200:
+                return rendered
+            with _documents_lock:
+                document = _documents.setdefault(key, Document(rendered.content))
+
+        return document.response(request)
+
+
+class CachedResourcesView(CachedDocumentMixin, ResourcesView):
+    """Resource listing; its basePath is absolute, so there is one per host and scheme."""
+
+    document_name = 'resources'
+
+    def document_key(self, request, **kwargs):
+        key = super(CachedResourcesView, self).document_key(request, **kwargs)
+        return key + (request.get_host(), request.is_secure())
+
+
+class CachedSchemaView(CachedDocumentMixin, SchemaView):
+    """Schema of a resource."""
+
+    document_name = 'schema'
+
+
+# The routes of tastypie_swagger.urls, with the cached views.
+urlpatterns = [
+    url(r'^$', SwaggerView.as_view(), name='index'),
+    url(r'^resources/$', CachedResourcesView.as_view(), name='resources'),
+    url(r'^schema/(?P<resource>\S+)/$', CachedSchemaView.as_view()),
+    url(r'^schema/$', CachedSchemaView.as_view(), name='schema'),
+]
@@ -1,6 +1,7 @@
 """Raising custom exception for bad http request."""
 import json
 
+from django.http import HttpResponse
 from tastypie.exceptions import TastypieError
 from tastypie.http import HttpBadRequest
 
@@ -10,15 +11,18 @@ class CustomBadRequest(TastypieError):
     Custom bad request.
 
     This exeption is used to interrupt the flow of processing to immediately return a custom HttpResponse.
+    ``details`` (JSON data) is added to the error when given.
     """
 
-    def __init__(self, code="", message=""):
+    def __init__(self, code="", message="", details=None):
         self._response = {
             "error": {
                 "code": code or "not_provided",
                 "message": message or "No error message was provided"
             }
         }
+        if details:
+            self._response["error"]["details"] = details
 
     @property
     def response(self):
@@ -26,3 +30,25 @@ class CustomBadRequest(TastypieError):
             json.dumps(self._response),
             content_type='application/json',
         )
+
+
+class CustomServiceUnavailable(CustomBadRequest):
+    """
+    Custom service unavailable.
+
+    Same body as CustomBadRequest, with a 503 status and a Retry-After header.
+    """
+
+    def __init__(self, code="", message="", retry_after=30):
+        super(CustomServiceUnavailable, self).__init__(code=code, message=message)
+        self.retry_after = retry_after
+
+    @property
+    def response(self):
+        response = HttpResponse(
+            json.dumps(self._response),
+            content_type='application/json',
+            status=503,
+        )
+        response['Retry-After'] = str(self.retry_after)
+        return response
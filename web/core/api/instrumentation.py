@@ -0,0 +1,271 @@
+"""Time spent per phase of the API requests.
+
+With ``API_INSTRUMENTATION`` on, every request to a resource using
+``InstrumentedMixin`` records the time and the SQL queries of each phase:
+authentication, throttling, deserialization, fetching, pagination,
+dehydration and serialization. Time not spent in any of them is ``other``.
+Nested phases only count their own time, so the phases add up to the total.
+The response gets them in a ``Server-Timing`` header, and the process
+aggregates them into histograms per endpoint, served by the metrics
+resource. With the setting off, the views and phases only check it and
+carry on.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.utils import CursorDebugWrapper
+from django.views.decorators.csrf import csrf_exempt
+
+# Upper bounds, in milliseconds, of the histogram buckets; the last bucket is unbounded.
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_local = threading.local()
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def instrumentation_enabled():
+    """Whether API requests are instrumented."""
+    return getattr(settings, 'API_INSTRUMENTATION', False)
+
+
+class Recorder(object):
+    """Timings and query counts of the phases of one request."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.seconds = None
+        self.phases = OrderedDict()
+        self.stack = []
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    def enter(self, name):
+        # name, start, queries so far, then the time and queries of the nested phases.
+        self.stack.append([name, perf_counter(), self.queries, 0.0, 0])
+
+    def exit(self):
+        name, started, queries, nested_seconds, nested_queries = self.stack.pop()
+        seconds = perf_counter() - started
+        count = self.queries - queries
+
+        if self.stack:
+            parent = self.stack[-1]
+            parent[3] += seconds
+            parent[4] += count
+
+        totals = self.phases.setdefault(name, [0.0, 0])
+        totals[0] += seconds - nested_seconds
+        totals[1] += count - nested_queries
+
+    def finish(self):
+        """Stop the clock; time outside of the phases becomes ``other``."""
+        self.seconds = perf_counter() - self.started
+        seconds = sum(totals[0] for totals in self.phases.values())
+        queries = sum(totals[1] for totals in self.phases.values())
+        self.phases['other'] = [max(self.seconds - seconds, 0.0), self.queries - queries]
+
+    def server_timing(self):
+        """``Server-Timing`` header value, durations in milliseconds."""
+        metrics = []
+        for name, (seconds, queries) in self.phases.items():
+            metric = '{0};dur={1:.2f}'.format(name, seconds * 1000)
+            if queries:
+                metric += ';desc="{0} queries"'.format(queries)
+            metrics.append(metric)
+
+        metrics.append('db;dur={0:.2f};desc="{1} queries"'.format(self.query_seconds * 1000, self.queries))
+        metrics.append('total;dur={0:.2f}'.format(self.seconds * 1000))
+        return ', '.join(metrics)
+
+
+class Phase(object):
+    """Context manager timing a phase of the current request."""
+
+    __slots__ = ('recorder', 'name')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.recorder.enter(self.name)
+
+    def __exit__(self, *exc_info):
+        self.recorder.exit()
+
+
+class NullPhase(object):
+    """Phase of a request which is not instrumented."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+def phase(name):
+    """Time a phase of the current request: ``with phase('fetch'): ...``."""
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        return NULL_PHASE
+    return Phase(recorder, name)
+
+
+def record_query(seconds):
+    """Count a query of the current request."""
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is not None:
+        recorder.queries += 1
+        recorder.query_seconds += seconds
+
+
+class CountingCursorWrapper(CursorDebugWrapper):
+    """Debug cursor which also reports its queries to the request recorder."""
+
+    def execute(self, sql, params=None):
+        started = perf_counter()
+        try:
+            return super(CountingCursorWrapper, self).execute(sql, params)
+        finally:
+            record_query(perf_counter() - started)
+
+    def executemany(self, sql, param_list):
+        started = perf_counter()
+        try:
+            return super(CountingCursorWrapper, self).executemany(sql, param_list)
+        finally:
+            record_query(perf_counter() - started)
+
+
+def count_queries():
+    """Make the connections of this thread count their queries; return the function undoing it."""
+    saved = []
+    for connection in connections.all():
+        saved.append((connection, connection.force_debug_cursor))
+        connection.force_debug_cursor = True
+        connection.make_debug_cursor = lambda cursor, connection=connection: CountingCursorWrapper(cursor, connection)
+
+    def restore():
+        for connection, force_debug_cursor in saved:
+            connection.force_debug_cursor = force_debug_cursor
+            del connection.make_debug_cursor
+
+    return restore
+
+
+class Histogram(object):
+    """Counts of durations per bucket of ``BUCKETS``."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.queries = 0
+
+    def observe(self, milliseconds, queries):
+        self.counts[bisect.bisect_left(BUCKETS, milliseconds)] += 1
+        self.count += 1
+        self.sum += milliseconds
+        self.queries += queries
+
+    def snapshot(self):
+        """Buckets keyed by their upper bound, with the totals."""
+        buckets = OrderedDict((str(bound), count) for bound, count in zip(BUCKETS, self.counts))
+        buckets['+Inf'] = self.counts[-1]
+        return {'buckets': buckets, 'count': self.count, 'sum_ms': self.sum, 'queries': self.queries}
+
+
+def observe(endpoint, recorder):
+    """Add the phases of a finished request to the histograms of its endpoint."""
+    samples = list(recorder.phases.items())
+    samples.append(('total', (recorder.seconds, recorder.queries)))
+
+    with _histograms_lock:
+        histograms = _histograms.setdefault(endpoint, OrderedDict())
+        for name, (seconds, queries) in samples:
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = Histogram()
+            histogram.observe(seconds * 1000, queries)
+
+
+def api_metrics():
+    """Return the histograms of every endpoint served by this process, by phase."""
+    with _histograms_lock:
+        return dict(
+            (endpoint, dict((name, histogram.snapshot()) for name, histogram in histograms.items()))
+            for endpoint, histograms in _histograms.items())
+
+
+def reset_api_metrics():
+    """Forget the histograms."""
+    with _histograms_lock:
+        _histograms.clear()
+
+
+class InstrumentedMixin(object):
+    """Record the phases of the requests to a resource when ``API_INSTRUMENTATION`` is on."""
+
+    def wrap_view(self, view):
+        wrapped = super(InstrumentedMixin, self).wrap_view(view)
+        resource_name = self._meta.resource_name
+
+        @csrf_exempt
+        def wrapper(request, *args, **kwargs):
+            # Requests dispatched from an instrumented request count in that one.
+            if not instrumentation_enabled() or getattr(_local, 'recorder', None) is not None:
+                return wrapped(request, *args, **kwargs)
+
+            recorder = _local.recorder = Recorder()
+            restore = count_queries()
+            try:
+                response = wrapped(request, *args, **kwargs)
+            finally:
+                _local.recorder = None
+                restore()
+
+            recorder.finish()
+            observe('{0} {1}/{2}'.format(request.method, resource_name, view), recorder)
+            response['Server-Timing'] = recorder.server_timing()
+            return response
+
+        return wrapper
+
+    def is_authenticated(self, request):
+        with phase('auth'):
+            return super(InstrumentedMixin, self).is_authenticated(request)
+
+    def throttle_check(self, request):
+        with phase('throttle'):
+            return super(InstrumentedMixin, self).throttle_check(request)
+
+    def deserialize(self, request, data, format='application/json'):
+        with phase('deserialize'):
+            return super(InstrumentedMixin, self).deserialize(request, data, format)
+
+    def obj_get_list(self, bundle, **kwargs):
+        with phase('fetch'):
+            return super(InstrumentedMixin, self).obj_get_list(bundle, **kwargs)
+
+    def obj_get(self, bundle, **kwargs):
+        with phase('fetch'):
+            return super(InstrumentedMixin, self).obj_get(bundle, **kwargs)
+
+    def full_dehydrate(self, bundle, for_list=False):
+        with phase('dehydrate'):
+            return super(InstrumentedMixin, self).full_dehydrate(bundle, for_list)
+
+    def serialize(self, request, data, format, options=None):
+        with phase('serialize'):
+            return super(InstrumentedMixin, self).serialize(request, data, format, options)
@@ -0,0 +1,46 @@
+"""Batched loading of the objects behind the relations of a page."""
+
+
+class RelatedLoader(object):
+    """Request-scoped loader of the objects behind foreign keys.
+
+    ``load`` collects the ids a foreign key needs for a list of objects,
+    resolves the ones not loaded yet during the request with one ``in_bulk``
+    query per related model, and fills the relation cache of every object so
+    that reading the attribute does not query again.
+    """
+
+    def __init__(self):
+        self.loaded = {}
+
+    @classmethod
+    def for_request(cls, request):
+        """Return the loader of a request, creating it on first use."""
+        loader = getattr(request, '_related_loader', None)
+        if loader is None:
+            loader = cls()
+            if request is not None:
+                request._related_loader = loader
+        return loader
+
+    def load(self, objects, field_name):
+        """Attach the related objects of the ``field_name`` foreign key to the objects."""
+        if not objects:
+            return
+
+        field = objects[0]._meta.get_field(field_name)
+        model = field.rel.to
+        cache_name = field.get_cache_name()
+        known = self.loaded.setdefault(model, {})
+
+        pending = [obj for obj in objects if not hasattr(obj, cache_name)]
+        missing = set(getattr(obj, field.attname) for obj in pending) - set(known)
+        missing.discard(None)
+
+        if missing:
+            known.update(model._default_manager.in_bulk(list(missing)))
+
+        for obj in pending:
+            related_id = getattr(obj, field.attname)
+            if related_id in known:
+                setattr(obj, cache_name, known[related_id])
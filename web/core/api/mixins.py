@@ -0,0 +1,328 @@
+"""Mixins for the API resources."""
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache as default_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.http import HttpResponse
+from tastypie.bundle import Bundle
+
+from web.blog.cache import get_generations, model_generation
+from web.blog.urlbuilder import build_url
+from core.api.cache import GenerationCache
+from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import phase
+from core.api.loaders import RelatedLoader
+
+# Fields requested with ?fields= (None for all of them) and related fields to inline with ?expand=.
+Fieldset = namedtuple('Fieldset', ['fields', 'expand'])
+
+
+def split_param(value):
+    """Names of a comma separated query parameter."""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def foreign_key_fields(resource, fields):
+    """Map the names of the to-one fields backed by a concrete foreign key to that key."""
+    model = resource._meta.object_class
+    names = OrderedDict()
+
+    for name, field in fields:
+        attribute = field.attribute
+        if not getattr(field, 'is_related', False) or field.is_m2m or not isinstance(attribute, str):
+            continue
+        try:
+            model_field = model._meta.get_field(attribute)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and (model_field.many_to_one or model_field.one_to_one):
+            names[name] = attribute
+
+    return names
+
+
+class ResponseCacheMixin(object):
+    """Serve repeated GET lists and details straight from the resource's GenerationCache.
+
+    Authentication and throttling still run; the ORM and the serializer are
+    skipped until a model the resource reads is saved or deleted.
+    """
+
+    def get_list(self, request, **kwargs):
+        """Cached get_list."""
+        return self.cached_response('list', request, kwargs, super(ResponseCacheMixin, self).get_list)
+
+    def get_detail(self, request, **kwargs):
+        """Cached get_detail."""
+        return self.cached_response('detail', request, kwargs, super(ResponseCacheMixin, self).get_detail)
+
+    def cached_response(self, request_type, request, kwargs, view):
+        """Return the cached response of the request, or build and cache it with the view."""
+        cache = self._meta.cache
+        if not isinstance(cache, GenerationCache):
+            return view(request, **kwargs)
+
+        format = self.determine_format(request)
+        key = cache.response_key(self._meta.resource_name, request_type, request, kwargs, format)
+        cached = cache.get(key)
+
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, **kwargs)
+
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, (response.content, response['Content-Type']))
+
+        return response
+
+
+class BundleCacheMixin(object):
+    """Reuse the dehydrated data of objects which did not change since they were last dehydrated.
+
+    The data of every object is cached under ``(resource, variant, pk, version)``,
+    ``version`` being the ``bundle_version_field`` of the object. A page costs
+    one multi-get; only the misses go through ``full_dehydrate``, after their
+    foreign keys are resolved together by the request's ``RelatedLoader``.
+    """
+
+    # Field changing on every save of the object.
+    bundle_version_field = 'modified_date'
+
+    # Seconds; saves through QuerySet.update() keep the version, this bounds them.
+    bundle_cache_timeout = 3600
+
+    def get_list(self, request, **kwargs):
+        """Returns a serialized list of resources, dehydrated through ``dehydrate_objects``."""
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        paginator = self._meta.paginator_class(
+            request.GET, sorted_objects, resource_uri=self.get_resource_uri(), limit=self._meta.limit,
+            max_limit=self._meta.max_limit, collection_name=self._meta.collection_name)
+        to_be_serialized = paginator.page()
+
+        collection_name = self._meta.collection_name
+        to_be_serialized[collection_name] = self.dehydrate_objects(
+            to_be_serialized[collection_name], request, for_list=True)
+        to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
+        return self.create_response(request, to_be_serialized)
+
+    def bundle_cache_variant(self, request, for_list):
+        """Part of the key for everything besides the object changing the dehydrated data."""
+        return 'list' if for_list else 'detail'
+
+    def bundle_cache_key(self, obj, variant):
+        """Key of the dehydrated data of an object, None when it has no version."""
+        version = getattr(obj, self.bundle_version_field, None)
+        if obj.pk is None or version is None:
+            return None
+        return 'bundle:{0}:{1}:{2}:{3}'.format(self._meta.resource_name, variant, obj.pk, version.isoformat())
+
+    def selected_fields(self, request):
+        """``(name, field)`` of the fields to dehydrate for the request."""
+        return list(self.fields.items())
+
+    def load_related(self, objects, request):
+        """Resolve the to-one relations of the objects with one query per related model."""
+        loader = RelatedLoader.for_request(request)
+        for attribute in foreign_key_fields(self, self.selected_fields(request)).values():
+            loader.load(objects, attribute)
+
+    def dehydrate_objects(self, objects, request, for_list=True):
+        """Return the dehydrated bundles of the objects, from the cache where possible."""
+        # Pages are lazy querysets, their SELECT runs here.
+        with phase('fetch'):
+            objects = list(objects)
+        variant = self.bundle_cache_variant(request, for_list)
+        keys = [self.bundle_cache_key(obj, variant) for obj in objects]
+        cached = default_cache.get_many([key for key in keys if key is not None])
+
+        misses = [obj for obj, key in zip(objects, keys) if key not in cached]
+        self.load_related(misses, request)
+
+        bundles = []
+        missed = {}
+
+        for obj, key in zip(objects, keys):
+            if key in cached:
+                bundles.append(Bundle(obj=obj, data=cached[key], request=request))
+                continue
+
+            bundle = self.full_dehydrate(self.build_bundle(obj=obj, request=request), for_list=for_list)
+            bundles.append(bundle)
+            if key is not None:
+                # Simplified, so that nested bundles pickle and hits skip that step of serialization.
+                missed[key] = self._meta.serializer.to_simple(bundle.data, {})
+
+        if missed:
+            default_cache.set_many(missed, self.bundle_cache_timeout)
+
+        return bundles
+
+
+class FieldsetMixin(object):
+    """Sparse fieldsets and inlined relations.
+
+    ``?fields=title,slug,resource_uri`` dehydrates only those fields and,
+    on GET, loads only their columns. ``?expand=user`` inlines the related
+    object of a to-one field instead of its URI. Both parameters belong to
+    the first resource handling the request, the resources it inlines
+    dehydrate all their fields.
+    """
+
+    def fieldset(self, request):
+        """Return the Fieldset of the request, None when the request belongs to another resource."""
+        if request is None:
+            return None
+
+        owner = getattr(request, '_fieldset_owner', None)
+        if owner is None:
+            request._fieldset = self.parse_fieldset(request)
+            request._fieldset_owner = self._meta.resource_name
+        elif owner != self._meta.resource_name:
+            return None
+
+        return request._fieldset
+
+    def parse_fieldset(self, request):
+        """Read and check ``fields`` and ``expand``."""
+        fields = split_param(request.GET.get('fields'))
+        expand = split_param(request.GET.get('expand'))
+
+        unknown = [name for name in fields if name not in self.fields]
+        if unknown:
+            raise CustomBadRequest(code='invalid_fields', message='Unknown fields: {0}.'.format(', '.join(unknown)))
+
+        expandable = foreign_key_fields(self, self.fields.items())
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            raise CustomBadRequest(
+                code='invalid_expand', message='Fields which cannot be expanded: {0}.'.format(', '.join(unknown)))
+
+        return Fieldset(fields=frozenset(fields + expand) if fields else None, expand=frozenset(expand))
+
+    def selected_fields(self, request):
+        """``(name, field)`` of the fields to dehydrate for the request."""
+        fieldset = self.fieldset(request)
+        if fieldset is None or fieldset.fields is None:
+            return list(self.fields.items())
+        return [(name, field) for name, field in self.fields.items() if name in fieldset.fields]
+
+    def fieldset_columns(self, request):
+        """Model fields the selected fields read, None when some of them cannot be told."""
+        fieldset = self.fieldset(request)
+        if fieldset is None or fieldset.fields is None:
+            return None
+
+        opts = self._meta.object_class._meta
+        columns = set([opts.pk.name])
+
+        for name, field in self.selected_fields(request):
+            if name == 'resource_uri':
+                if self._meta.detail_uri_name != 'pk':
+                    columns.add(self._meta.detail_uri_name)
+                continue
+            if not isinstance(field.attribute, str) or hasattr(self, 'dehydrate_{0}'.format(name)):
+                return None
+            try:
+                model_field = opts.get_field(field.attribute)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete:
+                return None
+            columns.add(model_field.name)
+
+        # The keys of keyset pages and of the bundle cache are read from every object.
+        names = [name.lstrip('-') for name in opts.ordering]
+        if getattr(self, 'bundle_version_field', None):
+            names.append(self.bundle_version_field)
+        for name in names:
+            try:
+                columns.add(opts.get_field(name).name)
+            except FieldDoesNotExist:
+                pass
+
+        return sorted(columns)
+
+    def get_object_list(self, request):
+        """Load only the columns of the selected fields on GET."""
+        object_list = super(FieldsetMixin, self).get_object_list(request)
+
+        if request is not None and request.method == 'GET':
+            columns = self.fieldset_columns(request)
+            if columns:
+                object_list = object_list.only(*columns)
+
+        return object_list
+
+    def bundle_cache_variant(self, request, for_list):
+        """The fieldset changes the dehydrated data, and so do the inlined objects."""
+        variant = super(FieldsetMixin, self).bundle_cache_variant(request, for_list)
+        fieldset = self.fieldset(request)
+
+        if fieldset is not None and (fieldset.fields is not None or fieldset.expand):
+            variant = '{0}:{1}:{2}'.format(
+                variant, ','.join(sorted(fieldset.fields or ['*'])), ','.join(sorted(fieldset.expand)))
+
+        if fieldset is not None and fieldset.expand:
+            # The version of the object does not change with the objects it inlines; their generations do.
+            variant = '{0}:{1}'.format(variant, self.expanded_generations(fieldset.expand))
+
+        return variant
+
+    def expanded_generations(self, expand):
+        """Current generations of the models of the expanded fields, as one token."""
+        attributes = foreign_key_fields(self, self.fields.items())
+        opts = self._meta.object_class._meta
+        names = [model_generation(opts.get_field(attributes[name]).related_model) for name in sorted(expand)]
+        return '.'.join(str(value) for value in get_generations(names))
+
+    def full_dehydrate(self, bundle, for_list=False):
+        """Dehydrate the selected fields, inlining the expanded ones."""
+        data = bundle.data
+        fieldset = self.fieldset(bundle.request)
+        expand = fieldset.expand if fieldset is not None else ()
+
+        for field_name, field_object in self.selected_fields(bundle.request):
+            field_use_in = field_object.use_in
+            if callable(field_use_in):
+                if not field_use_in(bundle):
+                    continue
+            elif field_use_in not in ['all', 'list' if for_list else 'detail']:
+                continue
+
+            if field_object.dehydrated_type == 'related':
+                field_object.api_name = self._meta.api_name
+                field_object.resource_name = self._meta.resource_name
+
+            if field_name in expand:
+                data[field_name] = self.expand_related(bundle, field_object, for_list)
+            else:
+                data[field_name] = field_object.dehydrate(bundle, for_list=for_list)
+
+            method = getattr(self, 'dehydrate_{0}'.format(field_name), None)
+            if method:
+                data[field_name] = method(bundle)
+
+        return self.dehydrate(bundle)
+
+    def expand_related(self, bundle, field_object, for_list):
+        """Dehydrate the object behind a to-one field with its own resource."""
+        related = getattr(bundle.obj, field_object.attribute, None)
+        if related is None:
+            return None
+
+        resource = field_object.get_related_resource(related)
+        return resource.full_dehydrate(resource.build_bundle(obj=related, request=bundle.request), for_list=for_list)
+
+
+class UrlBuilderMixin(object):
+    """Build the resource URIs from compiled route templates instead of ``reverse()``."""
+
+    def _build_reverse_url(self, name, args=None, kwargs=None):
+        if args:
+            return super(UrlBuilderMixin, self)._build_reverse_url(name, args=args, kwargs=kwargs)
+        return build_url(name, **(kwargs or {}))
@@ -1,23 +1,197 @@
 """Implementing your own paginator."""
+import json
+
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import Q
+from django.utils.http import urlencode
 from tastypie.paginator import Paginator
 
+from core.api.exceptions import CustomBadRequest
+from core.api.instrumentation import phase
+
+KEYSET_CURSOR_SALT = 'core.api.paginators.keyset'
+
+
+def estimated_count(queryset):
+    """Number of rows the database planner expects for a queryset, None when it cannot tell."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    if not isinstance(plan, list):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
 
 class PageNumberPaginator(Paginator):
     """Adding a page number to the output."""
 
     def page(self):
         """The place to implementing the page-related calculations."""
-        output = super(PageNumberPaginator, self).page()
+        with phase('paginate'):
+            output = super(PageNumberPaginator, self).page()
+        with phase('fetch'):
+            output[self.collection_name] = list(output[self.collection_name])
         output['page_number'] = self.offset // self.limit + 1
         return output
 
 
-class EntryPaginator(Paginator):
-    """Adding some fields to the output."""
+class KeysetPaginator(Paginator):
+    """Pages following the ordering of the objects, without COUNT(*) nor OFFSET.
+
+    The ordering of the queryset, completed with the primary key, is the
+    key of the pages: ``next`` and ``previous`` are URIs with an opaque
+    ``cursor`` holding the key of the last or first object of the page, and
+    the following page is read with ``WHERE key > cursor``. Every page costs
+    the same as the first. The ordering fields must not be null.
+
+    With ``total=estimated`` in the query string, ``meta.estimated_total_count``
+    is the number of rows the database planner expects, or null when the
+    database cannot tell.
+    """
+
+    def ordering(self):
+        """``(field name, descending)`` pairs of the ordering, ending with the primary key."""
+        query = self.objects.query
+        opts = self.objects.model._meta
+        names = list(query.order_by) or (list(opts.ordering) if query.default_ordering else [])
+
+        keys = []
+        for name in names:
+            if not isinstance(name, str) or name == '?':
+                raise ImproperlyConfigured('Keyset pagination needs an ordering on fields, not {0!r}.'.format(name))
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            if name == 'pk':
+                name = opts.pk.name
+            if '__' in name:
+                raise ImproperlyConfigured('Keyset pagination cannot order on {0}.'.format(name))
+            keys.append((opts.get_field(name), descending))
+
+        if not any(field.primary_key for field, _ in keys):
+            keys.append((opts.pk, False))
+
+        return keys
+
+    def ordering_digest(self, keys):
+        """Identify an ordering, so that a cursor is only valid for the ordering it came from."""
+        return ','.join(('-' if descending else '') + field.name for field, descending in keys)
+
+    def dump_cursor(self, keys, direction, obj):
+        """Sign the key of an object, and the direction to read in, into an opaque token."""
+        values = []
+        for field, _ in keys:
+            value = getattr(obj, field.attname)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+
+        data = {'o': self.ordering_digest(keys), 'd': direction, 'v': values}
+        return signing.dumps(data, salt=KEYSET_CURSOR_SALT, compress=True)
+
+    def load_cursor(self, keys, token):
+        """Return the direction and the key values of a cursor."""
+        try:
+            data = signing.loads(token, salt=KEYSET_CURSOR_SALT)
+        except signing.BadSignature:
+            raise CustomBadRequest(code='invalid_cursor', message='The cursor is not valid.')
+
+        if (not isinstance(data, dict) or data.get('o') != self.ordering_digest(keys) or
+                data.get('d') not in ('next', 'previous') or len(data.get('v') or ()) != len(keys)):
+            raise CustomBadRequest(code='invalid_cursor', message='The cursor belongs to another list.')
+
+        return data['d'], [field.to_python(value) for (field, _), value in zip(keys, data['v'])]
+
+    def keyset_filter(self, keys, values, backwards):
+        """Condition selecting the objects after (or before) the given key values."""
+        conditions = []
+        equal = {}
+
+        for (field, descending), value in zip(keys, values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            beyond = dict(equal)
+            beyond['{0}__{1}'.format(field.attname, lookup)] = value
+            conditions.append(Q(**beyond))
+            equal[field.attname] = value
+
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition |= other
+        return condition
+
+    def cursor_uri(self, cursor):
+        """URI of the page a cursor points to."""
+        if self.resource_uri is None:
+            return None
+
+        params = dict((key, value) for key, value in self.request_data.items() if key != 'offset')
+        params['cursor'] = cursor
+        params['limit'] = self.get_limit()
+        return '{0}?{1}'.format(self.resource_uri, urlencode(sorted(params.items())))
+
+    def page(self):
+        """Read the page the cursor points to."""
+        limit = self.get_limit()
+        keys = self.ordering()
+        token = self.request_data.get('cursor')
+        direction = 'next'
+        objects = self.objects
+
+        if token:
+            direction, values = self.load_cursor(keys, token)
+            objects = objects.filter(self.keyset_filter(keys, values, backwards=direction == 'previous'))
+
+        if direction == 'previous':
+            objects = objects.order_by(*[('' if descending else '-') + field.name for field, descending in keys])
+
+        with phase('fetch'):
+            rows = list(objects[:limit + 1]) if limit else list(objects)
+        more = bool(limit) and len(rows) > limit
+        rows = rows[:limit] if limit else rows
+
+        if direction == 'previous':
+            rows.reverse()
+
+        has_next = more if direction == 'next' else bool(token)
+        has_previous = more if direction == 'previous' else bool(token)
+
+        meta = {
+            'limit': limit,
+            'next': self.cursor_uri(self.dump_cursor(keys, 'next', rows[-1])) if rows and has_next else None,
+            'previous': (
+                self.cursor_uri(self.dump_cursor(keys, 'previous', rows[0])) if rows and has_previous else None),
+        }
+
+        if self.request_data.get('total') == 'estimated':
+            meta['estimated_total_count'] = estimated_count(self.objects)
+
+        return {
+            self.collection_name: rows,
+            'meta': meta,
+        }
+
+
+class EntryPaginator(KeysetPaginator):
+    """Adding some fields to the output.
+
+    Pages are read with ``offset`` and counted as before; clients opt in to
+    keyset pages with a ``cursor`` parameter, empty for the first page.
+    """
 
     def page(self):
         """The place to implementing the page-related calculations."""
-        output = super(EntryPaginator, self).page()
+        if 'cursor' in self.request_data:
+            output = super(EntryPaginator, self).page()
+        else:
+            with phase('paginate'):
+                output = Paginator.page(self)
+            with phase('fetch'):
+                output[self.collection_name] = list(output[self.collection_name])
 
         # First keep a reference
         output['pagination'] = output['meta']
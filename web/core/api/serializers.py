@@ -0,0 +1,216 @@
+"""Serializer of the API resources.
+
+tastypie's ``to_simple`` walks the MRO of every value it meets and hands
+the result to ``json.dumps`` with ``DjangoJSONEncoder``. ``FastSerializer``
+dispatches on the exact type of each value through a cached table, formats
+datetimes with a function chosen once per serializer and encodes with ujson
+or simplejson when one of them is installed. ujson rounds floats (to 9
+decimals by default, 15 at most), so documents holding floats, such as
+scores, are encoded by the others.
+
+It also speaks MessagePack (``application/x-msgpack``, or ``?format=msgpack``)
+when msgpack is installed: the same simplified data, packed in binary.
+"""
+import datetime
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.encoding import force_text
+from tastypie.bundle import Bundle
+from tastypie.exceptions import BadRequest
+from tastypie.serializers import Serializer
+from tastypie.utils import format_date, format_datetime, format_time
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK = 'application/x-msgpack'
+
+
+def dumps(data, exact_floats=False):
+    """Encode already simplified data, keys sorted, with the fastest encoder available.
+
+    With ``exact_floats``, ujson is not used: it would round them.
+    """
+    if ujson is not None and not exact_floats:
+        return ujson.dumps(data, ensure_ascii=False, sort_keys=True, escape_forward_slashes=False)
+    if simplejson is not None:
+        return simplejson.dumps(data, ensure_ascii=False, sort_keys=True)
+    return json.dumps(data, ensure_ascii=False, sort_keys=True)
+
+
+def loads(content):
+    """Decode a JSON document."""
+    if ujson is not None:
+        return ujson.loads(content, precise_float=True)
+    return json.loads(content)
+
+
+def packb(data):
+    """Encode already simplified data as MessagePack."""
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def unpackb(content):
+    """Decode a MessagePack document."""
+    return msgpack.unpackb(content, raw=False)
+
+
+class FastSerializer(Serializer):
+    """Drop-in replacement for tastypie's ``Serializer``, with the same output values.
+
+    Without ``formats``, it offers ``TASTYPIE_DEFAULT_FORMATS`` and MessagePack.
+    """
+
+    content_types = dict(Serializer.content_types, msgpack=MSGPACK)
+
+    def __init__(self, formats=None, *args, **kwargs):
+        if formats is None:
+            formats = list(getattr(settings, 'TASTYPIE_DEFAULT_FORMATS', Serializer.formats)) + ['msgpack']
+        if msgpack is None:
+            formats = [format for format in formats if format != 'msgpack']
+
+        super(FastSerializer, self).__init__(formats, *args, **kwargs)
+
+        if msgpack is None:
+            # Unsupported, rather than failing on the missing module.
+            self._to_methods.pop(MSGPACK, None)
+            self._from_methods.pop(MSGPACK, None)
+
+        self._format_datetime = self._datetime_formatter()
+        self._format_date = format_date if self.datetime_formatting == 'rfc-2822' else datetime.date.isoformat
+        self._format_time = self._time_formatter()
+        self._handlers = {
+            type(None): self._as_is,
+            int: self._as_is,
+            float: self._simplify_float,
+            bool: self._as_is,
+            str: self._as_is,
+            dict: self._simplify_dict,
+            list: self._simplify_list,
+            tuple: self._simplify_list,
+            Bundle: self._simplify_bundle,
+            datetime.datetime: lambda data, options: self._format_datetime(data),
+            datetime.date: lambda data, options: self._format_date(data),
+            datetime.time: lambda data, options: self._format_time(data),
+            Decimal: self._as_text,
+        }
+
+    def _datetime_formatter(self):
+        """Return the datetime formatting function of ``datetime_formatting``."""
+        formatting = self.datetime_formatting
+        default_timezone = timezone.get_default_timezone() if settings.USE_TZ else None
+
+        def make_naive(data):
+            if default_timezone is not None and data.tzinfo is not None and data.utcoffset() is not None:
+                return timezone.make_naive(data, default_timezone)
+            return data
+
+        if formatting == 'rfc-2822':
+            return lambda data: format_datetime(make_naive(data))
+        if formatting == 'iso-8601-strict':
+            return lambda data: make_naive(data).replace(microsecond=0).isoformat()
+        return lambda data: make_naive(data).isoformat()
+
+    def _time_formatter(self):
+        """Return the time formatting function of ``datetime_formatting``."""
+        if self.datetime_formatting == 'rfc-2822':
+            return format_time
+        if self.datetime_formatting == 'iso-8601-strict':
+            return lambda data: data.replace(microsecond=0).isoformat()
+        return datetime.time.isoformat
+
+    @staticmethod
+    def _as_is(data, options):
+        return data
+
+    @staticmethod
+    def _simplify_float(data, options):
+        options['exact_floats'] = True
+        return data
+
+    @staticmethod
+    def _as_text(data, options):
+        return force_text(data)
+
+    def _simplify_dict(self, data, options):
+        handlers = self._handlers
+        simple = {}
+        for key, value in data.items():
+            handler = handlers.get(type(value)) or self._handler(type(value))
+            simple[key] = handler(value, options)
+        return simple
+
+    def _simplify_list(self, data, options):
+        handlers = self._handlers
+        simple = []
+        for item in data:
+            handler = handlers.get(type(item)) or self._handler(type(item))
+            simple.append(handler(item, options))
+        return simple
+
+    def _simplify_bundle(self, data, options):
+        return self._simplify_dict(data.data, options)
+
+    def _handler(self, data_type):
+        """Find the handler of a type through its MRO, once per type."""
+        for base in data_type.__mro__[1:]:
+            handler = self._handlers.get(base)
+            if handler is not None:
+                break
+        else:
+            handler = self._as_text
+
+        self._handlers[data_type] = handler
+        return handler
+
+    def to_simple(self, data, options):
+        """Bring the data down to JSON types in a single pass."""
+        handler = self._handlers.get(type(data))
+        if handler is None:
+            handler = self._handler(type(data))
+        return handler(data, options)
+
+    def to_json(self, data, options=None):
+        """Given some Python data, produces JSON output."""
+        options = dict(options or {})
+        simple = self.to_simple(data, options)
+        return dumps(simple, exact_floats=options.get('exact_floats', False))
+
+    def from_json(self, content):
+        """Given some JSON data, returns a Python dictionary of the decoded data."""
+        try:
+            return loads(content)
+        except ValueError:
+            raise BadRequest('Request is not valid JSON.')
+
+    def to_msgpack(self, data, options=None):
+        """Given some Python data, produces MessagePack output."""
+        return packb(self.to_simple(data, dict(options or {})))
+
+    def from_msgpack(self, content):
+        """Given some MessagePack data, returns a Python dictionary of the decoded data."""
+        try:
+            return unpackb(content)
+        except (ValueError, TypeError, msgpack.exceptions.UnpackException):
+            raise BadRequest('Request is not valid MessagePack.')
+
+    def deserialize(self, content, format='application/json'):
+        """Hand MessagePack bodies over as bytes; tastypie decodes every body to text first."""
+        if format.split(';')[0].strip() == MSGPACK and MSGPACK in self._from_methods:
+            return self.from_msgpack(content)
+        return super(FastSerializer, self).deserialize(content, format)
@@ -0,0 +1,78 @@
+import json
+from django.test import RequestFactory, TestCase, override_settings
+from tastypie.http import HttpUnauthorized
+from tastypie.test import ResourceTestCaseMixin
+from web.users.models import User
+from core.api.authentication import CachedApiKeyAuthentication, CredentialCache, issue_token
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-test'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class CachedApiKeyAuthenticationTest(TestCase):
+    """API keys and tokens are verified once, until the credentials change."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user('apikey', 'apikey@gmail.com', 'abc@123')
+        self.auth = CachedApiKeyAuthentication(credentials=CredentialCache(local_timeout=0))
+        self.factory = RequestFactory()
+
+    def request(self, authorization):
+        return self.factory.get('/api/v1/entry/', HTTP_AUTHORIZATION=authorization)
+
+    def test_api_key_is_cached(self):
+        header = 'ApiKey apikey:{0}'.format(self.user.api_key.key)
+        self.assertIs(self.auth.is_authenticated(self.request(header)), True)
+
+        request = self.request(header)
+        with self.assertNumQueries(0):
+            self.assertIs(self.auth.is_authenticated(request), True)
+        self.assertEqual(request.user.pk, self.user.pk)
+
+    def test_wrong_api_key(self):
+        self.assertIsInstance(self.auth.is_authenticated(self.request('ApiKey apikey:nope')), HttpUnauthorized)
+
+    def test_new_api_key_invalidates(self):
+        header = 'ApiKey apikey:{0}'.format(self.user.api_key.key)
+        self.auth.is_authenticated(self.request(header))
+        api_key = self.user.api_key
+        api_key.key = api_key.generate_key()
+        api_key.save()
+        self.assertIsInstance(self.auth.is_authenticated(self.request(header)), HttpUnauthorized)
+
+    def test_password_change_invalidates_tokens(self):
+        header = 'Bearer {0}'.format(issue_token(self.user))
+        self.assertIs(self.auth.is_authenticated(self.request(header)), True)
+
+        self.user.set_password('def@456')
+        self.user.save()
+        self.assertIsInstance(self.auth.is_authenticated(self.request(header)), HttpUnauthorized)
+
+    def test_expired_token(self):
+        header = 'Bearer {0}'.format(issue_token(self.user, max_age=-1))
+        self.assertIsInstance(self.auth.is_authenticated(self.request(header)), HttpUnauthorized)
+
+
+@override_settings(CACHES=LOCMEM)
+class TokenTest(ResourceTestCaseMixin, TestCase):
+    """Tokens of /api/v1/user_profile/token/."""
+
+    url = '/api/v1/user_profile/token/'
+
+    def setUp(self):
+        super(TokenTest, self).setUp()
+        self.user = User.objects.create_user('token', 'token@gmail.com', 'abc@123')
+
+    def test_issued_with_the_password_or_the_api_key(self):
+        for authentication in (self.create_basic(username='token', password='abc@123'),
+                               self.create_apikey(username='token', api_key=self.user.api_key.key)):
+            response = self.api_client.post(self.url, format='json', data={}, authentication=authentication)
+            self.assertHttpOK(response)
+            self.assertIn('token', json.loads(response.content.decode('utf-8')))
+
+    def test_not_renewed_with_a_token(self):
+        response = self.api_client.post(
+            self.url, format='json', data={}, authentication='Bearer {0}'.format(issue_token(self.user)))
+        self.assertHttpUnauthorized(response)
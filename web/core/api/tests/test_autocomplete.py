@@ -0,0 +1,43 @@
+import json
+from unittest import mock
+from django.test import TestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.search_backends import SearchUnavailable
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-autocomplete-test'}}
+
+URL = '/api/v1/all_entries/autocomplete/'
+
+
+class UnavailableSearch(object):
+    """SearchQuerySet of a backend which is down."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def __getitem__(self, key):
+        # Slicing a SearchQuerySet runs the search.
+        raise SearchUnavailable('Search is failing, the circuit is open.')
+
+    def __iter__(self):
+        raise SearchUnavailable('Search is failing, the circuit is open.')
+
+
+@override_settings(CACHES=LOCMEM)
+class AutocompleteTest(ResourceTestCaseMixin, TestCase):
+    """Suggestions of /api/v1/all_entries/autocomplete/."""
+
+    def test_invalid_limit(self):
+        for limit in ('0', '-3', 'ten'):
+            response = self.api_client.get(URL, data={'q': 'django', 'limit': limit})
+            self.assertHttpBadRequest(response)
+
+    @mock.patch('core.api.collection.search.resources.SearchQuerySet', UnavailableSearch)
+    def test_fallback_without_backend(self):
+        with mock.patch('core.api.collection.search.resources.suggestions') as suggestions:
+            suggestions.suggest.return_value = []
+            response = self.api_client.get(URL, data={'q': 'django', 'limit': '3'})
+
+        self.assertHttpOK(response)
+        self.assertEqual(json.loads(response.content.decode('utf-8'))['suggestions'], [])
+        suggestions.suggest.assert_called_once_with('django', 3)
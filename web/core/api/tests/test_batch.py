@@ -0,0 +1,89 @@
+import datetime
+import json
+from unittest import mock
+from django.test import TestCase, override_settings
+from haystack.signals import BaseSignalProcessor, RealtimeSignalProcessor
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Entry
+from web.users.models import User
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'batch-test'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class EntryBatchTest(ResourceTestCaseMixin, TestCase):
+    """PATCH and DELETE on the entry list."""
+
+    def setUp(self):
+        super(EntryBatchTest, self).setUp()
+        self.user = User.objects.create_user('editor', 'editor@gmail.com', 'abc@123')
+        other = User.objects.create_user('other', 'other@gmail.com', 'abc@123')
+        self.entries = [
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary', created_by=self.user,
+                                 published_date=datetime.datetime(2016, 4, 8))
+            for i in range(4)]
+        self.foreign = Entry.default.create(title='Foreign', text='text', summary='summary', created_by=other)
+
+    def send(self, method, data):
+        return getattr(self.api_client, method)(
+            '/api/v1/entry/', format='json', data=data,
+            authentication=self.create_basic(username='editor', password='abc@123'))
+
+    def test_patch_and_delete(self):
+        response = self.send('patch', {
+            'objects': [
+                {'resource_uri': '/api/v1/entry/{0}/'.format(self.entries[0].pk), 'title': 'Renamed'},
+                {'id': self.entries[1].pk, 'is_published': False},
+            ],
+            'deleted_objects': ['/api/v1/entry/{0}/'.format(self.entries[2].pk)],
+        })
+        self.assertHttpAccepted(response)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {
+            'updated': [self.entries[0].pk, self.entries[1].pk],
+            'deleted': [self.entries[2].pk],
+        })
+        self.assertEqual(Entry.default.get(pk=self.entries[0].pk).title, 'Renamed')
+        self.assertFalse(Entry.default.get(pk=self.entries[1].pk).is_published)
+        self.assertEqual(Entry.default.get(pk=self.entries[1].pk).title, 'Entry 1')
+        self.assertFalse(Entry.default.filter(pk=self.entries[2].pk).exists())
+
+    def test_realtime_processor_without_batch(self):
+        processor = mock.Mock(spec=RealtimeSignalProcessor)
+        with mock.patch('core.api.collection.entries.resources.signal_processor', processor):
+            response = self.send('patch', {'objects': [{'id': self.entries[0].pk, 'title': 'Renamed'}]})
+        self.assertHttpAccepted(response)
+        self.assertEqual(processor.handle_save.call_count, 1)
+
+    def test_signal_processor_without_batch(self):
+        processor = mock.Mock(spec=BaseSignalProcessor)
+        with mock.patch('core.api.collection.entries.resources.signal_processor', processor):
+            response = self.send('patch', {'objects': [{'id': self.entries[0].pk, 'title': 'Renamed'}]})
+        self.assertHttpAccepted(response)
+        self.assertFalse(processor.handle_save.called)
+
+    def test_foreign_entries_change_nothing(self):
+        response = self.send('patch', {
+            'objects': [
+                {'id': self.entries[0].pk, 'title': 'Renamed'},
+                {'id': self.foreign.pk, 'title': 'Mine now'},
+            ],
+        })
+        self.assertHttpBadRequest(response)
+        self.assertEqual(Entry.default.get(pk=self.entries[0].pk).title, 'Entry 0')
+
+    def test_invalid_changes_change_nothing(self):
+        response = self.send('patch', {
+            'objects': [
+                {'id': self.entries[0].pk, 'title': 'Renamed'},
+                {'id': self.entries[1].pk, 'published_date': 'not a date'},
+            ],
+        })
+        self.assertHttpBadRequest(response)
+        self.assertIn(str(self.entries[1].pk), json.loads(response.content.decode('utf-8'))['error']['details'])
+        self.assertEqual(Entry.default.get(pk=self.entries[0].pk).title, 'Entry 0')
+
+    def test_delete_list(self):
+        # The test client sends DELETE data as it is.
+        response = self.send('delete', json.dumps({'objects': [self.entries[0].pk, self.entries[3].pk]}))
+        self.assertHttpAccepted(response)
+        self.assertEqual(Entry.default.filter(created_by=self.user).count(), 2)
@@ -0,0 +1,78 @@
+import datetime
+import json
+from django.test import TransactionTestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Entry
+from web.users.models import User
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'batch-requests-test'}}
+
+
+# The GETs of a batch run on other threads, with their own database connections.
+@override_settings(CACHES=LOCMEM)
+class BatchRequestsTest(ResourceTestCaseMixin, TransactionTestCase):
+    """Sub-requests of /api/v1/batch/."""
+
+    def setUp(self):
+        super(BatchRequestsTest, self).setUp()
+        self.user = User.objects.create_user('batcher', 'batcher@gmail.com', 'abc@123')
+        self.entries = [
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary', created_by=self.user,
+                                 published_date=datetime.datetime(2016, 4, 8))
+            for i in range(3)]
+
+    def send(self, calls):
+        response = self.api_client.post(
+            '/api/v1/batch/', format='json', data={'requests': calls},
+            authentication=self.create_basic(username='batcher', password='abc@123'))
+        return response
+
+    def test_responses_in_order(self):
+        response = self.send([
+            {'method': 'GET', 'path': '/api/v1/user_profile/'},
+            {'method': 'GET', 'path': '/api/v1/entry/{0}/'.format(self.entries[0].pk)},
+            {'method': 'PATCH', 'path': '/api/v1/entry/',
+             'body': {'objects': [{'id': self.entries[1].pk, 'title': 'Renamed'}]}},
+            {'method': 'GET', 'path': '/api/v1/entry/{0}/?fields=title'.format(self.entries[1].pk)},
+        ])
+        self.assertHttpOK(response)
+        responses = json.loads(response.content.decode('utf-8'))['responses']
+
+        self.assertEqual([item['status'] for item in responses], [200, 200, 202, 200])
+        self.assertEqual(responses[0]['body']['username'], 'batcher')
+        self.assertEqual(responses[1]['body']['title'], 'Entry 0')
+        self.assertEqual(responses[2]['body'], {'updated': [self.entries[1].pk], 'deleted': []})
+        self.assertEqual(responses[3]['body']['title'], 'Renamed')
+
+    def test_reads_after_a_write_see_it(self):
+        response = self.send([
+            {'method': 'PATCH', 'path': '/api/v1/entry/',
+             'body': {'objects': [{'id': self.entries[0].pk, 'title': 'Renamed'}]}},
+            {'method': 'GET', 'path': '/api/v1/entry/{0}/?fields=title'.format(self.entries[0].pk)},
+            {'method': 'GET', 'path': '/api/v1/entry-author/batcher/'},
+        ])
+        self.assertHttpOK(response)
+        responses = json.loads(response.content.decode('utf-8'))['responses']
+
+        self.assertEqual([item['status'] for item in responses], [202, 200, 200])
+        self.assertEqual(responses[1]['body']['title'], 'Renamed')
+        self.assertIn('Renamed', [entry['title'] for entry in responses[2]['body']['objects']])
+
+    def test_failures_stay_in_their_response(self):
+        response = self.send([
+            {'method': 'GET', 'path': '/api/v1/entry/0/'},
+            {'method': 'GET', 'path': '/api/v1/nothing/'},
+        ])
+        self.assertHttpOK(response)
+        statuses = [item['status'] for item in json.loads(response.content.decode('utf-8'))['responses']]
+        self.assertEqual(statuses, [404, 404])
+
+    def test_invalid_batches(self):
+        self.assertHttpBadRequest(self.send([]))
+        self.assertHttpBadRequest(self.send([{'method': 'GET', 'path': '/admin/'}]))
+        self.assertHttpBadRequest(self.send([{'method': 'POST', 'path': '/api/v1/batch/'}]))
+        self.assertHttpBadRequest(self.send([{'method': 'GET', 'path': '/api/v1/entry/'}] * 21))
+
+    def test_requires_authentication(self):
+        response = self.api_client.post('/api/v1/batch/', format='json', data={'requests': []})
+        self.assertHttpUnauthorized(response)
@@ -0,0 +1,70 @@
+import datetime
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from tastypie.bundle import Bundle
+from core.api.mixins import BundleCacheMixin
+from core.api.serializers import FastSerializer
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bundle-cache-test'}}
+
+
+class Row(object):
+
+    def __init__(self, pk, modified_date):
+        self.pk = pk
+        self.modified_date = modified_date
+
+
+class FakeResource(BundleCacheMixin):
+    """Dehydrates rows into their pk and version, counting the calls."""
+
+    class _meta:
+        resource_name = 'entry'
+        object_class = None
+        serializer = FastSerializer()
+
+    fields = {}
+
+    def __init__(self):
+        self.dehydrated = []
+
+    def build_bundle(self, obj=None, request=None):
+        return Bundle(obj=obj, request=request)
+
+    def full_dehydrate(self, bundle, for_list=False):
+        self.dehydrated.append(bundle.obj.pk)
+        bundle.data = {'id': bundle.obj.pk, 'modified_date': bundle.obj.modified_date}
+        return bundle
+
+
+@override_settings(CACHES=LOCMEM)
+class BundleCacheTest(SimpleTestCase):
+    """Only new or changed objects are dehydrated again."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.request = RequestFactory().get('/api/v1/entry/')
+        self.resource = FakeResource()
+        self.then = datetime.datetime(2016, 4, 8, 10, 0)
+
+    def test_only_misses_are_dehydrated(self):
+        rows = [Row(1, self.then), Row(2, self.then)]
+        self.resource.dehydrate_objects(rows, self.request)
+        rows[1].modified_date = self.then + datetime.timedelta(seconds=1)
+        bundles = self.resource.dehydrate_objects(rows + [Row(3, self.then)], self.request)
+
+        self.assertEqual(self.resource.dehydrated, [1, 2, 2, 3])
+        self.assertEqual([bundle.data['id'] for bundle in bundles], [1, 2, 3])
+        self.assertEqual(bundles[0].data['modified_date'], '2016-04-08T10:00:00')
+
+    def test_unsaved_objects_are_not_cached(self):
+        rows = [Row(None, self.then)]
+        self.resource.dehydrate_objects(rows, self.request)
+        self.resource.dehydrate_objects(rows, self.request)
+        self.assertEqual(self.resource.dehydrated, [None, None])
+
+    def test_variants_are_cached_apart(self):
+        rows = [Row(1, self.then)]
+        self.resource.dehydrate_objects(rows, self.request, for_list=True)
+        self.resource.dehydrate_objects(rows, self.request, for_list=False)
+        self.assertEqual(self.resource.dehydrated, [1, 1])
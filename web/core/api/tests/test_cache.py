@@ -0,0 +1,81 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from core.api.cache import GenerationCache
+from core.api.mixins import ResponseCacheMixin
+from web.blog.cache import bump_model_generation
+from web.blog.models import Entry
+from web.users.models import User
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-cache-test'}}
+
+
+class FakeResource(object):
+    """Stands in for a ModelResource, counting the responses it builds."""
+
+    class _meta:
+        resource_name = 'entry'
+        cache = GenerationCache(models=[Entry, User])
+
+    def __init__(self):
+        self.built = 0
+
+    def determine_format(self, request):
+        return 'application/json'
+
+    def get_list(self, request, **kwargs):
+        self.built += 1
+        return HttpResponse('{"objects": []}', content_type='application/json')
+
+
+class CachedResource(ResponseCacheMixin, FakeResource):
+    pass
+
+
+@override_settings(CACHES=LOCMEM)
+class GenerationCacheTest(SimpleTestCase):
+    """Responses are reused until a model the resource reads changes."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.factory = RequestFactory()
+        self.resource = CachedResource()
+
+    def test_repeated_list_is_served_from_cache(self):
+        for _ in range(3):
+            response = self.resource.get_list(self.factory.get('/api/v1/entry/', {'limit': 5}))
+        self.assertEqual(self.resource.built, 1)
+        self.assertEqual(response.content, b'{"objects": []}')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_key_normalises_parameters(self):
+        cache = self.resource._meta.cache
+        first = self.factory.get('/api/v1/entry/?limit=5&offset=10&api_key=a')
+        second = self.factory.get('/api/v1/entry/?offset=10&limit=5&api_key=b')
+        other = self.factory.get('/api/v1/entry/?offset=20&limit=5')
+        key = cache.response_key('entry', 'list', first, {}, 'application/json')
+        self.assertEqual(key, cache.response_key('entry', 'list', second, {}, 'application/json'))
+        self.assertNotEqual(key, cache.response_key('entry', 'list', other, {}, 'application/json'))
+        self.assertNotEqual(key, cache.response_key('entry', 'list', first, {}, 'application/xml'))
+
+    def test_save_invalidates(self):
+        request = self.factory.get('/api/v1/entry/')
+        self.resource.get_list(request)
+        bump_model_generation(Entry)
+        self.resource.get_list(request)
+        self.assertEqual(self.resource.built, 2)
+
+    def test_login_does_not_invalidate(self):
+        request = self.factory.get('/api/v1/entry/')
+        self.resource.get_list(request)
+        bump_model_generation(User, update_fields=['last_login'])
+        self.resource.get_list(request)
+        self.assertEqual(self.resource.built, 1)
+
+    def test_backend_follows_settings(self):
+        from django.core.cache import caches
+        # The cache of the resource was built at import, before the settings were overridden.
+        self.assertIs(self.resource._meta.cache.cache, caches['default'])
+
+    def test_cache_control(self):
+        self.assertEqual(GenerationCache(timeout=60).cache_control(), {'max_age': 60, 'private': True})
@@ -0,0 +1,45 @@
+import gzip
+import io
+import json
+from unittest import mock
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from tastypie_swagger.views import SchemaView
+from core.api import docs
+
+
+class DocsTest(TestCase):
+    """Swagger documents rendered once and served with validators."""
+
+    def setUp(self):
+        docs.clear_documents()
+        self.resources_url = reverse('api_tastypie_swagger:resources')
+        self.schema_url = reverse('api_tastypie_swagger:schema') + 'entry/'
+
+    def test_rendered_once(self):
+        first = self.client.get(self.schema_url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content.decode('utf-8'))['resourcePath'], '/entry')
+        self.assertIn(('schema', 'entry'), docs._documents)
+
+        with mock.patch.object(SchemaView, 'get') as render:
+            again = self.client.get(self.schema_url)
+        self.assertFalse(render.called)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_not_modified(self):
+        etag = self.client.get(self.resources_url)['ETag']
+        response = self.client.get(self.resources_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzipped(self):
+        plain = self.client.get(self.schema_url)
+        response = self.client.get(self.schema_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotEqual(response['ETag'], plain['ETag'])
+        self.assertEqual(gzip.GzipFile(fileobj=io.BytesIO(response.content)).read(), plain.content)
+
+    def test_unknown_resource(self):
+        self.assertEqual(self.client.get(reverse('api_tastypie_swagger:schema') + 'nothing/').status_code, 404)
+        self.assertNotIn(('schema', 'nothing'), docs._documents)
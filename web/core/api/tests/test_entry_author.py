@@ -0,0 +1,51 @@
+import datetime
+import json
+from django.test import TestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Entry
+from web.users.models import User, get_user_id
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'entry-author-test'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class EntryAuthorTest(ResourceTestCaseMixin, TestCase):
+    """Entries of an author, looked up by username."""
+
+    def setUp(self):
+        super(EntryAuthorTest, self).setUp()
+        self.author = User.objects.create_user('writer', 'writer@gmail.com', 'abc@123')
+        other = User.objects.create_user('other', 'other@gmail.com', 'abc@123')
+        for user in (self.author, other):
+            Entry.default.create(title='By {0}'.format(user.username), text='text', summary='summary',
+                                 created_by=user, published_date=datetime.datetime(2016, 4, 8))
+        self.authentication = self.create_apikey(username='other', api_key=other.api_key.key)
+
+    def get(self, path):
+        return self.api_client.get(path, authentication=self.authentication)
+
+    def test_entries_of_the_author(self):
+        response = self.get('/api/v1/entry-author/writer/')
+        self.assertHttpOK(response)
+        objects = json.loads(response.content.decode('utf-8'))['objects']
+        self.assertEqual([entry['title'] for entry in objects], ['By writer'])
+
+    def test_anonymous(self):
+        self.assertHttpUnauthorized(self.api_client.get('/api/v1/entry-author/writer/'))
+        self.assertHttpUnauthorized(self.api_client.get('/api/v1/entry-author/nobody/'))
+
+    def test_unknown_author(self):
+        self.assertHttpNotFound(self.get('/api/v1/entry-author/nobody/'))
+        # The API key and the missing username are both cached by now.
+        with self.assertNumQueries(0):
+            self.assertHttpNotFound(self.get('/api/v1/entry-author/nobody/'))
+            self.assertHttpNotFound(self.get('/api/v1/entry-author/{0}/'.format('a' * 100)))
+
+    def test_lookup_cached_until_users_change(self):
+        self.assertEqual(get_user_id('writer'), self.author.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_id('writer'), self.author.pk)
+
+        self.assertIsNone(get_user_id('newcomer'))
+        newcomer = User.objects.create_user('newcomer', 'newcomer@gmail.com', 'abc@123')
+        self.assertEqual(get_user_id('newcomer'), newcomer.pk)
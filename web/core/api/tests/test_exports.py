@@ -0,0 +1,65 @@
+import datetime
+import json
+from django.test import TestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Comment, Entry
+from web.users.models import User
+from core.api.collection.exports import resources
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'exports-test'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class ExportTest(ResourceTestCaseMixin, TestCase):
+    """NDJSON exports of the entries and the comments."""
+
+    def setUp(self):
+        super(ExportTest, self).setUp()
+        self.staff = User.objects.create_user('analyst', 'analyst@gmail.com', 'abc@123')
+        self.staff.is_staff = True
+        self.staff.save()
+        User.objects.create_user('reader', 'reader@gmail.com', 'abc@123')
+        self.entries = [
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary', created_by=self.staff,
+                                 published_date=datetime.datetime(2016, 4, 8))
+            for i in range(5)]
+        self.comment = Comment.default.create(entry=self.entries[0], text='Nice', user_name='reader',
+                                              user_url='http://example.com/')
+
+    def export(self, path, username='analyst'):
+        return self.api_client.get(path, authentication=self.create_basic(username=username, password='abc@123'))
+
+    def rows(self, response):
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_every_row_in_chunks(self):
+        with self.assertNumQueries(3):
+            rows = list(resources.iter_rows(Entry.default.all(), chunk_size=2))
+        self.assertEqual([row['id'] for row in rows], [entry.pk for entry in self.entries])
+
+    def test_entries(self):
+        response = self.export('/api/v1/export/entries/')
+        self.assertHttpOK(response)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = self.rows(response)
+        self.assertEqual([row['title'] for row in rows], ['Entry {0}'.format(i) for i in range(5)])
+        self.assertEqual(rows[0]['created_by_id'], self.staff.pk)
+
+    def test_comments(self):
+        rows = self.rows(self.export('/api/v1/export/comments/'))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], self.comment.pk)
+        self.assertEqual(rows[0]['entry_id'], self.entries[0].pk)
+        self.assertNotIn('basecomment_ptr_id', rows[0])
+
+    def test_since(self):
+        Entry.default.filter(pk=self.entries[0].pk).update(modified_date=datetime.datetime(2015, 1, 1))
+        rows = self.rows(self.export('/api/v1/export/entries/?since=2016-01-01'))
+        self.assertEqual(len(rows), 4)
+        self.assertHttpBadRequest(self.export('/api/v1/export/entries/?since=yesterday'))
+
+    def test_staff_only(self):
+        self.assertHttpForbidden(self.export('/api/v1/export/entries/', username='reader'))
+        self.assertHttpNotFound(self.export('/api/v1/export/users/'))
+        self.assertHttpUnauthorized(self.api_client.get('/api/v1/export/entries/'))
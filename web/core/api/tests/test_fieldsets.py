@@ -0,0 +1,57 @@
+import datetime
+from django.test import RequestFactory, TestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Entry
+from web.users.models import User
+from core.api.collection.entries.resources import EntryResource
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fieldset-test'}}
+
+
+@override_settings(CACHES=LOCMEM)
+class FieldsetTest(ResourceTestCaseMixin, TestCase):
+    """?fields= and ?expand= on the entry list."""
+
+    def setUp(self):
+        super(FieldsetTest, self).setUp()
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user('fieldset', 'fieldset@gmail.com', 'abc@123')
+        for i in range(3):
+            Entry.default.create(
+                title='Entry {0}'.format(i), text='text', summary='summary', created_by=self.user,
+                published_date=datetime.datetime(2016, 4, 8))
+
+    def get(self, **params):
+        return self.api_client.get(
+            '/api/v1/entry/', format='json', data=params,
+            authentication=self.create_basic(username='fieldset', password='abc@123'))
+
+    def test_fields(self):
+        response = self.get(fields='title,slug,resource_uri')
+        self.assertValidJSONResponse(response)
+        for entry in self.deserialize(response)['objects']:
+            self.assertKeys(entry, ['resource_uri', 'slug', 'title'])
+
+    def test_only_the_columns_of_the_fields_are_loaded(self):
+        request = RequestFactory().get('/api/v1/entry/', {'fields': 'title,slug,resource_uri'})
+        self.assertEqual(
+            EntryResource().fieldset_columns(request), ['created_date', 'id', 'modified_date', 'slug', 'title'])
+
+    def test_expand(self):
+        response = self.get(fields='title,user', expand='user')
+        entry = self.deserialize(response)['objects'][0]
+        self.assertKeys(entry, ['title', 'user'])
+        self.assertEqual(entry['user']['username'], 'fieldset')
+
+    def test_expanded_objects_follow_their_changes(self):
+        self.get(fields='title,user', expand='user')
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+        entry = self.deserialize(self.get(fields='title,user', expand='user'))['objects'][0]
+        self.assertEqual(entry['user']['first_name'], 'Renamed')
+
+    def test_unknown_fields(self):
+        self.assertHttpBadRequest(self.get(fields='title,nope'))
+        self.assertHttpBadRequest(self.get(expand='title'))
@@ -0,0 +1,75 @@
+import datetime
+from django.test import SimpleTestCase, TestCase, override_settings
+from tastypie.test import ResourceTestCaseMixin
+from web.blog.models import Entry
+from web.users.models import User
+from core.api import instrumentation
+from core.api.instrumentation import Recorder
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'instrumentation-test'}}
+
+
+class RecorderTest(SimpleTestCase):
+    """Nested phases only count their own time and queries."""
+
+    def test_nested_phases(self):
+        recorder = Recorder()
+        recorder.enter('fetch')
+        recorder.queries += 1
+        recorder.enter('dehydrate')
+        recorder.queries += 2
+        recorder.exit()
+        recorder.exit()
+        recorder.queries += 1
+        recorder.finish()
+
+        self.assertEqual(list(recorder.phases), ['dehydrate', 'fetch', 'other'])
+        self.assertEqual([queries for _, queries in recorder.phases.values()], [2, 1, 1])
+        self.assertAlmostEqual(sum(seconds for seconds, _ in recorder.phases.values()), recorder.seconds)
+
+
+@override_settings(CACHES=LOCMEM)
+class InstrumentationTest(ResourceTestCaseMixin, TestCase):
+    """Server-Timing headers and histograms of the API requests."""
+
+    def setUp(self):
+        super(InstrumentationTest, self).setUp()
+        instrumentation.reset_api_metrics()
+        user = User.objects.create_user('timed', 'timed@gmail.com', 'abc@123')
+        Entry.default.create(title='Entry', text='text', summary='summary', created_by=user,
+                             published_date=datetime.datetime(2016, 4, 8))
+
+    def get_entries(self):
+        return self.api_client.get(
+            '/api/v1/entry/', authentication=self.create_basic(username='timed', password='abc@123'))
+
+    @override_settings(API_INSTRUMENTATION=True)
+    def test_phases(self):
+        response = self.get_entries()
+        self.assertHttpOK(response)
+
+        metrics = dict(metric.split(';', 1) for metric in response['Server-Timing'].split(', '))
+        for name in ('auth', 'paginate', 'dehydrate', 'serialize', 'other', 'db', 'total'):
+            self.assertIn(name, metrics)
+
+        histograms = instrumentation.api_metrics()['GET entry/dispatch_list']
+        self.assertEqual(histograms['total']['count'], 1)
+        self.assertEqual(sum(histograms['auth']['buckets'].values()), 1)
+
+    @override_settings(API_INSTRUMENTATION=True)
+    def test_fetch_runs_the_select(self):
+        for data in ({}, {'cursor': ''}):
+            response = self.api_client.get(
+                '/api/v1/entry/', data=data, authentication=self.create_basic(username='timed', password='abc@123'))
+            self.assertHttpOK(response)
+
+            metrics = dict(metric.split(';', 1) for metric in response['Server-Timing'].split(', '))
+            self.assertIn('fetch', metrics)
+            self.assertRegex(metrics['fetch'], r'desc="[1-9]\d* queries"')
+
+    @override_settings(API_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = self.get_entries()
+        self.assertHttpOK(response)
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(instrumentation.api_metrics(), {})
@@ -0,0 +1,35 @@
+from django.test import RequestFactory, TestCase
+from web.blog.models import Entry
+from web.users.models import User
+from core.api.loaders import RelatedLoader
+
+
+class RelatedLoaderTest(TestCase):
+    """The authors of a page are loaded with one query."""
+
+    def setUp(self):
+        self.users = [User.objects.create_user('loader{0}'.format(i), password='abc@123') for i in range(3)]
+        for i in range(6):
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary',
+                                 created_by=self.users[i % 3])
+        Entry.default.create(title='Anonymous', text='text', summary='summary')
+        self.request = RequestFactory().get('/api/v1/entry/')
+
+    def test_one_query_per_model(self):
+        entries = list(Entry.default.order_by('pk'))
+        loader = RelatedLoader.for_request(self.request)
+
+        with self.assertNumQueries(1):
+            loader.load(entries, 'created_by')
+
+        with self.assertNumQueries(0):
+            authors = [entry.created_by for entry in entries]
+
+        self.assertEqual(authors, self.users * 2 + [None])
+
+    def test_loaded_objects_are_reused_within_the_request(self):
+        RelatedLoader.for_request(self.request).load(list(Entry.default.all()), 'created_by')
+        entries = list(Entry.default.all())
+
+        with self.assertNumQueries(0):
+            RelatedLoader.for_request(self.request).load(entries, 'created_by')
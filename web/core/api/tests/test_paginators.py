@@ -0,0 +1,77 @@
+from django.http import QueryDict
+from django.test import TestCase
+from django.utils.six.moves.urllib.parse import parse_qs, urlsplit
+from web.blog.models import Entry
+from core.api.exceptions import CustomBadRequest
+from core.api.paginators import EntryPaginator, KeysetPaginator
+
+
+class KeysetPaginatorTest(TestCase):
+    """Pages follow -created_date, id without gaps nor repeats."""
+
+    def setUp(self):
+        for i in range(7):
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary')
+        self.expected = list(Entry.default.order_by('-created_date', 'id').values_list('pk', flat=True))
+
+    def page(self, **params):
+        request_data = QueryDict('', mutable=True)
+        request_data.update(params)
+        paginator = KeysetPaginator(
+            request_data, Entry.default.all(), resource_uri='/api/v1/entry/', limit=3, collection_name='objects')
+        return paginator.page()
+
+    def cursor(self, uri):
+        return parse_qs(urlsplit(uri).query)['cursor'][0]
+
+    def test_walk_forward_and_back(self):
+        first = self.page()
+        self.assertIsNone(first['meta']['previous'])
+        second = self.page(cursor=self.cursor(first['meta']['next']))
+        third = self.page(cursor=self.cursor(second['meta']['next']))
+
+        pages = [first, second, third]
+        self.assertEqual([obj.pk for page in pages for obj in page['objects']], self.expected)
+        self.assertIsNone(third['meta']['next'])
+
+        back = self.page(cursor=self.cursor(third['meta']['previous']))
+        self.assertEqual([obj.pk for obj in back['objects']], self.expected[3:6])
+        self.assertIsNotNone(back['meta']['next'])
+
+        start = self.page(cursor=self.cursor(second['meta']['previous']))
+        self.assertEqual([obj.pk for obj in start['objects']], self.expected[:3])
+        self.assertIsNone(start['meta']['previous'])
+
+    def test_no_count(self):
+        with self.assertNumQueries(1):
+            self.page()
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(CustomBadRequest):
+            self.page(cursor='nope')
+
+
+class EntryPaginatorTest(TestCase):
+    """Entry lists stay offset based unless the client asks for a cursor."""
+
+    def setUp(self):
+        for i in range(5):
+            Entry.default.create(title='Entry {0}'.format(i), text='text', summary='summary')
+
+    def page(self, **params):
+        request_data = QueryDict('', mutable=True)
+        request_data.update(params)
+        paginator = EntryPaginator(
+            request_data, Entry.default.all(), resource_uri='/api/v1/entry/', limit=2, collection_name='objects')
+        return paginator.page()
+
+    def test_offset_by_default(self):
+        page = self.page(offset='2')
+        self.assertEqual(page['pagination']['total_count'], 5)
+        self.assertEqual(page['pagination']['offset'], 2)
+        self.assertEqual(len(page['objects']), 2)
+
+    def test_cursor_opt_in(self):
+        page = self.page(cursor='')
+        self.assertNotIn('total_count', page['pagination'])
+        self.assertIn('cursor=', page['pagination']['next'])
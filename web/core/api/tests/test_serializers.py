@@ -0,0 +1,89 @@
+import datetime
+import json
+from decimal import Decimal
+from unittest import skipIf
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from tastypie.bundle import Bundle
+from tastypie.serializers import Serializer
+from tastypie.exceptions import BadRequest
+from core.api import serializers
+from core.api.serializers import FastSerializer
+
+
+class FastSerializerTest(SimpleTestCase):
+    """FastSerializer gives the same values as tastypie's Serializer."""
+
+    data = {
+        'meta': {'limit': 2, 'next': None, 'total_count': 2},
+        'objects': [
+            Bundle(data={
+                'id': 1,
+                'title': u'Django — search',
+                'published_date': datetime.datetime(2016, 4, 8, 22, 5, 12, 345678),
+                'day': datetime.date(2016, 4, 8),
+                'at': datetime.time(22, 5, 12, 345678),
+                'score': 1.5,
+                'price': Decimal('9.90'),
+                'tags': ('django', 'search'),
+                'is_published': True,
+                'user': '/api/v1/user_profile/1/',
+            }),
+            Bundle(data={'id': 2, 'nested': {'empty': [], 'none': None}}),
+        ],
+    }
+
+    def assertSameJSON(self, fast, baseline):
+        self.assertEqual(
+            json.loads(fast.serialize(self.data, 'application/json')),
+            json.loads(baseline.serialize(self.data, 'application/json')))
+
+    def test_same_values(self):
+        """Every type comes out as tastypie formats it."""
+        for formatting in ('iso-8601', 'iso-8601-strict', 'rfc-2822'):
+            self.assertSameJSON(
+                FastSerializer(['json'], datetime_formatting=formatting),
+                Serializer(['json'], datetime_formatting=formatting))
+
+    @override_settings(USE_TZ=True, TIME_ZONE='Asia/Ho_Chi_Minh')
+    def test_aware_datetimes(self):
+        """Aware datetimes are made naive in the default time zone first."""
+        aware = timezone.make_aware(datetime.datetime(2016, 4, 8, 22, 5, 12), timezone.utc)
+        self.assertEqual(
+            FastSerializer(['json']).to_simple(aware, {}),
+            Serializer(['json']).to_simple(aware, {}))
+
+    def test_floats_round_trip(self):
+        """Floats come back exactly, whatever the encoder."""
+        data = {'objects': [Bundle(data={'score': 0.12345678901234568, 'big': 123456789.12345679, 'tiny': 1e-12})]}
+        serializer = FastSerializer(['json'])
+        self.assertEqual(
+            serializer.deserialize(serializer.serialize(data, 'application/json')),
+            {'objects': [{'score': 0.12345678901234568, 'big': 123456789.12345679, 'tiny': 1e-12}]})
+
+    def test_from_json(self):
+        """Request bodies decode as with the stdlib."""
+        self.assertEqual(FastSerializer(['json']).deserialize('{"title": "Django"}'), {'title': 'Django'})
+
+
+@skipIf(serializers.msgpack is None, 'msgpack is not installed')
+class MessagePackTest(SimpleTestCase):
+    """The msgpack format carries the values of the json one."""
+
+    data = FastSerializerTest.data
+
+    def test_round_trip(self):
+        serializer = FastSerializer()
+        packed = serializer.serialize(self.data, 'application/x-msgpack')
+        self.assertIsInstance(packed, bytes)
+        self.assertEqual(
+            serializer.deserialize(packed, 'application/x-msgpack; charset=utf-8'),
+            json.loads(serializer.serialize(self.data, 'application/json')))
+
+    def test_offered_by_default(self):
+        self.assertIn('application/x-msgpack', FastSerializer().supported_formats)
+        self.assertNotIn('application/x-msgpack', FastSerializer(['json']).supported_formats)
+
+    def test_invalid_body(self):
+        with self.assertRaises(BadRequest):
+            FastSerializer().deserialize(b'\xc1', 'application/x-msgpack')
@@ -0,0 +1,56 @@
+import os
+from unittest import SkipTest
+from django.test import SimpleTestCase, override_settings
+from redis import StrictRedis
+from redis.exceptions import ConnectionError
+from core.api.throttles import RedisThrottle
+
+# A throwaway Redis, e.g. `docker run -p 6379:6379 redis`; its keys are flushed.
+REDIS_URL = os.environ.get('THROTTLE_TEST_REDIS_URL', 'redis://127.0.0.1:6379/15')
+
+
+class RedisThrottleTest(SimpleTestCase):
+    """The token bucket allows bursts of throttle_at, then throttle_at per timeframe."""
+
+    def setUp(self):
+        self.client = StrictRedis.from_url(REDIS_URL)
+        try:
+            self.client.flushdb()
+        except ConnectionError:
+            raise SkipTest('No Redis at {0}.'.format(REDIS_URL))
+        self.throttle = RedisThrottle(throttle_at=3, timeframe=60, scope='test', client=self.client)
+
+    def test_burst_then_refill(self):
+        self.assertEqual([self.throttle.take('ip', now=1000) for _ in range(4)], [True, True, True, False])
+        # One token every 20 seconds.
+        self.assertFalse(self.throttle.take('ip', now=1010))
+        self.assertTrue(self.throttle.take('ip', now=1030))
+        self.assertFalse(self.throttle.take('ip', now=1030))
+
+    def test_identifiers_and_scopes_are_apart(self):
+        other_scope = RedisThrottle(throttle_at=3, timeframe=60, scope='other', client=self.client)
+        for _ in range(3):
+            self.throttle.take('ip', now=1000)
+        self.assertFalse(self.throttle.take('ip', now=1000))
+        self.assertTrue(self.throttle.take('apikey', now=1000))
+        self.assertTrue(other_scope.take('ip', now=1000))
+
+    def test_buckets_expire(self):
+        self.throttle.take('ip')
+        # Full again after the timeframe.
+        self.assertIn(self.client.ttl(self.throttle.bucket_key('ip')), range(1, 62))
+
+    def test_let_through_without_redis(self):
+        throttle = RedisThrottle(throttle_at=1, timeframe=60, client=StrictRedis(port=1))
+        self.assertFalse(throttle.should_be_throttled('ip'))
+        self.assertFalse(throttle.should_be_throttled('ip'))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class NonRedisCacheThrottleTest(SimpleTestCase):
+    """With the development cache, the throttle lets every request through."""
+
+    def test_let_through_on_locmem(self):
+        throttle = RedisThrottle(throttle_at=1, timeframe=60)
+        self.assertFalse(throttle.should_be_throttled('ip'))
+        self.assertFalse(throttle.should_be_throttled('ip'))
@@ -0,0 +1,97 @@
+"""Throttles of the API resources."""
+import logging
+import time
+
+from django.core.cache import caches
+from redis.exceptions import RedisError
+from tastypie.throttle import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+# Token bucket refilled continuously: ``capacity`` requests at once, then
+# ``rate`` per second. Takes a token when there is one; returns 1 when the
+# request may go on, 0 when it is throttled. Keys expire once the bucket
+# would be full again.
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return allowed
+"""
+
+# Client of a cache which is not Redis.
+NO_REDIS = object()
+
+
+class RedisThrottle(BaseThrottle):
+    """Token bucket kept in Redis, checked and updated by one script call per request.
+
+    ``throttle_at`` requests are allowed at once per identifier (API key
+    user, user or IP address, as given by the authentication), and the
+    bucket refills at ``throttle_at`` per ``timeframe`` seconds. ``scope``
+    separates the buckets of the resources.
+
+    While Redis cannot be reached, or the cache is not Redis, requests are
+    let through.
+    """
+
+    def __init__(self, throttle_at=150, timeframe=3600, scope='api', client=None, cache_alias='default', **kwargs):
+        super(RedisThrottle, self).__init__(throttle_at=throttle_at, timeframe=timeframe, **kwargs)
+        self.scope = scope
+        self.cache_alias = cache_alias
+        self._client = client
+        self._script = None
+
+    @property
+    def client(self):
+        """Redis client, the one of the ``cache_alias`` cache unless given; NO_REDIS for other caches."""
+        if self._client is None:
+            from django_redis.cache import RedisCache
+            if isinstance(caches[self.cache_alias], RedisCache):
+                from django_redis import get_redis_connection
+                self._client = get_redis_connection(self.cache_alias)
+            else:
+                self._client = NO_REDIS
+        return self._client
+
+    @property
+    def script(self):
+        """The token bucket script; sent once, then called by its SHA."""
+        if self._script is None:
+            self._script = self.client.register_script(TOKEN_BUCKET)
+        return self._script
+
+    def bucket_key(self, identifier):
+        """Redis key of the bucket of an identifier."""
+        return 'throttle:{0}:{1}'.format(self.scope, identifier)
+
+    def take(self, identifier, now=None):
+        """Take a token from the bucket of the identifier; return whether there was one."""
+        if self.client is NO_REDIS:
+            # The cache is not Redis, as in development.
+            return True
+
+        args = [self.throttle_at, float(self.throttle_at) / self.timeframe, time.time() if now is None else now]
+        try:
+            return bool(self.script(keys=[self.bucket_key(identifier)], args=args))
+        except RedisError:
+            logger.warning('Throttle %s could not reach Redis, letting the request through.', self.scope, exc_info=True)
+            return True
+
+    def should_be_throttled(self, identifier, **kwargs):
+        """Returns whether the request is over the limit, counting it."""
+        return not self.take(identifier)
+
+    def accessed(self, identifier, **kwargs):
+        """Already counted by ``should_be_throttled``."""
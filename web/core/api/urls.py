@@ -4,6 +4,9 @@ from tastypie.api import Api
 from .collection.users.resources import UserProfileResource, CreateUserResource, UserResource
 from .collection.entries.resources import EntryResource, EntryAuthorResource
 from .collection.search.resources import SearchEntriesResource
+from .collection.metrics.resources import MetricsResource
+from .collection.batch.resources import BatchResource
+from .collection.exports.resources import ExportResource
 
 # API definition
 v1_api = Api(api_name='v1')
@@ -15,6 +18,9 @@ v1_api.register(EntryAuthorResource())
 v1_api.register(EntryResource())
 v1_api.register(UserResource())
 v1_api.register(SearchEntriesResource())
+v1_api.register(MetricsResource())
+v1_api.register(BatchResource())
+v1_api.register(ExportResource())
 
 # Standard bits
 urlpatterns = [
@@ -25,7 +31,8 @@ urlpatterns = [
 urlpatterns += [
     url(
         r'documentations',
-        include('tastypie_swagger.urls', namespace='api_tastypie_swagger'),
+        # tastypie_swagger's routes, serving the documents rendered once per process
+        include('core.api.docs', namespace='api_tastypie_swagger'),
         kwargs={
             # Either your tastypie api instance or a string containing the full path to your tastypie api instance
             'tastypie_api_module': v1_api,
@@ -1,5 +1,8 @@
 """Public."""
+from django.forms.models import model_to_dict
+from django.utils.encoding import force_text
 from web.users.models import User
+from web.blog.forms import EntryBatchForm
 from web.blog.models import Blog
 from tastypie.validation import CleanedDataFormValidation
 
@@ -29,3 +32,40 @@ class EntryValidation(CleanedDataFormValidation):
             return {}
 
         return form.errors
+
+
+class EntryBatchValidation(object):
+    """Validate the changes of a batch of entries with a form, without any query."""
+
+    def __init__(self, form_class=EntryBatchForm):
+        self.form_class = form_class
+
+    def clean(self, entries, changes):
+        """Check ``{pk: {field: value}}`` against the entries.
+
+        Returns the changed values by pk and the errors by pk; the entries
+        hold the new values afterwards.
+        """
+        fields = list(self.form_class.base_fields)
+        changed = {}
+        errors = {}
+
+        for pk, values in changes.items():
+            entry = entries[pk]
+            unknown = sorted(set(values) - set(fields))
+            if unknown:
+                errors[pk] = dict((name, ['This field cannot be changed in a batch.']) for name in unknown)
+                continue
+
+            data = model_to_dict(entry, fields=fields)
+            data.update(values)
+            form = self.form_class(data, instance=entry)
+
+            if form.is_valid():
+                changed[pk] = dict((name, getattr(entry, name)) for name in form.changed_data if name in values)
+            else:
+                errors[pk] = dict(
+                    (name, [force_text(message) for error in field_errors for message in error.messages])
+                    for name, field_errors in form.errors.as_data().items())
+
+        return changed, errors
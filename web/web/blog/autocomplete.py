@@ -0,0 +1,203 @@
+"""Prefix suggestions for the search box.
+
+Every worker keeps a compressed prefix trie of the entry titles and of the
+most frequent terms of the corpus in memory. The trie source is built once
+per index generation by update_index and shared through the cache; workers
+notice a new generation and rebuild their trie from it. Requests never
+build the source: until update_index has published it, the workers keep
+the trie they have.
+"""
+import heapq
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+from .cache import SEARCH_INDEX_GENERATION, get_generation
+from .models import Entry
+from .utils import tokenize
+
+SOURCE_KEY = 'autocomplete:source'
+
+# Titles rank above single terms seen the same number of times.
+TITLE_WEIGHT = 10
+MAX_TERMS = 20000
+MIN_TERM_LENGTH = 3
+
+
+class RadixNode(object):
+    """Node of a RadixTrie."""
+
+    __slots__ = ('edges', 'weight', 'value', 'best')
+
+    def __init__(self):
+        self.edges = {}
+        self.weight = None
+        self.value = None
+        self.best = ()
+
+
+class RadixTrie(object):
+    """Compressed prefix trie.
+
+    Edges hold whole label strings rather than single characters, and after
+    ``freeze`` every node knows its ``max_completions`` best completions, so a
+    lookup only walks the prefix.
+    """
+
+    def __init__(self, max_completions=10):
+        self.root = RadixNode()
+        self.max_completions = max_completions
+
+    def insert(self, key, weight, value=None):
+        """Add a key, keeping the highest weight when it is inserted twice."""
+        node = self.root
+        rest = key
+
+        while rest:
+            edge = node.edges.get(rest[0])
+
+            if edge is None:
+                child = RadixNode()
+                node.edges[rest[0]] = (rest, child)
+                node = child
+                break
+
+            label, child = edge
+            common = 0
+            limit = min(len(label), len(rest))
+            while common < limit and label[common] == rest[common]:
+                common += 1
+
+            if common < len(label):
+                # Split the edge at the end of the common part.
+                middle = RadixNode()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+
+            node = child
+            rest = rest[common:]
+
+        if node.weight is None or weight > node.weight:
+            node.weight = weight
+            node.value = key if value is None else value
+
+    def freeze(self):
+        """Compute the best completions of every node, bottom-up."""
+        stack = [(self.root, False)]
+
+        while stack:
+            node, children_done = stack.pop()
+
+            if not children_done:
+                stack.append((node, True))
+                stack.extend((child, False) for _, child in node.edges.values())
+                continue
+
+            candidates = []
+            if node.weight is not None:
+                candidates.append((node.weight, node.value))
+            for _, child in node.edges.values():
+                candidates.extend(child.best)
+
+            node.best = tuple(heapq.nlargest(self.max_completions, candidates))
+
+    def complete(self, prefix, limit=None):
+        """Return the ``(weight, value)`` completions of the prefix, best first."""
+        node = self.root
+        rest = prefix
+
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return []
+
+            label, child = edge
+            if rest.startswith(label):
+                rest = rest[len(label):]
+            elif label.startswith(rest):
+                rest = ''
+            else:
+                return []
+            node = child
+
+        return list(node.best[:limit])
+
+
+def build_source():
+    """Return ``(key, weight, value)`` rows for the titles and the frequent terms."""
+    titles = Counter()
+    terms = Counter()
+
+    for title, text in Entry.objects.values_list('title', 'text').iterator():
+        titles[title.strip()] += 1
+        terms.update(tokenize(title))
+        terms.update(tokenize(text))
+
+    rows = [(' '.join(title.lower().split()), count * TITLE_WEIGHT, title) for title, count in titles.items() if title]
+    frequent = (term for term in terms.most_common() if len(term[0]) >= MIN_TERM_LENGTH)
+    for _, (term, count) in zip(range(MAX_TERMS), frequent):
+        rows.append((term, count, term))
+
+    return rows
+
+
+class Suggestions(object):
+    """Per-process autocomplete over the current index generation."""
+
+    # Seconds between two looks at the generation counter.
+    check_interval = 5
+
+    def __init__(self):
+        self.trie = RadixTrie()
+        self.generation = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def publish(self):
+        """Build the trie source from the database and share it with the workers."""
+        source = build_source()
+        cache.set(SOURCE_KEY, source, None)
+        return source
+
+    def refresh(self):
+        """Rebuild the trie when the index generation has changed."""
+        now = time.time()
+        if now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+
+        generation = get_generation(SEARCH_INDEX_GENERATION)
+        if generation == self.generation:
+            return
+
+        with self.lock:
+            if generation == self.generation:
+                return
+
+            source = cache.get(SOURCE_KEY)
+            if source is None:
+                # Building it scans the whole corpus, that is update_index's job; look again later.
+                return
+
+            trie = RadixTrie()
+            for key, weight, value in source:
+                trie.insert(key, weight, value)
+            trie.freeze()
+
+            self.trie = trie
+            self.generation = generation
+
+    def suggest(self, prefix, limit=10):
+        """Return up to ``limit`` suggestions for what the user typed so far."""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+
+        self.refresh()
+        return [value for _, value in self.trie.complete(prefix, limit)]
+
+
+suggestions = Suggestions()
@@ -0,0 +1,53 @@
+"""Generation counters kept in the default cache.
+
+A generation is a counter bumped whenever the data behind it changes.
+Anything derived from that data remembers the generation it was built
+from and knows it is stale as soon as the counter moves on.
+"""
+from django.core.cache import cache
+
+GENERATION_KEY = 'generation:{0}'
+
+# Bumped every time update_index/rebuild_index finishes.
+SEARCH_INDEX_GENERATION = 'search-index'
+
+# Saves touching only these fields leave the model generation alone; logging in updates last_login.
+UNTRACKED_FIELDS = frozenset(['last_login'])
+
+
+def get_generation(name):
+    """Return the current value of a generation counter."""
+    return cache.get(GENERATION_KEY.format(name)) or 0
+
+
+def bump_generation(name):
+    """Increment a generation counter and return its new value."""
+    key = GENERATION_KEY.format(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The counter never existed or was evicted; never expire it.
+        if cache.add(key, 1, None):
+            return 1
+        return cache.incr(key)
+
+
+def get_generations(names):
+    """Return the current values of several generation counters in one cache round trip."""
+    keys = [GENERATION_KEY.format(name) for name in names]
+    values = cache.get_many(keys)
+    return [values.get(key) or 0 for key in keys]
+
+
+def model_generation(model):
+    """Return the name of the generation counter of a model's rows."""
+    return 'model:{0}.{1}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def bump_model_generation(sender, **kwargs):
+    """post_save/post_delete receiver bumping the generation of the sender model."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and UNTRACKED_FIELDS.issuperset(update_fields):
+        return
+
+    bump_generation(model_generation(sender))
@@ -59,6 +59,20 @@ class EntryForm(forms.ModelForm):
         exclude = ['slug', 'summary']
 
 
+class EntryBatchForm(forms.ModelForm):
+    """EntryForm for the entries of a batch, whose author and blog stay as they are."""
+
+    title = forms.CharField(max_length=100,
+                            required=False,
+                            widget=forms.TextInput(attrs={'size': '40'}))
+
+    class Meta:
+        """Docstring."""
+
+        model = Entry
+        exclude = ['slug', 'summary', 'created_by', 'blog']
+
+
 class CommentForm(forms.Form):
     """docstring for CommentForm."""
 
@@ -75,7 +89,23 @@ class CommentForm(forms.Form):
         widget=forms.TextInput(attrs={'class': 'textfield'}))
 
 
-class SearchForm(forms.Form):
+class SearchFilterForm(forms.Form):
+    """Filters of the entry search, applied by the search backend."""
+
+    author = forms.CharField(required=False, max_length=30)
+    month = forms.RegexField(regex=r'^\d{4}-\d{2}$', required=False, help_text='YYYY-MM')
+    min_comments = forms.IntegerField(required=False, min_value=0)
+    # Exact number of comments, as counted by the comment_count facet.
+    comments = forms.IntegerField(required=False, min_value=0)
+
+
+class SearchForm(SearchFilterForm):
     """Docstring for SearchForm."""
 
     queryset = forms.CharField(label='Query')
+    page = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        """Show the query before the filters."""
+        super(SearchForm, self).__init__(*args, **kwargs)
+        self.fields.move_to_end('queryset', last=False)
@@ -0,0 +1,174 @@
+"""Search result highlighting.
+
+haystack's ``Highlighter`` strips the tags of the whole text block and then
+runs one ``str.find`` loop per query word, followed by a quadratic window
+search. ``FastHighlighter`` keeps its interface and markup but scans a
+bounded window once with an Aho-Corasick automaton. The output is not
+always the same: the window is the earliest one holding the most matches,
+and terms overlapping each other are wrapped once, leftmost-longest.
+"""
+from collections import deque
+
+from django.utils.html import strip_tags
+from haystack.utils import Highlighter
+
+# Query automatons are shared by every result of a search page.
+_MATCHER_CACHE = {}
+_MATCHER_CACHE_SIZE = 128
+
+
+class MultiTermMatcher(object):
+    """Aho-Corasick automaton finding every query term in a single pass."""
+
+    def __init__(self, terms):
+        """Build the goto, failure and output tables for the given terms."""
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for term in terms:
+            if not term:
+                continue
+            node = 0
+            for char in term:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                node = next_node
+            self.output[node] = (len(term),)
+
+        # Breadth first so that the failure target of a node is always final.
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and char not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(char, 0)
+                self.fail[child] = target if target != child else 0
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    @classmethod
+    def for_terms(cls, terms):
+        """Return a cached matcher for this set of terms."""
+        key = frozenset(terms)
+        matcher = _MATCHER_CACHE.get(key)
+        if matcher is None:
+            if len(_MATCHER_CACHE) >= _MATCHER_CACHE_SIZE:
+                _MATCHER_CACHE.clear()
+            matcher = _MATCHER_CACHE[key] = cls(key)
+        return matcher
+
+    def find_all(self, text):
+        """Return the non-overlapping ``(start, end)`` matches, leftmost-longest first."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in output[node]:
+                found.append((position - length + 1, position + 1))
+
+        found.sort(key=lambda match: (match[0], -match[1]))
+        matches = []
+        last_end = 0
+        for start, end in found:
+            if start >= last_end:
+                matches.append((start, end))
+                last_end = end
+        return matches
+
+
+class FastHighlighter(Highlighter):
+    """Replacement for haystack's ``Highlighter``, with the same arguments and markup.
+
+    Only the first ``max_scan_length`` characters of the text are stripped
+    and scanned, so the cost per result no longer grows with the entry size.
+    """
+
+    max_scan_length = 10000
+
+    def __init__(self, query, **kwargs):
+        """Accept the haystack keyword arguments plus ``max_scan_length``."""
+        super(FastHighlighter, self).__init__(query, **kwargs)
+
+        if 'max_scan_length' in kwargs:
+            self.max_scan_length = int(kwargs['max_scan_length'])
+
+        self.matcher = MultiTermMatcher.for_terms(self.query_words)
+        self.truncated = False
+
+    def highlight(self, text_block):
+        """Return the best ``max_length`` window of the text with the query terms wrapped."""
+        text_block = text_block or ''
+        self.truncated = len(text_block) > self.max_scan_length
+
+        if self.truncated:
+            text_block = text_block[:self.max_scan_length]
+            # Do not hand a half-open tag over to strip_tags.
+            open_tag = text_block.rfind('<')
+            if open_tag > text_block.rfind('>'):
+                text_block = text_block[:open_tag]
+
+        self.text_block = strip_tags(text_block)
+        matches = self.matcher.find_all(self.text_block.lower())
+        start_offset, end_offset = self.find_match_window(matches)
+        return self.render_matches(matches, start_offset, end_offset)
+
+    def find_match_window(self, matches):
+        """Find the earliest window holding the most matches, in linear time."""
+        if not matches:
+            return (0, self.max_length)
+
+        best_start = matches[0][0]
+        best_count = 0
+        right = 0
+
+        for left, (start, _) in enumerate(matches):
+            while right < len(matches) and matches[right][0] - start < self.max_length:
+                right += 1
+            if right - left > best_count:
+                best_start = start
+                best_count = right - left
+
+        return (best_start, best_start + self.max_length)
+
+    def render_matches(self, matches, start_offset, end_offset):
+        """Render the window, wrapping every match that fits entirely inside it."""
+        if self.css_class:
+            hl_start = '<%s class="%s">' % (self.html_tag, self.css_class)
+        else:
+            hl_start = '<%s>' % self.html_tag
+        hl_end = '</%s>' % self.html_tag
+
+        text = self.text_block
+        chunks = []
+        copied = start_offset
+
+        for start, end in matches:
+            if start < start_offset:
+                continue
+            if end > end_offset:
+                break
+            chunks.append(text[copied:start])
+            chunks.append(hl_start + text[start:end] + hl_end)
+            copied = end
+
+        chunks.append(text[copied:end_offset])
+        highlighted_chunk = ''.join(chunks)
+
+        if start_offset > 0:
+            highlighted_chunk = '...%s' % highlighted_chunk
+
+        if end_offset < len(text) or self.truncated:
+            highlighted_chunk = '%s...' % highlighted_chunk
+
+        return highlighted_chunk
@@ -0,0 +1,29 @@
+"""Compute the related entries shown on the entry pages."""
+from django.core.management.base import BaseCommand
+from ...related import BLOCK_SIZE, TOP_K, compute_related_entries
+
+
+class Command(BaseCommand):
+    """Refresh the RelatedEntry table, meant to run from cron."""
+
+    help = "Compute the related entries of the entries whose text changed since the last run."
+
+    def add_arguments(self, parser):
+        """Add the options."""
+        parser.add_argument(
+            '--full', action='store_true', default=False,
+            help="Recompute the related entries of every entry.")
+        parser.add_argument(
+            '--top-k', type=int, default=TOP_K, dest='top_k',
+            help="Related entries kept per entry.")
+        parser.add_argument(
+            '--block-size', type=int, default=BLOCK_SIZE, dest='block_size',
+            help="Rows per block of the similarity products.")
+
+    def handle(self, **options):
+        """Run the computation."""
+        count = compute_related_entries(
+            full=options['full'], top_k=options['top_k'], block_size=options['block_size'])
+
+        if options['verbosity'] >= 1:
+            self.stdout.write("Recomputed the related entries of %d entries" % count)
@@ -0,0 +1,25 @@
+"""Haystack's update_index, also refreshing the data derived from the index."""
+from haystack.management.commands.update_index import Command as UpdateIndexCommand
+from ...autocomplete import suggestions
+from ...cache import SEARCH_INDEX_GENERATION, bump_generation
+from ...spelling import speller
+
+
+class Command(UpdateIndexCommand):
+    """Update the search index, then publish a new index generation.
+
+    rebuild_index calls this command too, so both end up here.
+    """
+
+    def handle(self, *items, **options):
+        """Index as usual, then rebuild the autocomplete source and the spelling dictionary."""
+        result = super(Command, self).handle(*items, **options)
+
+        suggestions.publish()
+        speller.publish()
+        generation = bump_generation(SEARCH_INDEX_GENERATION)
+
+        if self.verbosity >= 1:
+            self.stdout.write("Published search index generation %d" % generation)
+
+        return result
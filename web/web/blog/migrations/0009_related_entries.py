@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_auto_20160421_0336'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedEntry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('entry', models.ForeignKey(related_name='related_entries', to='blog.Entry', on_delete=django.db.models.deletion.CASCADE)),
+                ('related', models.ForeignKey(related_name='+', to='blog.Entry', on_delete=django.db.models.deletion.CASCADE)),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedEntrySignature',
+            fields=[
+                ('entry', models.OneToOneField(related_name='+', primary_key=True, serialize=False, to='blog.Entry', on_delete=django.db.models.deletion.CASCADE)),
+                ('text_hash', models.CharField(max_length=40)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='relatedentry',
+            index_together=set([('entry', 'rank')]),
+        ),
+    ]
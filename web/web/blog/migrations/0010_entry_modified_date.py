@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_related_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='modified_date',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, editable=False),
+            preserve_default=False,
+        ),
+    ]
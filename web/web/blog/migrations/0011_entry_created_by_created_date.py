@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_entry_modified_date'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='entry',
+            index_together=set([('created_by', 'created_date')]),
+        ),
+    ]
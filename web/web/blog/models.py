@@ -3,7 +3,10 @@ from datetime import datetime
 from django.db import models
 from django.conf import settings
 from django.core.urlresolvers import reverse
+from django.db.models import signals
 from django.template.defaultfilters import slugify
+from .cache import bump_model_generation
+from .urlbuilder import build_url
 from .validators import validate_title
 
 
@@ -113,6 +116,8 @@ class Entry(TimestampeModel):
     meta_keywords = models.TextField(blank=True, null=True)
     meta_descriptions = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, unique=False, null=True)
+    # Version of the dehydrated API representation cached per entry.
+    modified_date = models.DateTimeField(auto_now=True, editable=False)
 
     default = models.Manager()
     objects = EntryManager()
@@ -127,16 +132,21 @@ class Entry(TimestampeModel):
 
     def get_absolute_url(self):
         """Get absolute url."""
-        return reverse(
+        created_date = self.created_date
+        return build_url(
             'blog:entry_details',
-            args=[
-                self.created_date.year,
-                self.created_date.strftime('%m'),
-                self.created_date.strftime('%d'),
-                self.slug
-            ]
+            year=str(created_date.year),
+            month='%02d' % created_date.month,
+            day='%02d' % created_date.day,
+            slug=self.slug
         )
 
+    def get_author_url(self):
+        """Get the url of the author page, empty without an author."""
+        if self.created_by_id is None:
+            return ''
+        return build_url('blog:author', username=self.created_by.username)
+
     def save(self, *args, **kwargs):
         """Save."""
         if not self.slug:
@@ -149,6 +159,8 @@ class Entry(TimestampeModel):
 
         ordering = ['-created_date']
         verbose_name_plural = 'Blog entries'
+        # Entries of an author, in the default ordering.
+        index_together = [('created_by', 'created_date')]
 
 
 class CommentManager(models.Manager):
@@ -197,3 +209,34 @@ class Comment(BaseComment):
 
     default = models.Manager()
     objects = CommentManager()
+
+
+class RelatedEntry(models.Model):
+    """Precomputed neighbour of an entry, by text similarity.
+
+    Filled in by the compute_related_entries command.
+    rank: 0 for the most similar entry.
+    """
+
+    entry = models.ForeignKey(Entry, related_name='related_entries', on_delete=models.CASCADE)
+    related = models.ForeignKey(Entry, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        """Meta."""
+
+        ordering = ['rank']
+        index_together = [('entry', 'rank')]
+
+
+class RelatedEntrySignature(models.Model):
+    """Hash of the text the related entries of an entry were computed from."""
+
+    entry = models.OneToOneField(Entry, primary_key=True, related_name='+', on_delete=models.CASCADE)
+    text_hash = models.CharField(max_length=40)
+
+
+# Cached API responses built from entries are keyed on this generation.
+signals.post_save.connect(bump_model_generation, sender=Entry)
+signals.post_delete.connect(bump_model_generation, sender=Entry)
@@ -0,0 +1,216 @@
+"""Related entries.
+
+Every published entry is turned into a TF-IDF vector (sublinear term
+frequency, smoothed idf, L2 normalised) in a sparse matrix. Cosine
+similarities are then dot products, computed for a block of rows at a
+time so that the similarity matrix is never held whole in memory, and the
+best ``top_k`` neighbours of each row are kept in the RelatedEntry table.
+"""
+import hashlib
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+
+from .models import Entry, RelatedEntry, RelatedEntrySignature
+from .utils import tokenize
+
+TOP_K = 5
+BLOCK_SIZE = 1000
+
+# Entries less similar than this are never related.
+MIN_SCORE = 0.05
+
+# Ids per DELETE statement, below the SQL variable limits.
+DELETE_BATCH_SIZE = 500
+
+
+def text_hash(title, text):
+    """Return the signature of the text an entry vector is built from."""
+    return hashlib.sha1(u'{0}\n{1}'.format(title, text).encode('utf-8')).hexdigest()
+
+
+def tfidf_matrix(documents):
+    """Return the L2 normalised TF-IDF matrix, one CSR row per token list."""
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    counts = []
+
+    for tokens in documents:
+        terms = Counter(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        indices.extend(terms.keys())
+        counts.extend(terms.values())
+        indptr.append(len(indices))
+
+    shape = (len(indptr) - 1, max(len(vocabulary), 1))
+    matrix = sparse.csr_matrix((np.array(counts, dtype=np.float64), indices, indptr), shape=shape)
+
+    matrix.data = 1.0 + np.log(matrix.data)
+    document_frequency = np.bincount(matrix.indices, minlength=shape[1])
+    idf = np.log((1.0 + shape[0]) / (1.0 + document_frequency)) + 1.0
+    matrix = matrix.dot(sparse.diags(idf, 0))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms, 0).dot(matrix).tocsr()
+
+
+def similarity_blocks(matrix, rows, block_size=BLOCK_SIZE):
+    """Yield ``(rows, similarities)`` for blocks of the given rows against every row."""
+    transposed = matrix.T.tocsc()
+
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        yield block_rows, matrix[block_rows].dot(transposed).tocsr()
+
+
+def _row_neighbours(similarities, offset, row, top_k, min_score):
+    """Return the best ``(column, score)`` of a row of a similarity block, best first."""
+    begin, end = similarities.indptr[offset], similarities.indptr[offset + 1]
+    columns = similarities.indices[begin:end]
+    scores = similarities.data[begin:end]
+
+    keep = (columns != row) & (scores >= min_score)
+    columns, scores = columns[keep], scores[keep]
+
+    if len(scores) > top_k:
+        best = np.argpartition(-scores, top_k)[:top_k]
+        columns, scores = columns[best], scores[best]
+
+    order = np.argsort(-scores, kind='mergesort')
+    return list(zip(columns[order].tolist(), scores[order].tolist()))
+
+
+def top_neighbours(matrix, rows, top_k=TOP_K, block_size=BLOCK_SIZE, min_score=MIN_SCORE):
+    """Yield ``(row, [(column, score), ...])`` with the best neighbours of each row, best first."""
+    for block_rows, similarities in similarity_blocks(matrix, rows, block_size):
+        for offset, row in enumerate(block_rows):
+            yield row, _row_neighbours(similarities, offset, row, top_k, min_score)
+
+
+def _save_neighbours(neighbours):
+    """Replace the RelatedEntry rows of the entries in ``{entry_id: [(related_id, score), ...]}``."""
+    entry_ids = list(neighbours)
+
+    for start in range(0, len(entry_ids), DELETE_BATCH_SIZE):
+        RelatedEntry.objects.filter(entry_id__in=entry_ids[start:start + DELETE_BATCH_SIZE]).delete()
+
+    RelatedEntry.objects.bulk_create(
+        [
+            RelatedEntry(entry_id=entry_id, related_id=related_id, score=score, rank=rank)
+            for entry_id, related in neighbours.items()
+            for rank, (related_id, score) in enumerate(related)
+        ],
+        batch_size=DELETE_BATCH_SIZE)
+
+
+def _merge(current, additions, top_k):
+    """Merge new ``(related_id, score)`` pairs into a neighbour list, best first."""
+    merged = dict(current)
+    merged.update(additions)
+    return sorted(merged.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+
+def _merged_neighbours(stale, additions, top_k):
+    """Return the new neighbour lists of the unchanged entries.
+
+    Only the entries listing a stale entry or getting an addition have
+    their RelatedEntry rows read, ``DELETE_BATCH_SIZE`` entries at a time.
+    """
+    stale_ids = list(stale)
+    affected = set(additions)
+    for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+        affected.update(RelatedEntry.objects.filter(
+            related_id__in=stale_ids[start:start + DELETE_BATCH_SIZE]).values_list('entry_id', flat=True))
+    affected = sorted(affected - stale)
+
+    neighbours = {}
+    for start in range(0, len(affected), DELETE_BATCH_SIZE):
+        chunk = affected[start:start + DELETE_BATCH_SIZE]
+        current = dict((entry_id, []) for entry_id in chunk)
+        for entry_id, related_id, score in RelatedEntry.objects.filter(entry_id__in=chunk).values_list(
+                'entry_id', 'related_id', 'score'):
+            current[entry_id].append((related_id, score))
+
+        for entry_id, related in current.items():
+            kept = [(related_id, score) for related_id, score in related if related_id not in stale]
+            merged = _merge(kept, additions.get(entry_id, ()), top_k)
+            if merged != sorted(related, key=lambda item: (-item[1], item[0])):
+                neighbours[entry_id] = merged
+
+    return neighbours
+
+
+def compute_related_entries(full=False, top_k=TOP_K, block_size=BLOCK_SIZE):
+    """Refresh the related entries of the published entries.
+
+    The vectors are always built from the whole corpus, but only the
+    entries whose title or text changed since the last run get their
+    neighbours recomputed; their new similarities are merged into the lists
+    of the other entries. ``full`` recomputes every entry. Returns the
+    number of entries whose neighbours were recomputed.
+    """
+    entry_ids = []
+    documents = []
+    hashes = {}
+
+    for entry_id, title, text in Entry.objects.order_by('pk').values_list('pk', 'title', 'text').iterator():
+        entry_ids.append(entry_id)
+        documents.append(tokenize(title) + tokenize(text))
+        hashes[entry_id] = text_hash(title, text)
+
+    stored = dict(RelatedEntrySignature.objects.values_list('entry_id', 'text_hash'))
+
+    if full:
+        changed = set(entry_ids)
+    else:
+        changed = set(entry_id for entry_id in entry_ids if stored.get(entry_id) != hashes[entry_id])
+
+    # Unpublished or deleted since the last run.
+    gone = set(stored) - set(hashes)
+
+    if not changed and not gone:
+        return 0
+
+    matrix = tfidf_matrix(documents)
+    changed_rows = np.array([row for row, entry_id in enumerate(entry_ids) if entry_id in changed], dtype=np.intp)
+    neighbours = {}
+    # New scores of the changed entries, by unchanged entry.
+    additions = {}
+
+    for block_rows, similarities in similarity_blocks(matrix, changed_rows, block_size):
+        for offset, row in enumerate(block_rows):
+            related = _row_neighbours(similarities, offset, row, top_k, MIN_SCORE)
+            neighbours[entry_ids[row]] = [(entry_ids[column], score) for column, score in related]
+
+        if not full:
+            # Similarity is symmetric: the rows of the changed entries also
+            # hold their new scores for every other entry.
+            coo = similarities.tocoo()
+            for offset, column, score in zip(coo.row.tolist(), coo.col.tolist(), coo.data.tolist()):
+                entry_id = entry_ids[column]
+                if entry_id not in changed and score >= MIN_SCORE:
+                    additions.setdefault(entry_id, []).append((entry_ids[block_rows[offset]], score))
+
+    if not full:
+        neighbours.update(_merged_neighbours(changed | gone, additions, top_k))
+
+    with transaction.atomic():
+        if full:
+            RelatedEntry.objects.all().delete()
+            RelatedEntrySignature.objects.all().delete()
+        else:
+            stale_ids = list(changed | gone)
+            for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+                batch = stale_ids[start:start + DELETE_BATCH_SIZE]
+                RelatedEntry.objects.filter(entry_id__in=batch).delete()
+                RelatedEntrySignature.objects.filter(entry_id__in=batch).delete()
+
+        _save_neighbours(neighbours)
+        RelatedEntrySignature.objects.bulk_create(
+            [RelatedEntrySignature(entry_id=entry_id, text_hash=hashes[entry_id]) for entry_id in changed],
+            batch_size=DELETE_BATCH_SIZE)
+
+    return len(changed)
@@ -0,0 +1,189 @@
+"""Entry search.
+
+Hits, the total count and the facet counts all come back from the same
+backend request: haystack runs the query once when the page of hits is
+sliced and keeps the count and the facets of that response.
+
+Clients crawling every result page use cursors instead, which skip the
+count. Where the backend enables ``search_after`` (Elasticsearch 5+, see
+search_backends), each page resumes after the sort values of the previous
+one, so page 500 costs the same as page 1; otherwise the cursor carries
+the offset.
+
+When the backend is unavailable (see search_backends), ``search_entries``
+serves the last answer it cached for the same page, marked ``stale``, and
+raises SearchUnavailable only when it has none.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from django.core import signing
+from django.core.cache import cache
+from haystack.query import SearchQuerySet
+
+from .models import Entry
+from .search_backends import SearchUnavailable
+
+# Fields of EntryIndex that are both faceted and filterable, with the request parameter filtering on them.
+# Facet counts are per exact value, so each parameter keeps the hits of exactly one value.
+FACET_PARAMS = (
+    ('author', 'author'),
+    ('published_month', 'month'),
+    ('comment_count', 'comments'),
+)
+
+PAGE_SIZE = 20
+
+CURSOR_SALT = 'web.blog.search.cursor'
+
+STALE_KEY = 'search:stale:{0}'
+
+# Seconds a page stays available for when the backend is down.
+STALE_TIMEOUT = 60 * 30
+
+SearchPage = namedtuple('SearchPage', ['hits', 'total', 'facets', 'stale'])
+
+# Hit of a stale page: the entry, no backend highlighting.
+StaleHit = namedtuple('StaleHit', ['object', 'highlighted'])
+
+CursorPage = namedtuple('CursorPage', ['hits', 'next'])
+
+
+class InvalidCursor(ValueError):
+    """The cursor was tampered with or belongs to another search."""
+
+
+def build_entry_search(query, author=None, month=None, min_comments=None, comments=None, highlight=False, facets=True,
+                       using=None):
+    """Return the SearchQuerySet for a query and its filters, with the facets requested."""
+    sqs = SearchQuerySet(using=using).models(Entry).auto_query(query)
+
+    if facets:
+        for field, _ in FACET_PARAMS:
+            sqs = sqs.facet(field)
+
+    # Narrowing happens in the backend as a filter, it does not affect the scores.
+    if author:
+        sqs = sqs.narrow(u'author_exact:"%s"' % sqs.query.clean(author))
+
+    if month:
+        sqs = sqs.narrow(u'published_month_exact:"%s"' % sqs.query.clean(month))
+
+    if min_comments:
+        sqs = sqs.filter(comment_count__gte=min_comments)
+
+    if comments is not None:
+        sqs = sqs.filter(comment_count=comments)
+
+    if highlight:
+        sqs = sqs.highlight()
+
+    return sqs.load_all()
+
+
+def search_entries(query, author=None, month=None, min_comments=None, comments=None, highlight=False, offset=0,
+                   limit=PAGE_SIZE, using=None):
+    """Run an entry search and return one page of it in a single backend request."""
+    filters = {'author': author, 'month': month, 'min_comments': min_comments, 'comments': comments}
+    stale_key = STALE_KEY.format(_search_digest(query, dict(filters, offset=offset, limit=limit, using=using)))
+    sqs = build_entry_search(query, highlight=highlight, using=using, **filters)
+
+    try:
+        hits = list(sqs[offset:offset + limit])
+    except SearchUnavailable:
+        return stale_page(stale_key)
+
+    page = SearchPage(
+        hits=hits,
+        total=sqs.query.get_count(),
+        facets=sqs.query.get_facet_counts().get('fields', {}),
+        stale=False,
+    )
+    cache.set(stale_key, ([int(hit.pk) for hit in hits], page.total, page.facets), STALE_TIMEOUT)
+
+    return page
+
+
+def stale_page(stale_key):
+    """Return the page cached under a key, or raise SearchUnavailable."""
+    cached = cache.get(stale_key)
+    if cached is None:
+        raise SearchUnavailable('Search is unavailable and this page is not cached.')
+
+    pks, total, facets = cached
+    entries = Entry.objects.in_bulk(pks)
+
+    return SearchPage(
+        hits=[StaleHit(entries[pk], None) for pk in pks if pk in entries],
+        total=total,
+        facets=facets,
+        stale=True,
+    )
+
+
+def _search_digest(query, filters):
+    """Identify a search, so that a cursor is only valid for the search it came from."""
+    key = json.dumps([query, sorted(filters.items())], sort_keys=True, default=str)
+    return hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+
+def dump_cursor(query, filters, position):
+    """Sign the position of the next page of a search into an opaque token."""
+    return signing.dumps({'s': _search_digest(query, filters), 'p': position}, salt=CURSOR_SALT, compress=True)
+
+
+def load_cursor(token, query, filters, search_after=False):
+    """Return the position stored in a cursor token of this search.
+
+    The position is the sort values of the last hit with ``search_after``,
+    an offset otherwise; cursors of the other kind are not valid.
+    """
+    try:
+        data = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor('The cursor is not valid.')
+
+    if not isinstance(data, dict) or data.get('s') != _search_digest(query, filters):
+        raise InvalidCursor('The cursor belongs to another search.')
+
+    position = data.get('p')
+    if search_after:
+        valid = isinstance(position, list)
+    else:
+        valid = isinstance(position, int) and not isinstance(position, bool) and position >= 0
+    if not valid:
+        raise InvalidCursor('The cursor belongs to another kind of search.')
+
+    return position
+
+
+def search_entries_after(query, cursor=None, limit=PAGE_SIZE, **filters):
+    """Return the page of an entry search following ``cursor``, and the cursor of the next page.
+
+    The backend is asked for the hits only: no count, no facets. Backends
+    without ``search_after`` support get the offset carried in the cursor.
+    """
+    sqs = build_entry_search(query, facets=False, **filters)
+    backend = sqs.query.backend
+    params = sqs.query.build_params()
+    search_after = getattr(backend, 'supports_search_after', False)
+    position = load_cursor(cursor, query, filters, search_after) if cursor else None
+
+    if search_after:
+        params.update(start_offset=0, end_offset=limit, search_after=position or [])
+    else:
+        offset = position or 0
+        params.update(start_offset=offset, end_offset=offset + limit)
+
+    results = backend.search(sqs.query.build_query(), **params)
+    raw_hits = results.get('results', [])
+
+    next_cursor = None
+    if len(raw_hits) == limit:
+        if 'last_sort' in results:
+            next_cursor = dump_cursor(query, filters, results['last_sort'])
+        elif not getattr(backend, 'supports_search_after', False):
+            next_cursor = dump_cursor(query, filters, params['end_offset'])
+
+    return CursorPage(hits=sqs.post_process_results(raw_hits), next=next_cursor)
@@ -0,0 +1,314 @@
+"""Elasticsearch engine used for the entry search.
+
+Every backend of a connection shares one pooled client per process. Its
+searches have their own deadline (``SEARCH_TIMEOUT``), shorter than the
+indexing ``TIMEOUT``, and go through a circuit breaker: after
+``FAILURE_THRESHOLD`` failures in a row, searches fail immediately with
+``SearchUnavailable`` for ``RESET_TIMEOUT`` seconds instead of holding the
+worker, then one trial search decides whether the node is back. The
+mapping requests haystack makes on the first search of a worker get the
+same deadline and breaker.
+"""
+import threading
+import time
+
+import elasticsearch
+import haystack
+from elasticsearch.helpers import bulk
+from haystack.backends.elasticsearch_backend import (
+    ElasticsearchSearchBackend, ElasticsearchSearchEngine, ElasticsearchSearchQuery)
+from haystack.utils import get_identifier
+
+DEFAULT_SEARCH_TIMEOUT = 2
+DEFAULT_POOL_SIZE = 10
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30
+
+_clients = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+
+class SearchUnavailable(Exception):
+    """The search backend is failing or too slow to answer."""
+
+
+class CircuitBreaker(object):
+    """Closed while calls succeed, open after ``failure_threshold`` failures in a row.
+
+    Once ``reset_timeout`` seconds have passed, a single trial call goes
+    through (half-open); its outcome closes or opens the circuit again.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.open_seconds = 0.0
+        self.counters = dict.fromkeys(('calls', 'failures', 'timeouts', 'rejected', 'opened'), 0)
+
+    @property
+    def state(self):
+        """``closed``, ``open`` or ``half-open``."""
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.trial else 'open'
+
+    def allow(self):
+        """Return whether a call may go to the backend now."""
+        with self.lock:
+            if self.opened_at is not None:
+                if self.trial or time.time() - self.opened_at < self.reset_timeout:
+                    self.counters['rejected'] += 1
+                    return False
+                self.trial = True
+
+            self.counters['calls'] += 1
+            return True
+
+    def record_success(self):
+        """Close the circuit."""
+        with self.lock:
+            if self.opened_at is not None:
+                self.open_seconds += time.time() - self.opened_at
+                self.opened_at = None
+            self.failures = 0
+            self.trial = False
+
+    def record_failure(self, timeout=False):
+        """Count a failure, opening the circuit past the threshold or after a failed trial."""
+        with self.lock:
+            now = time.time()
+            self.failures += 1
+            self.counters['failures'] += 1
+            if timeout:
+                self.counters['timeouts'] += 1
+
+            if self.opened_at is not None:
+                self.open_seconds += now - self.opened_at
+                self.opened_at = now
+                self.trial = False
+            elif self.failures >= self.failure_threshold:
+                self.opened_at = now
+                self.counters['opened'] += 1
+
+    def metrics(self):
+        """Return the counters, the state and the seconds spent open so far."""
+        with self.lock:
+            open_seconds = self.open_seconds
+            if self.opened_at is not None:
+                open_seconds += time.time() - self.opened_at
+            metrics = dict(self.counters, state=self.state, open_seconds=open_seconds)
+        return metrics
+
+
+class SearchClient(elasticsearch.Elasticsearch):
+    """Elasticsearch client whose searches have a deadline and go through a circuit breaker."""
+
+    def __init__(self, hosts=None, search_timeout=DEFAULT_SEARCH_TIMEOUT, breaker=None, **kwargs):
+        super(SearchClient, self).__init__(hosts, **kwargs)
+        self.search_timeout = search_timeout
+        self.breaker = breaker or CircuitBreaker()
+
+    def search(self, *args, **kwargs):
+        """Search, raising SearchUnavailable when the node is down, too slow or known to be failing."""
+        return self.guarded(super(SearchClient, self).search, *args, **kwargs)
+
+    def guarded(self, request, *args, **kwargs):
+        """Make a request of this client with the search deadline, through the circuit breaker."""
+        if not self.breaker.allow():
+            raise SearchUnavailable('Search is failing, the circuit is open.')
+
+        kwargs.setdefault('request_timeout', self.search_timeout)
+
+        try:
+            results = request(*args, **kwargs)
+        except elasticsearch.ConnectionTimeout as e:
+            self.breaker.record_failure(timeout=True)
+            raise SearchUnavailable('Search timed out: %s' % e)
+        except elasticsearch.ConnectionError as e:
+            self.breaker.record_failure()
+            raise SearchUnavailable('Search backend unreachable: %s' % e)
+        except elasticsearch.TransportError as e:
+            if isinstance(e.status_code, int) and e.status_code >= 500:
+                self.breaker.record_failure()
+                raise SearchUnavailable('Search backend error: %s' % e)
+            # The node answered, the request was wrong.
+            self.breaker.record_success()
+            raise
+        except Exception:
+            # Anything else must still close or reopen a half-open circuit.
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        return results
+
+
+def get_breaker(connection_alias, connection_options=None):
+    """Return the circuit breaker of a connection."""
+    options = connection_options or {}
+
+    with _registry_lock:
+        breaker = _breakers.get(connection_alias)
+        if breaker is None:
+            breaker = _breakers[connection_alias] = CircuitBreaker(
+                failure_threshold=options.get('FAILURE_THRESHOLD', DEFAULT_FAILURE_THRESHOLD),
+                reset_timeout=options.get('RESET_TIMEOUT', DEFAULT_RESET_TIMEOUT))
+    return breaker
+
+
+def get_client(connection_alias, connection_options, timeout):
+    """Return the process-wide client of a connection, with persistent pooled HTTP connections."""
+    breaker = get_breaker(connection_alias, connection_options)
+
+    with _registry_lock:
+        client = _clients.get(connection_alias)
+        if client is None:
+            client = _clients[connection_alias] = SearchClient(
+                connection_options['URL'],
+                search_timeout=connection_options.get('SEARCH_TIMEOUT', DEFAULT_SEARCH_TIMEOUT),
+                breaker=breaker,
+                timeout=timeout,
+                maxsize=connection_options.get('POOL_SIZE', DEFAULT_POOL_SIZE),
+                # Retrying a slow single node only multiplies the wait.
+                max_retries=connection_options.get('MAX_RETRIES', 0),
+                **connection_options.get('KWARGS', {}))
+    return client
+
+
+def search_metrics():
+    """Return the circuit breaker metrics of every connection used by this process."""
+    with _registry_lock:
+        breakers = list(_breakers.items())
+    return dict((alias, breaker.metrics()) for alias, breaker in breakers)
+
+
+class EntrySearchBackend(ElasticsearchSearchBackend):
+    """Elasticsearch backend with ``search_after`` (cursor) pagination.
+
+    Passing ``search_after`` to ``search`` sorts by score with ``entry_id`` as
+    tie-breaker and resumes after the given sort values, so deep pages cost
+    the same as the first one.
+
+    ``search_after`` needs Elasticsearch 5 or later, while the facets of
+    haystack 2.4 need Elasticsearch 1.x, so no cluster serves both: cursors
+    carry offsets unless ``'SEARCH_AFTER': True`` is set in the connection
+    settings, for a cluster and a haystack that support it.
+    """
+
+    # Sort of cursor pages; entry_id makes it total.
+    CURSOR_SORT = [
+        {'_score': {'order': 'desc'}},
+        {'entry_id': {'order': 'asc'}},
+    ]
+
+    def __init__(self, connection_alias, **connection_options):
+        super(EntrySearchBackend, self).__init__(connection_alias, **connection_options)
+        self.supports_search_after = connection_options.get('SEARCH_AFTER', False)
+        self.conn = get_client(connection_alias, connection_options, self.timeout)
+
+    def setup(self, for_search=False):
+        """Read the mapping of the index, and put it when it differs.
+
+        The writes run haystack's setup, with the indexing timeout. When the
+        first use of the backend is a search, the requests go through
+        ``SearchClient.guarded`` instead: a node down or too slow fails that
+        search with SearchUnavailable within the search deadline.
+        """
+        if not for_search:
+            return super(EntrySearchBackend, self).setup()
+
+        try:
+            self.existing_mapping = self.conn.guarded(self.conn.indices.get_mapping, index=self.index_name)
+        except elasticsearch.NotFoundError:
+            pass
+        except elasticsearch.TransportError:
+            if not self.silently_fail:
+                raise
+
+        unified_index = haystack.connections[self.connection_alias].get_unified_index()
+        self.content_field_name, field_mapping = self.build_schema(unified_index.all_searchfields())
+        current_mapping = {
+            'modelresult': {
+                'properties': field_mapping,
+                '_boost': {
+                    'name': 'boost',
+                    'null_value': 1.0
+                }
+            }
+        }
+
+        if current_mapping != self.existing_mapping:
+            try:
+                self.conn.guarded(
+                    self.conn.indices.create, index=self.index_name, body=self.DEFAULT_SETTINGS, ignore=400)
+                self.conn.guarded(
+                    self.conn.indices.put_mapping, index=self.index_name, doc_type='modelresult', body=current_mapping)
+                self.existing_mapping = current_mapping
+            except elasticsearch.TransportError:
+                if not self.silently_fail:
+                    raise
+
+        self.setup_complete = True
+
+    def search(self, query_string, **kwargs):
+        """Search, setting the backend up within the search deadline on first use."""
+        if query_string and not self.setup_complete:
+            self.setup(for_search=True)
+        return super(EntrySearchBackend, self).search(query_string, **kwargs)
+
+    def build_search_kwargs(self, query_string, search_after=None, **kwargs):
+        """Add the cursor sort, and the position to resume from, to the request body."""
+        search_kwargs = super(EntrySearchBackend, self).build_search_kwargs(query_string, **kwargs)
+
+        if search_after is not None:
+            search_kwargs['sort'] = self.CURSOR_SORT
+            if search_after:
+                search_kwargs['search_after'] = list(search_after)
+
+        return search_kwargs
+
+    def remove_many(self, objs_or_strings, commit=True):
+        """Remove several documents with one bulk request."""
+        doc_ids = [get_identifier(obj_or_string) for obj_or_string in objs_or_strings]
+        if not doc_ids:
+            return
+
+        try:
+            if not self.setup_complete:
+                self.setup()
+
+            actions = [
+                {'_op_type': 'delete', '_index': self.index_name, '_type': 'modelresult', '_id': doc_id}
+                for doc_id in doc_ids]
+            # Documents already gone are fine.
+            bulk(self.conn, actions, raise_on_error=False)
+
+            if commit:
+                self.conn.indices.refresh(index=self.index_name)
+        except elasticsearch.TransportError as e:
+            if not self.silently_fail:
+                raise
+
+            self.log.error('Failed to remove %d documents from Elasticsearch: %s', len(doc_ids), e, exc_info=True)
+
+    def _process_results(self, raw_results, **kwargs):
+        """Keep the sort values of the last hit, the position of the next page."""
+        results = super(EntrySearchBackend, self)._process_results(raw_results, **kwargs)
+        hits = raw_results.get('hits', {}).get('hits', [])
+
+        if hits and 'sort' in hits[-1]:
+            results['last_sort'] = hits[-1]['sort']
+
+        return results
+
+
+class EntrySearchEngine(ElasticsearchSearchEngine):
+    """Engine for EntrySearchBackend."""
+
+    backend = EntrySearchBackend
+    query = ElasticsearchSearchQuery
@@ -1,17 +1,60 @@
 from datetime import datetime
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
 from haystack import indexes
-from .models import Entry
+from .models import Comment, Entry
 
 
 class EntryIndex(indexes.SearchIndex, indexes.Indexable):
     text = indexes.CharField(document=True, use_template=True)
     title = indexes.CharField(model_attr='title')
+    # Word-start n-grams of the title, for autocomplete queries the trie can't answer.
+    title_auto = indexes.EdgeNgramField(model_attr='title')
     published_date = indexes.DateTimeField(model_attr='published_date')
+    # Tie-breaker of the cursor pagination sort.
+    entry_id = indexes.IntegerField(model_attr='pk')
+
+    # Filterable and faceted, see web.blog.search.
+    author = indexes.CharField(faceted=True, null=True)
+    published_month = indexes.CharField(faceted=True, null=True)
+    comment_count = indexes.IntegerField(faceted=True, default=0)
 
     def get_model(self):
         return Entry
 
     def index_queryset(self, using=None):
-        """Used when the entrie index for model is update."""
-        return self.get_model().objects.all()
+        """Used when the entrie index for model is update.
+
+        The entries come with their author and their number of comments which
+        are not spam, so that preparing them costs no query per entry.
+        """
+        not_spam = When(basecomment__comment__is_spam=False, then=Value(1))
+        return self.get_model().objects.select_related('created_by').annotate(
+            comment_count=Sum(Case(not_spam, default=Value(0), output_field=IntegerField())))
+
+    def prepare_author(self, obj):
+        """Username of the author."""
+        if obj.created_by_id:
+            return obj.created_by.username
+        return None
+
+    def prepare_published_month(self, obj):
+        """Month of publication, as YYYY-MM."""
+        if obj.published_date:
+            return obj.published_date.strftime('%Y-%m')
+        return None
+
+    def prepare_comment_count(self, obj):
+        """Number of comments which are not spam."""
+        count = getattr(obj, 'comment_count', None)
+        if count is not None:
+            return count
+        return obj.get_number_comments()
 
+    def load_for_update(self, pks):
+        """Entries of the pks with their author and comment count, in two queries."""
+        entries = list(Entry.default.select_related('created_by').filter(pk__in=pks))
+        counts = dict(
+            Comment.objects.filter(entry__in=pks, is_spam=False).values_list('entry').annotate(Count('pk')))
+        for entry in entries:
+            entry.comment_count = counts.get(entry.pk, 0)
+        return entries
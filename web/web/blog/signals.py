@@ -0,0 +1,103 @@
+"""Keeping the search index in sync with the database."""
+import threading
+from contextlib import contextmanager
+
+from django.core.exceptions import ObjectDoesNotExist
+from haystack.exceptions import NotHandled
+from haystack.signals import RealtimeSignalProcessor
+from haystack.utils import get_identifier
+from .models import BaseComment, Entry
+
+
+class BlogSignalProcessor(RealtimeSignalProcessor):
+    """Realtime indexing which also reindexes an entry when its comments change.
+
+    EntryIndex holds the comment count of the entry. Inside ``batch()`` the
+    changes are collected instead, and sent with one bulk request per
+    backend when the block ends.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(BlogSignalProcessor, self).__init__(*args, **kwargs)
+        self._local = threading.local()
+
+    @contextmanager
+    def batch(self):
+        """Coalesce the index updates of the block; nothing is sent if it raises."""
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+
+        self._local.pending = pending = {'save': {}, 'delete': {}}
+        try:
+            yield
+        finally:
+            self._local.pending = None
+
+        self.flush(pending['save'], pending['delete'])
+
+    def defer(self, action, sender, instance):
+        """Record a change while batching; return whether it was recorded."""
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            return False
+
+        other = pending['delete' if action == 'save' else 'save']
+        other.get(sender, {}).pop(instance.pk, None)
+        # Deleted instances lose their pk once the signals are sent, keep their identifier.
+        pending[action].setdefault(sender, {})[instance.pk] = (
+            instance if action == 'save' else get_identifier(instance))
+        return True
+
+    def flush(self, saved, deleted):
+        """Send the collected changes, one bulk request per model and backend."""
+        for using in self.connection_router.for_write():
+            connection = self.connections[using]
+            backend = connection.get_backend()
+
+            for model, instances in saved.items():
+                try:
+                    index = connection.get_unified_index().get_index(model)
+                except NotHandled:
+                    continue
+                objects = [obj for obj in instances.values() if index.should_update(obj)]
+                if objects:
+                    backend.update(index, objects)
+
+            for model, instances in deleted.items():
+                try:
+                    connection.get_unified_index().get_index(model)
+                except NotHandled:
+                    continue
+                remove_many = getattr(backend, 'remove_many', None)
+                if remove_many is not None:
+                    remove_many(list(instances.values()))
+                else:
+                    for identifier in instances.values():
+                        backend.remove(identifier)
+
+    def reindex_entry(self, comment):
+        """Update the index of the entry a comment belongs to."""
+        try:
+            entry = comment.entry
+        except ObjectDoesNotExist:
+            # The entry is being deleted with its comments.
+            return
+        if not self.defer('save', Entry, entry):
+            super(BlogSignalProcessor, self).handle_save(Entry, entry)
+
+    def handle_save(self, sender, instance, **kwargs):
+        """Index the saved instance, or the entry of a saved comment."""
+        if isinstance(instance, BaseComment):
+            return self.reindex_entry(instance)
+        if self.defer('save', sender, instance):
+            return
+        return super(BlogSignalProcessor, self).handle_save(sender, instance, **kwargs)
+
+    def handle_delete(self, sender, instance, **kwargs):
+        """Remove the deleted instance, or reindex the entry of a deleted comment."""
+        if isinstance(instance, BaseComment):
+            return self.reindex_entry(instance)
+        if self.defer('delete', sender, instance):
+            return
+        return super(BlogSignalProcessor, self).handle_delete(sender, instance, **kwargs)
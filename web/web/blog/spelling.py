@@ -0,0 +1,309 @@
+"""Spelling suggestions for the search ("did you mean").
+
+Symmetric delete dictionary: at index time every term of the corpus is
+stored under all the strings obtained by deleting up to ``max_distance``
+characters of its first ``prefix_length`` characters. A lookup generates
+the same deletes of the misspelled word, so candidates are found with a few
+dozen index probes instead of a scan of the vocabulary, and only those get
+their edit distance computed.
+
+The delete strings are stored as sorted CRC32 keys with posting lists of
+term ids, in flat arrays. update_index builds the dictionary once per index
+generation and shares it through the cache; workers notice a new
+generation and load it with a few ``frombytes`` calls. Requests never
+build it: until update_index has published one, there are no suggestions.
+"""
+import bisect
+import marshal
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter
+
+import numpy as np
+from django.core.cache import cache
+
+from .cache import SEARCH_INDEX_GENERATION, get_generation
+from .models import Entry
+from .utils import tokenize
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+# Shorter words are left as they are.
+MIN_WORD_LENGTH = 3
+
+FORMAT_VERSION = 1
+
+DICTIONARY_KEY = 'spelling:dictionary'
+
+
+def _deletes(word, max_distance):
+    """Return the word and every string made by deleting up to ``max_distance`` of its characters."""
+    found = set([word])
+    edge = [word]
+
+    for _ in range(max_distance):
+        next_edge = []
+        for text in edge:
+            for i in range(len(text)):
+                deleted = text[:i] + text[i + 1:]
+                if deleted not in found:
+                    found.add(deleted)
+                    next_edge.append(deleted)
+        edge = next_edge
+
+    return found
+
+
+def _key(text):
+    """Return the stored key of a delete string."""
+    return zlib.crc32(text.encode('utf-8')) & 0xffffffff
+
+
+def _uint32_array(values):
+    """Return a numpy array as an ``array('I')``."""
+    result = array('I')
+    result.frombytes(np.asarray(values, dtype=np.uint32).tobytes())
+    return result
+
+
+def edit_distance(source, target, limit):
+    """Return the optimal string alignment distance of two words, or None when it is above ``limit``."""
+    if abs(len(source) - len(target)) > limit:
+        return None
+
+    before_previous = None
+    previous = list(range(len(target) + 1))
+
+    for i in range(1, len(source) + 1):
+        current = [i] + [0] * len(target)
+        row_min = i
+
+        for j in range(1, len(target) + 1):
+            cost = 0 if source[i - 1] == target[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+
+            current[j] = value
+            row_min = min(row_min, value)
+
+        if row_min > limit:
+            return None
+
+        before_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class SpellingDictionary(object):
+    """Symmetric delete spelling dictionary."""
+
+    def __init__(self, terms, counts, keys, offsets, postings, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        """Wrap the arrays built by ``build``; ``keys[i]`` has the term ids ``postings[offsets[i]:offsets[i + 1]]``."""
+        self.terms = terms
+        self.counts = counts
+        self.keys = keys
+        self.offsets = offsets
+        self.postings = postings
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.index = dict((term, term_id) for term_id, term in enumerate(terms))
+
+    @classmethod
+    def build(cls, term_counts, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        """Build the dictionary of a ``{term: count}`` mapping."""
+        terms = sorted(term_counts)
+        counts = array('I', (min(term_counts[term], 0xffffffff) for term in terms))
+
+        pair_keys = array('I')
+        pair_ids = array('I')
+        for term_id, term in enumerate(terms):
+            for deleted in _deletes(term[:prefix_length], max_distance):
+                pair_keys.append(_key(deleted))
+                pair_ids.append(term_id)
+
+        pair_keys = np.frombuffer(pair_keys, dtype=np.uint32)
+        pair_ids = np.frombuffer(pair_ids, dtype=np.uint32)
+        order = np.argsort(pair_keys, kind='mergesort')
+        keys, starts = np.unique(pair_keys[order], return_index=True)
+
+        return cls(
+            terms, counts,
+            keys=_uint32_array(keys),
+            offsets=_uint32_array(np.append(starts, len(order))),
+            postings=_uint32_array(pair_ids[order]),
+            max_distance=max_distance,
+            prefix_length=prefix_length)
+
+    def dumps(self):
+        """Return the dictionary as bytes."""
+        return marshal.dumps({
+            'version': FORMAT_VERSION,
+            'max_distance': self.max_distance,
+            'prefix_length': self.prefix_length,
+            'terms': '\n'.join(self.terms),
+            'counts': self.counts.tobytes(),
+            'keys': self.keys.tobytes(),
+            'offsets': self.offsets.tobytes(),
+            'postings': self.postings.tobytes(),
+        })
+
+    @classmethod
+    def loads(cls, content):
+        """Read a dictionary returned by ``dumps``."""
+        data = marshal.loads(content)
+
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError('Unsupported spelling dictionary format.')
+
+        arrays = {}
+        for name in ('counts', 'keys', 'offsets', 'postings'):
+            arrays[name] = array('I')
+            arrays[name].frombytes(data[name])
+
+        return cls(
+            data['terms'].split('\n') if data['terms'] else [],
+            max_distance=data['max_distance'],
+            prefix_length=data['prefix_length'],
+            **arrays)
+
+    def _candidates(self, text):
+        """Return the ids of the terms stored under a delete string."""
+        key = _key(text)
+        position = bisect.bisect_left(self.keys, key)
+
+        if position == len(self.keys) or self.keys[position] != key:
+            return ()
+
+        return self.postings[self.offsets[position]:self.offsets[position + 1]]
+
+    def lookup(self, word):
+        """Return the closest known term of a word, the most frequent on ties, or None."""
+        if word in self.index:
+            return word
+
+        best = None
+        best_distance = self.max_distance + 1
+        best_count = 0
+        checked = set()
+
+        prefix = word[:self.prefix_length]
+        seen = set([prefix])
+        edge = [prefix]
+
+        for depth in range(self.max_distance + 1):
+            # Deleting more characters only finds terms further away.
+            if depth > best_distance:
+                break
+
+            next_edge = []
+
+            for text in edge:
+                for term_id in self._candidates(text):
+                    if term_id in checked:
+                        continue
+                    checked.add(term_id)
+
+                    term = self.terms[term_id]
+                    distance = edit_distance(word, term, min(best_distance, self.max_distance))
+                    if distance is None:
+                        continue
+
+                    count = self.counts[term_id]
+                    if distance < best_distance or count > best_count:
+                        best, best_distance, best_count = term, distance, count
+
+                if depth < self.max_distance:
+                    for i in range(len(text)):
+                        deleted = text[:i] + text[i + 1:]
+                        if deleted not in seen:
+                            seen.add(deleted)
+                            next_edge.append(deleted)
+
+            edge = next_edge
+
+        return best
+
+    def correct(self, query):
+        """Return the query with its unknown words corrected, or None when there is nothing to correct."""
+        words = tokenize(query)
+        corrected = []
+
+        for word in words:
+            if len(word) >= MIN_WORD_LENGTH:
+                word = self.lookup(word) or word
+            corrected.append(word)
+
+        if corrected == words:
+            return None
+
+        return ' '.join(corrected)
+
+
+def build_dictionary():
+    """Return the spelling dictionary of the published entries."""
+    terms = Counter()
+
+    for title, text in Entry.objects.values_list('title', 'text').iterator():
+        terms.update(tokenize(title))
+        terms.update(tokenize(text))
+
+    return SpellingDictionary.build(terms)
+
+
+class Speller(object):
+    """Per-process spelling dictionary of the current index generation."""
+
+    # Seconds between two looks at the generation counter.
+    check_interval = 5
+
+    def __init__(self):
+        self.dictionary = None
+        self.generation = None
+        self.checked_at = 0
+        self.lock = threading.Lock()
+
+    def publish(self):
+        """Build the dictionary from the database and share it with the workers."""
+        dictionary = build_dictionary()
+        cache.set(DICTIONARY_KEY, dictionary.dumps(), None)
+        return dictionary
+
+    def refresh(self):
+        """Load the dictionary again when the index generation has changed."""
+        now = time.time()
+        if now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+
+        generation = get_generation(SEARCH_INDEX_GENERATION)
+        if generation == self.generation:
+            return
+
+        with self.lock:
+            if generation == self.generation:
+                return
+
+            content = cache.get(DICTIONARY_KEY)
+            if content is None:
+                # Building it scans the whole corpus, that is update_index's job; look again later.
+                return
+
+            self.dictionary = SpellingDictionary.loads(content)
+            self.generation = generation
+
+    def suggest(self, query):
+        """Return a corrected query, or None when there is no dictionary or nothing to correct."""
+        self.refresh()
+
+        if self.dictionary is None:
+            return None
+
+        return self.dictionary.correct(query)
+
+
+speller = Speller()
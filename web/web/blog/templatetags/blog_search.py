@@ -0,0 +1,55 @@
+"""Template tags for the search pages."""
+from django import template
+from django.utils.html import strip_tags
+from django.utils.safestring import mark_safe
+from ..highlighting import FastHighlighter
+
+register = template.Library()
+
+# Private-use markers surviving strip_tags while the backend's <em> tags are removed.
+_HL_START = u'\ue000'
+_HL_END = u'\ue001'
+
+
+def _backend_fragments(result):
+    """Return the highlight fragments the search backend attached to the result, if any."""
+    highlighted = getattr(result, 'highlighted', None)
+
+    if not highlighted:
+        return []
+
+    # Solr and Whoosh key the fragments by field, Elasticsearch returns a plain list.
+    if isinstance(highlighted, dict):
+        fragments = []
+        for field_fragments in highlighted.values():
+            fragments.extend(field_fragments)
+        return fragments
+
+    return list(highlighted)
+
+
+@register.simple_tag
+def highlight_result(result, query, html_tag='span', css_class='highlighted', max_length=200):
+    """
+    Highlight the query terms in a search result.
+
+    Uses the fragments highlighted by the backend when the query asked for them,
+    otherwise falls back to ``FastHighlighter`` over the entry text.
+
+    Syntax::
+
+        {% highlight_result result cd.queryset %}
+    """
+    fragments = _backend_fragments(result)
+
+    if fragments:
+        hl_start = '<%s class="%s">' % (html_tag, css_class) if css_class else '<%s>' % html_tag
+        hl_end = '</%s>' % html_tag
+        chunks = []
+        for fragment in fragments:
+            fragment = fragment.replace('<em>', _HL_START).replace('</em>', _HL_END)
+            chunks.append(strip_tags(fragment).replace(_HL_START, hl_start).replace(_HL_END, hl_end))
+        return mark_safe('...%s...' % '...'.join(chunks))
+
+    highlighter = FastHighlighter(query, html_tag=html_tag, css_class=css_class, max_length=max_length)
+    return mark_safe(highlighter.highlight(result.object.text))
@@ -0,0 +1,318 @@
+"""Local stand-in for an Elasticsearch node.
+
+    $ python -m web.blog.tests.fake_elasticsearch --port 9201 --latency 20
+
+Answers the part of the REST API haystack's Elasticsearch backend uses:
+index creation and mappings, ``_bulk``, ``_refresh``, deletes and
+``_search`` with terms facets and ``search_after``. Documents live in
+memory and matching is a plain bag of words over the query string, so the
+numbers measure the client side and the transport, not the relevance.
+``latency`` (seconds) is added to every request and can be changed while
+the server runs, to test slow nodes.
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Query string syntax, not words to look for.
+OPERATORS = set(['and', 'or', 'not', 'to'])
+
+
+def query_words(body):
+    """Return the words of the query_string queries of a search body.
+
+    Filters narrow the results rather than look for words, they are left out.
+    """
+    words = []
+
+    def visit(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'filter':
+                    continue
+                if key == 'query_string' and isinstance(value, dict):
+                    text = re.sub(r'\w+:', ' ', value.get('query', ''))
+                    words.extend(word for word in WORD_RE.findall(text.lower()) if word not in OPERATORS)
+                else:
+                    visit(value)
+        elif isinstance(node, list):
+            for value in node:
+                visit(value)
+
+    visit(body.get('query', {}))
+    return words
+
+
+class FakeIndex(object):
+    """Documents of one index, with the term counts of their ``text`` field."""
+
+    def __init__(self):
+        self.mappings = {}
+        self.documents = {}
+        self.terms = {}
+        self.lock = threading.Lock()
+
+    def put(self, doc_id, source):
+        """Add or replace a document."""
+        with self.lock:
+            self.documents[doc_id] = source
+            self.terms[doc_id] = Counter(WORD_RE.findall(str(source.get('text', '')).lower()))
+
+    def delete(self, doc_id):
+        """Remove a document."""
+        with self.lock:
+            self.documents.pop(doc_id, None)
+            self.terms.pop(doc_id, None)
+
+    def clear(self):
+        """Remove every document."""
+        with self.lock:
+            self.documents.clear()
+            self.terms.clear()
+
+    def search(self, body):
+        """Return the search response of a request body."""
+        words = query_words(body)
+        with self.lock:
+            if words:
+                scored = []
+                for doc_id, terms in self.terms.items():
+                    score = float(sum(terms[word] for word in words))
+                    if score:
+                        scored.append((score, doc_id))
+            else:
+                scored = [(1.0, doc_id) for doc_id in self.documents]
+            documents = dict((doc_id, self.documents[doc_id]) for _, doc_id in scored)
+
+        def sort_values(item):
+            score, doc_id = item
+            return [score, documents[doc_id].get('entry_id', 0)]
+
+        scored.sort(key=lambda item: (-item[0], documents[item[1]].get('entry_id', 0)))
+
+        if body.get('search_after'):
+            after_score, after_id = body['search_after']
+            scored = [
+                item for item in scored
+                if (-item[0], documents[item[1]].get('entry_id', 0)) > (-after_score, after_id)]
+            start = 0
+        else:
+            start = int(body.get('from', 0))
+
+        page = scored[start:start + int(body.get('size', 10))]
+        hits = []
+        for score, doc_id in page:
+            hit = {
+                '_index': 'haystack',
+                '_type': 'modelresult',
+                '_id': doc_id,
+                '_score': score,
+                '_source': documents[doc_id],
+            }
+            if 'sort' in body:
+                hit['sort'] = sort_values((score, doc_id))
+            hits.append(hit)
+
+        response = {
+            'took': 1,
+            'timed_out': False,
+            'hits': {
+                'total': len(scored),
+                'max_score': scored[0][0] if scored else None,
+                'hits': hits,
+            },
+        }
+
+        if 'facets' in body:
+            response['facets'] = {}
+            for name, options in body['facets'].items():
+                field = options.get('terms', {}).get('field', name)
+                counts = Counter(documents[doc_id].get(field) for _, doc_id in scored)
+                counts.pop(None, None)
+                response['facets'][name] = {
+                    '_type': 'terms',
+                    'terms': [{'term': term, 'count': count} for term, count in counts.most_common(100)],
+                }
+
+        return response
+
+
+class FakeElasticsearchHandler(BaseHTTPRequestHandler):
+    """Routes the requests to the indexes of the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        """Stay quiet."""
+
+    def read_body(self):
+        """Return the request body as bytes."""
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def respond(self, status, data=None):
+        """Send a JSON response."""
+        payload = json.dumps(data if data is not None else {}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def handle_request(self):
+        """Dispatch on the method and the path."""
+        server = self.server
+        server.count_request()
+        body = self.read_body()
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = [part for part in urlsplit(self.path).path.split('/') if part]
+        method = self.command
+
+        if not path:
+            return self.respond(200, {'version': {'number': '1.7.5'}, 'tagline': 'You Know, for Search'})
+
+        # /_bulk, /<index>/_bulk and /<index>/<type>/_bulk, where the index is the default of the actions.
+        if path[-1] == '_bulk' and len(path) <= 3:
+            return self.respond(200, server.bulk(body.decode('utf-8'), path[0] if len(path) > 1 else None))
+
+        name = path[0]
+        index = server.indexes.get(name)
+
+        if len(path) == 1:
+            if method == 'PUT':
+                if index is not None:
+                    return self.respond(400, {'error': 'IndexAlreadyExistsException[[%s] already exists]' % name})
+                server.indexes[name] = FakeIndex()
+                return self.respond(200, {'acknowledged': True})
+            if method == 'DELETE':
+                if server.indexes.pop(name, None) is None:
+                    return self.respond(404, {'error': 'IndexMissingException[[%s] missing]' % name})
+                return self.respond(200, {'acknowledged': True})
+            return self.respond(200 if index is not None else 404, {})
+
+        if index is None:
+            return self.respond(404, {'error': 'IndexMissingException[[%s] missing]' % name, 'status': 404})
+
+        action = path[-1]
+
+        if action == '_mapping' or (len(path) > 1 and path[1] == '_mapping'):
+            if method == 'PUT':
+                index.mappings.update(json.loads(body.decode('utf-8') or '{}'))
+                return self.respond(200, {'acknowledged': True})
+            return self.respond(200, {name: {'mappings': index.mappings}})
+
+        if action == '_refresh':
+            return self.respond(200, {'_shards': {'total': 1, 'successful': 1, 'failed': 0}})
+
+        if action == '_search':
+            return self.respond(200, index.search(json.loads(body.decode('utf-8') or '{}')))
+
+        if action == '_query' and method == 'DELETE':
+            index.clear()
+            return self.respond(200, {})
+
+        if method == 'DELETE' and len(path) == 3:
+            index.delete(path[2])
+            return self.respond(200, {'found': True})
+
+        return self.respond(400, {'error': 'Unsupported request %s %s' % (method, self.path)})
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = handle_request
+
+
+class FakeElasticsearch(ThreadingMixIn, HTTPServer):
+    """In-memory Elasticsearch stand-in, served from a background thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0):
+        HTTPServer.__init__(self, (host, port), FakeElasticsearchHandler)
+        self.latency = latency
+        self.indexes = {}
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base URL, for HAYSTACK_CONNECTIONS."""
+        return 'http://%s:%d/' % self.server_address[:2]
+
+    def handle_error(self, request, client_address):
+        """Clients giving up on a slow answer are expected, keep quiet about them."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            HTTPServer.handle_error(self, request, client_address)
+
+    def count_request(self):
+        """Count one more request."""
+        with self.requests_lock:
+            self.requests += 1
+
+    def bulk(self, payload, default_index=None):
+        """Apply a ``_bulk`` request; actions without an ``_index`` go to ``default_index``."""
+        lines = [line for line in payload.split('\n') if line.strip()]
+        items = []
+        position = 0
+
+        while position < len(lines):
+            action, metadata = list(json.loads(lines[position]).items())[0]
+            position += 1
+            name = metadata.get('_index', default_index)
+            index = self.indexes.setdefault(name, FakeIndex())
+
+            if action == 'delete':
+                index.delete(metadata['_id'])
+            else:
+                source = json.loads(lines[position])
+                position += 1
+                index.put(metadata.get('_id', source.get('id')), source)
+
+            items.append({action: {'_index': name, '_id': metadata.get('_id'), 'status': 200}})
+
+        return {'took': 1, 'errors': False, 'items': items}
+
+    def start(self):
+        """Serve in a daemon thread; returns the server."""
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    """Serve until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9201)
+    parser.add_argument('--latency', type=float, default=0, help='milliseconds added to every request')
+    args = parser.parse_args()
+
+    server = FakeElasticsearch(args.host, args.port, latency=args.latency / 1000.0)
+    print('Fake Elasticsearch listening on %s' % server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
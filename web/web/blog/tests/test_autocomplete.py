@@ -0,0 +1,57 @@
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from ..autocomplete import SOURCE_KEY, RadixTrie, Suggestions
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'autocomplete-test'}}
+
+
+class RadixTrieTestCase(SimpleTestCase):
+    """Test the compressed prefix trie."""
+
+    def setUp(self):
+        """Build a small trie."""
+        self.trie = RadixTrie(max_completions=3)
+        for key, weight in [('django', 5), ('django search', 20), ('djangocon', 3), ('dog', 7), ('do', 1)]:
+            self.trie.insert(key, weight)
+        self.trie.freeze()
+
+    def test_best_completions_first(self):
+        """Completions are ordered by weight and capped."""
+        self.assertEqual(self.trie.complete('d'), [(20, 'django search'), (7, 'dog'), (5, 'django')])
+        self.assertEqual(self.trie.complete('do'), [(7, 'dog'), (1, 'do')])
+
+    def test_prefix_inside_an_edge(self):
+        """A prefix ending in the middle of a compressed edge still completes."""
+        self.assertEqual(self.trie.complete('djangoc'), [(3, 'djangocon')])
+
+    def test_unknown_prefix(self):
+        """Unknown prefixes have no completions."""
+        self.assertEqual(self.trie.complete('flask'), [])
+
+    def test_highest_weight_wins(self):
+        """Inserting the same key twice keeps the highest weight."""
+        self.trie.insert('dog', 2)
+        self.trie.insert('dog', 30)
+        self.trie.freeze()
+        self.assertEqual(self.trie.complete('dog'), [(30, 'dog')])
+
+
+@override_settings(CACHES=LOCMEM)
+class SuggestionsTestCase(SimpleTestCase):
+    """Test the trie of the workers."""
+
+    def setUp(self):
+        """Start without a published source."""
+        cache.clear()
+        self.suggestions = Suggestions()
+
+    def test_requests_do_not_build_the_source(self):
+        """Without a published source there are no suggestions, until update_index publishes one."""
+        with mock.patch('web.blog.autocomplete.build_source') as build_source:
+            self.assertEqual(self.suggestions.suggest('dj'), [])
+        self.assertFalse(build_source.called)
+
+        cache.set(SOURCE_KEY, [('django', 10, 'Django')], None)
+        self.suggestions.checked_at = 0
+        self.assertEqual(self.suggestions.suggest('dj'), ['Django'])
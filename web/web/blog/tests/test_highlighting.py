@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+from haystack.utils import Highlighter
+from ..highlighting import FastHighlighter, MultiTermMatcher
+
+
+class MultiTermMatcherTestCase(SimpleTestCase):
+    """Test the Aho-Corasick matcher."""
+
+    def test_overlapping_terms(self):
+        """Matches are leftmost-longest and never overlap."""
+        matcher = MultiTermMatcher(['he', 'she', 'his', 'hers'])
+        self.assertEqual(matcher.find_all('ushers'), [(1, 4)])
+        self.assertEqual(matcher.find_all('ahishers'), [(1, 4), (4, 8)])
+
+    def test_no_match(self):
+        """Text without any term gives no matches."""
+        self.assertEqual(MultiTermMatcher(['django']).find_all('flask only'), [])
+
+
+class FastHighlighterTestCase(SimpleTestCase):
+    """Test FastHighlighter against haystack's Highlighter."""
+
+    text = '<p>Django is great. ' + 'lorem ipsum ' * 50 + 'Django search with haystack and search engines</p>'
+
+    def test_same_output_as_haystack(self):
+        """Terms which do not overlap are highlighted as by the default highlighter."""
+        for query in ('django search', 'haystack', 'nothing'):
+            self.assertEqual(
+                FastHighlighter(query).highlight(self.text),
+                Highlighter(query).highlight(self.text))
+
+    def test_overlapping_terms_wrapped_once(self):
+        """A term inside a longer one is not wrapped again."""
+        self.assertEqual(
+            FastHighlighter('search elasticsearch').highlight('elasticsearch and search'),
+            '<span class="highlighted">elasticsearch</span> and <span class="highlighted">search</span>')
+
+    def test_bounded_scan(self):
+        """Only the first max_scan_length characters are looked at."""
+        highlighter = FastHighlighter('haystack', max_scan_length=100)
+        highlighted = highlighter.highlight(self.text)
+        self.assertNotIn('highlighted', highlighted)
+        self.assertTrue(highlighted.endswith('...'))
@@ -0,0 +1,69 @@
+import datetime
+from unittest import mock
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from web.users.models import User
+from ..models import Entry, RelatedEntry
+from ..related import compute_related_entries, similarity_blocks, tfidf_matrix, top_neighbours
+
+
+class RelatedEntriesTestCase(SimpleTestCase):
+    """Test the TF-IDF neighbours."""
+
+    documents = [
+        ['django', 'search', 'haystack'],
+        ['django', 'search', 'elasticsearch'],
+        ['cooking', 'pasta'],
+        ['pasta', 'sauce', 'cooking'],
+        [],
+    ]
+
+    def test_rows_are_normalised(self):
+        """Every non-empty row has unit length."""
+        matrix = tfidf_matrix(self.documents)
+        norms = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+        np.testing.assert_allclose(norms, [1, 1, 1, 1, 0])
+
+    def test_top_neighbours(self):
+        """The most similar other row comes first, whatever the block size."""
+        matrix = tfidf_matrix(self.documents)
+        for block_size in (1, 2, 10):
+            neighbours = dict(top_neighbours(matrix, np.arange(5), top_k=1, block_size=block_size))
+            best = [neighbours[row][0][0] for row in range(4)]
+            self.assertEqual(best, [1, 0, 3, 2])
+            self.assertEqual(neighbours[4], [])
+
+
+class ComputeRelatedEntriesTestCase(TestCase):
+    """Test the incremental refresh of the related entries."""
+
+    def setUp(self):
+        user = User.objects.create_user('related', 'related@gmail.com', 'abc@123')
+        self.entries = dict(
+            (title, Entry.default.create(title=title, text=text, summary='summary', created_by=user,
+                                         published_date=datetime.datetime(2016, 4, 8)))
+            for title, text in [('a', 'django search haystack'), ('b', 'django search elasticsearch'),
+                                ('c', 'cooking pasta'), ('d', 'pasta sauce cooking')])
+
+    def related(self):
+        """Titles of the related entries, by entry title."""
+        related = dict((title, set()) for title in self.entries)
+        for title, related_title in RelatedEntry.objects.values_list('entry__title', 'related__title'):
+            related[title].add(related_title)
+        return related
+
+    def test_incremental_matches_full(self):
+        """Changed and unpublished entries are refreshed in one pass, as a full run would."""
+        self.assertEqual(compute_related_entries(top_k=2), 4)
+        self.assertEqual(self.related(), {'a': {'b'}, 'b': {'a'}, 'c': {'d'}, 'd': {'c'}})
+        self.assertEqual(compute_related_entries(top_k=2), 0)
+
+        Entry.default.filter(title='b').update(text='cooking pasta')
+        Entry.default.filter(title='d').update(is_published=False)
+        with mock.patch('web.blog.related.similarity_blocks', side_effect=similarity_blocks) as blocks:
+            self.assertEqual(compute_related_entries(top_k=2), 1)
+
+        self.assertEqual(blocks.call_count, 1)
+        self.assertEqual(self.related(), {'a': set(), 'b': {'c'}, 'c': {'b'}, 'd': set()})
+        compute_related_entries(full=True, top_k=2)
+        self.assertEqual(self.related(), {'a': set(), 'b': {'c'}, 'c': {'b'}, 'd': set()})
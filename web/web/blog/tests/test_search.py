@@ -0,0 +1,189 @@
+import datetime
+from unittest import mock
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase, TestCase
+from haystack import connection_router, connections
+from web.users.models import User
+from .. import search_backends
+from ..forms import SearchFilterForm
+from ..models import Comment, Entry
+from ..search import SearchPage, build_entry_search, search_entries
+from ..search_indexes import EntryIndex
+from ..signals import BlogSignalProcessor
+from .fake_elasticsearch import FakeElasticsearch
+
+# Connection of the fake node, next to the configured ones.
+ALIAS = 'blog-search-test'
+
+
+def create_entries():
+    """Two entries about django, with 2 and 0 comments, and one about flask; plus a spam comment."""
+    user = User.objects.create_user('searcher', 'searcher@gmail.com', 'abc@123')
+    entries = dict(
+        (title, Entry.default.create(title=title, text=text, summary='summary', created_by=user,
+                                     published_date=datetime.datetime(2016, 4, 8)))
+        for title, text in [('Django search', 'django haystack'), ('Django forms', 'django forms'),
+                            ('Flask', 'flask jinja')])
+    for text, is_spam in [('first', False), ('second', False), ('buy now', True)]:
+        Comment.default.create(entry=entries['Django search'], text=text, user_name='reader',
+                               user_url='http://example.com/', is_spam=is_spam)
+    return entries
+
+
+class SearchFilterFormTestCase(SimpleTestCase):
+    """Test the filters of the entry search."""
+
+    def test_valid(self):
+        """Empty filters are None, zero comments is a filter."""
+        form = SearchFilterForm({'author': 'admin', 'month': '2016-04', 'comments': '0'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['comments'], 0)
+        self.assertIsNone(form.cleaned_data['min_comments'])
+
+    def test_invalid(self):
+        """Months are YYYY-MM, comment counts are not negative."""
+        form = SearchFilterForm({'month': '2016-4', 'min_comments': '-1', 'comments': 'many'})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'month', 'min_comments', 'comments'})
+
+
+class BuildEntrySearchTestCase(SimpleTestCase):
+    """Test the query built for the filters."""
+
+    def test_facets(self):
+        """Every filterable field is faceted, unless facets are not wanted."""
+        self.assertEqual(
+            set(build_entry_search('django').query.facets),
+            {'author_exact', 'published_month_exact', 'comment_count_exact'})
+        self.assertEqual(build_entry_search('django', facets=False).query.facets, {})
+
+    def test_filters(self):
+        """The author narrows the search, an exact count of zero still filters."""
+        sqs = build_entry_search('django', author='admin', comments=0)
+        self.assertIn(u'author_exact:"admin"', sqs.query.narrow_queries)
+        self.assertIn('comment_count', sqs.query.build_query())
+        self.assertNotIn('comment_count', build_entry_search('django').query.build_query())
+
+
+class SearchEntriesTestCase(TestCase):
+    """Test the search pages against a fake Elasticsearch node."""
+
+    def setUp(self):
+        """Index the entries in the fake node."""
+        self.node = FakeElasticsearch().start()
+        self.addCleanup(self.node.stop)
+
+        connection = {'ENGINE': 'web.blog.search_backends.EntrySearchEngine', 'URL': self.node.url,
+                      'INDEX_NAME': 'test', 'TIMEOUT': 5}
+        for patcher in (mock.patch.dict(connections.connections_info, {ALIAS: connection}),
+                        mock.patch.dict(search_backends._clients),
+                        mock.patch.dict(search_backends._breakers)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(connections._connections.pop, ALIAS, None)
+
+        self.entries = create_entries()
+        self.index = connections[ALIAS].get_unified_index().get_index(Entry)
+        connections[ALIAS].get_backend().update(self.index, list(self.index.index_queryset(using=ALIAS)))
+
+    def test_hits_count_and_facets_in_one_request(self):
+        """The page, the total and the facets come from a single search."""
+        requests = self.node.requests
+        page = search_entries('django', using=ALIAS)
+
+        self.assertEqual(self.node.requests - requests, 1)
+        self.assertEqual(sorted(hit.object.title for hit in page.hits), ['Django forms', 'Django search'])
+        self.assertEqual(page.total, 2)
+        self.assertFalse(page.stale)
+        # The spam comment is not counted.
+        self.assertEqual(sorted(page.facets['comment_count']), [(0, 1), (2, 1)])
+        self.assertEqual(sorted(page.facets['author']), [('searcher', 2)])
+
+    def test_offset(self):
+        """Later pages skip the hits of the previous ones, and keep the total."""
+        first = search_entries('django', limit=1, using=ALIAS)
+        second = search_entries('django', offset=1, limit=1, using=ALIAS)
+        self.assertEqual(len(second.hits), 1)
+        self.assertNotEqual(first.hits[0].pk, second.hits[0].pk)
+        self.assertEqual(second.total, 2)
+
+    def test_comment_counts_in_one_query(self):
+        """The index queryset counts the comments which are not spam."""
+        with self.assertNumQueries(1):
+            counts = dict((entry.title, self.index.prepare_comment_count(entry))
+                          for entry in self.index.index_queryset(using=ALIAS))
+        self.assertEqual(counts, {'Django search': 2, 'Django forms': 0, 'Flask': 0})
+
+
+class EntrySearchViewTestCase(TestCase):
+    """Test the pages of the search view."""
+
+    def test_pages(self):
+        """The page parameter moves the offset; the links keep the query."""
+        page = SearchPage(hits=[], total=45, facets={}, stale=False)
+        with mock.patch('web.blog.views.search_entries', return_value=page) as search:
+            response = self.client.get(reverse('blog:entry_search') + '?queryset=django&page=2')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(search.call_args[1]['offset'], 20)
+        self.assertEqual(response.context['previous_page'], '?queryset=django&page=1')
+        self.assertEqual(response.context['next_page'], '?queryset=django&page=3')
+
+    def test_invalid_page(self):
+        """Pages start at 1."""
+        with mock.patch('web.blog.views.search_entries') as search:
+            self.client.get(reverse('blog:entry_search') + '?queryset=django&page=0')
+        self.assertFalse(search.called)
+
+
+class QuietBlogSignalProcessor(BlogSignalProcessor):
+    """BlogSignalProcessor which is not connected to the model signals."""
+
+    def setup(self):
+        pass
+
+    def teardown(self):
+        pass
+
+
+class BlogSignalProcessorTestCase(TestCase):
+    """Test the index updates of the signal processor."""
+
+    def setUp(self):
+        """Create the entries, then a processor of their changes."""
+        self.entries = create_entries()
+        self.processor = QuietBlogSignalProcessor(connections, connection_router)
+        self.backend = connections['default'].get_backend()
+
+    def test_comment_reindexes_its_entry(self):
+        """Saving a comment updates the index of its entry."""
+        comment = Comment.default.filter(entry=self.entries['Django search']).first()
+        with mock.patch.object(EntryIndex, 'update_object') as update_object:
+            self.processor.handle_save(Comment, comment)
+        update_object.assert_called_once_with(self.entries['Django search'], using='default')
+
+    def test_batch_sends_one_request_per_action(self):
+        """Changes of a batch are coalesced and sent when it ends."""
+        entry = self.entries['Django search']
+        comment = Comment.default.filter(entry=entry).first()
+
+        with mock.patch.object(self.backend, 'update') as update, \
+                mock.patch.object(self.backend, 'remove_many') as remove_many:
+            with self.processor.batch():
+                self.processor.handle_save(Entry, entry)
+                self.processor.handle_save(Comment, comment)
+                self.processor.handle_delete(Entry, self.entries['Flask'])
+                self.assertFalse(update.called)
+
+        self.assertEqual(update.call_count, 1)
+        self.assertEqual(update.call_args[0][1], [entry])
+        remove_many.assert_called_once_with(['blog.entry.{0}'.format(self.entries['Flask'].pk)])
+
+    def test_failed_batch_sends_nothing(self):
+        """Nothing is sent when the block raises."""
+        with mock.patch.object(self.backend, 'update') as update:
+            with self.assertRaises(ValueError):
+                with self.processor.batch():
+                    self.processor.handle_save(Entry, self.entries['Flask'])
+                    raise ValueError()
+        self.assertFalse(update.called)
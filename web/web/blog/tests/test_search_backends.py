@@ -0,0 +1,145 @@
+import time
+from unittest import mock
+from django.test import SimpleTestCase
+from elasticsearch import Elasticsearch
+from .. import search_backends
+from ..search_backends import CircuitBreaker, EntrySearchBackend, SearchClient, SearchUnavailable
+from .fake_elasticsearch import FakeElasticsearch, FakeIndex
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    """Test the circuit breaker states."""
+
+    def test_opens_after_threshold(self):
+        """Failures in a row open the circuit, a success in between resets the count."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.metrics()['rejected'], 1)
+
+    def test_single_trial_when_half_open(self):
+        """After the reset timeout only one call goes through until it is recorded."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, 'half-open')
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class FakeElasticsearchTestCase(SimpleTestCase):
+    """Test the fake node the way haystack's backend calls it."""
+
+    def setUp(self):
+        """Start the fake node."""
+        self.node = FakeElasticsearch().start()
+        self.addCleanup(self.node.stop)
+        self.client = Elasticsearch([self.node.url])
+
+    def test_bulk_with_index_and_type(self):
+        """Bulk requests on an index and a type index their actions there."""
+        body = [
+            {'index': {'_id': 'blog.entry.1'}}, {'text': 'django search'},
+            {'index': {'_id': 'blog.entry.2'}}, {'text': 'flask'},
+        ]
+        self.client.bulk(body=body, index='haystack', doc_type='modelresult')
+        self.assertEqual(sorted(self.node.indexes['haystack'].documents), ['blog.entry.1', 'blog.entry.2'])
+
+    def test_filters_are_not_query_words(self):
+        """Only the query part of a filtered query looks for words."""
+        self.client.bulk(body=[{'index': {'_id': '1'}}, {'text': 'django'}, {'index': {'_id': '2'}}, {'text': 'flask'}],
+                         index='haystack', doc_type='modelresult')
+        body = {'query': {'filtered': {
+            'query': {'query_string': {'query': 'django'}},
+            'filter': {'fquery': {'query': {'query_string': {'query': 'flask'}}}},
+        }}}
+        hits = self.client.search(body=body, index='haystack', doc_type='modelresult')['hits']['hits']
+        self.assertEqual([hit['_id'] for hit in hits], ['1'])
+
+
+class SearchClientTestCase(SimpleTestCase):
+    """Test the search deadline and the breaker against a slow fake node."""
+
+    body = {'query': {'query_string': {'query': 'django'}}}
+
+    def setUp(self):
+        """Start the fake node."""
+        self.node = FakeElasticsearch().start()
+        self.addCleanup(self.node.stop)
+        self.node.indexes['haystack'] = FakeIndex()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+        self.client = SearchClient(self.node.url, search_timeout=0.1, breaker=self.breaker)
+
+    def search(self):
+        """Search the fake index."""
+        return self.client.search(body=self.body, index='haystack', doc_type='modelresult')
+
+    def test_fast_node(self):
+        """A node answering in time is used normally."""
+        self.assertEqual(self.search()['hits']['total'], 0)
+        self.assertEqual(self.breaker.metrics()['timeouts'], 0)
+
+    def test_slow_node(self):
+        """Slow answers time out at the deadline, then the open circuit fails fast."""
+        self.node.latency = 0.5
+
+        for _ in range(2):
+            started = time.time()
+            with self.assertRaises(SearchUnavailable):
+                self.search()
+            self.assertLess(time.time() - started, 0.4)
+
+        requests = self.node.requests
+        with self.assertRaises(SearchUnavailable):
+            self.search()
+        self.assertEqual(self.node.requests, requests)
+
+        metrics = self.breaker.metrics()
+        self.assertEqual(metrics['timeouts'], 2)
+        self.assertEqual(metrics['state'], 'open')
+
+        # The node recovers: the trial search after the reset timeout closes the circuit.
+        self.node.latency = 0
+        time.sleep(0.35)
+        self.search()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertGreater(self.breaker.metrics()['open_seconds'], 0.3)
+
+    def test_unexpected_error_ends_the_trial(self):
+        """A trial call failing with any other error reopens the circuit instead of keeping it half-open."""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        time.sleep(0.35)
+
+        with mock.patch('elasticsearch.Elasticsearch.search', side_effect=ValueError('garbled body')):
+            with self.assertRaises(ValueError):
+                self.search()
+        self.assertEqual(self.breaker.state, 'open')
+
+        time.sleep(0.35)
+        self.search()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    @mock.patch.dict(search_backends._clients)
+    @mock.patch.dict(search_backends._breakers)
+    def test_first_search_setup(self):
+        """The mapping requests of a first search have the search deadline and go through the breaker."""
+        self.node.latency = 0.5
+        backend = EntrySearchBackend(
+            'setup-test', URL=self.node.url, INDEX_NAME='haystack', SEARCH_TIMEOUT=0.1, FAILURE_THRESHOLD=1)
+
+        started = time.time()
+        with self.assertRaises(SearchUnavailable):
+            backend.search('django')
+        self.assertLess(time.time() - started, 0.4)
+        self.assertFalse(backend.setup_complete)
+
+        metrics = backend.conn.breaker.metrics()
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertEqual(metrics['state'], 'open')
@@ -0,0 +1,62 @@
+from django.test import SimpleTestCase
+from ..search import InvalidCursor, dump_cursor, load_cursor
+from ..search_backends import EntrySearchBackend
+
+
+class SearchCursorTestCase(SimpleTestCase):
+    """Test the signed cursors of the entry search."""
+
+    def test_round_trip(self):
+        """A cursor gives back the position it was made with."""
+        token = dump_cursor('django', {'author': 'admin'}, [1.5, 42])
+        self.assertEqual(load_cursor(token, 'django', {'author': 'admin'}, search_after=True), [1.5, 42])
+        token = dump_cursor('django', {'author': 'admin'}, 20)
+        self.assertEqual(load_cursor(token, 'django', {'author': 'admin'}), 20)
+
+    def test_other_kind(self):
+        """Offsets are not sort values, and the other way round."""
+        with self.assertRaises(InvalidCursor):
+            load_cursor(dump_cursor('django', {}, 20), 'django', {}, search_after=True)
+        for position in ([1.5, 42], True, -20):
+            with self.assertRaises(InvalidCursor):
+                load_cursor(dump_cursor('django', {}, position), 'django', {})
+
+    def test_other_search(self):
+        """A cursor cannot be replayed against another query or filters."""
+        token = dump_cursor('django', {'author': 'admin'}, [1.5, 42])
+        with self.assertRaises(InvalidCursor):
+            load_cursor(token, 'flask', {'author': 'admin'})
+        with self.assertRaises(InvalidCursor):
+            load_cursor(token, 'django', {'author': 'guest'})
+
+    def test_tampered(self):
+        """A modified cursor is rejected."""
+        token = dump_cursor('django', {}, [1.5, 42])
+        with self.assertRaises(InvalidCursor):
+            load_cursor(token[:-2] + 'xx', 'django', {})
+
+
+class EntrySearchBackendTestCase(SimpleTestCase):
+    """Test the search_after request body."""
+
+    def setUp(self):
+        """Create a backend without connecting to it."""
+        self.backend = EntrySearchBackend('default', URL='http://localhost:9200/', INDEX_NAME='test')
+
+    def test_search_after(self):
+        """Cursor searches sort on score and entry_id and resume after the position."""
+        kwargs = self.backend.build_search_kwargs('django', search_after=[1.5, 42])
+        self.assertEqual(kwargs['sort'], EntrySearchBackend.CURSOR_SORT)
+        self.assertEqual(kwargs['search_after'], [1.5, 42])
+
+    def test_first_page(self):
+        """The first cursor page is sorted but does not resume."""
+        kwargs = self.backend.build_search_kwargs('django', search_after=[])
+        self.assertEqual(kwargs['sort'], EntrySearchBackend.CURSOR_SORT)
+        self.assertNotIn('search_after', kwargs)
+
+    def test_offsets_by_default(self):
+        """search_after is only used where the connection enables it."""
+        self.assertFalse(self.backend.supports_search_after)
+        backend = EntrySearchBackend('default', URL='http://localhost:9200/', INDEX_NAME='test', SEARCH_AFTER=True)
+        self.assertTrue(backend.supports_search_after)
@@ -0,0 +1,77 @@
+from collections import Counter
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from ..cache import SEARCH_INDEX_GENERATION, bump_generation
+from ..spelling import DICTIONARY_KEY, Speller, SpellingDictionary, edit_distance
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'spelling-test'}}
+
+
+class EditDistanceTestCase(SimpleTestCase):
+    """Test the bounded edit distance."""
+
+    def test_transposition(self):
+        """Swapping two adjacent characters is one edit."""
+        self.assertEqual(edit_distance('djagno', 'django', 2), 1)
+
+    def test_limit(self):
+        """Distances above the limit are not computed."""
+        self.assertIsNone(edit_distance('flask', 'django', 2))
+
+
+class SpellingDictionaryTestCase(SimpleTestCase):
+    """Test the symmetric delete dictionary."""
+
+    def setUp(self):
+        """Build a small dictionary."""
+        self.dictionary = SpellingDictionary.build(
+            Counter({'django': 50, 'search': 30, 'haystack': 10, 'elasticsearch': 5, 'seared': 1}))
+
+    def test_lookup(self):
+        """Misspelled words get the closest, then most frequent, known term."""
+        self.assertEqual(self.dictionary.lookup('djagno'), 'django')
+        self.assertEqual(self.dictionary.lookup('serch'), 'search')
+        self.assertEqual(self.dictionary.lookup('elasticsaerch'), 'elasticsearch')
+        self.assertIsNone(self.dictionary.lookup('xyzzy'))
+
+    def test_correct(self):
+        """Only queries with unknown words get a correction."""
+        self.assertEqual(self.dictionary.correct('Djagno hastack'), 'django haystack')
+        self.assertIsNone(self.dictionary.correct('django search'))
+
+    def test_dumps_and_loads(self):
+        """A dumped dictionary gives the same answers once loaded."""
+        loaded = SpellingDictionary.loads(self.dictionary.dumps())
+        self.assertEqual(loaded.lookup('hastack'), 'haystack')
+        self.assertEqual(loaded.terms, self.dictionary.terms)
+
+
+@override_settings(CACHES=LOCMEM)
+class SpellerTestCase(SimpleTestCase):
+    """Test the dictionary of the workers."""
+
+    def setUp(self):
+        """Start without a published dictionary."""
+        cache.clear()
+        self.speller = Speller()
+
+    def test_requests_do_not_build_the_dictionary(self):
+        """Without a published dictionary there are no suggestions, until update_index publishes one."""
+        with mock.patch('web.blog.spelling.build_dictionary') as build_dictionary:
+            self.assertIsNone(self.speller.suggest('djagno'))
+        self.assertFalse(build_dictionary.called)
+
+        cache.set(DICTIONARY_KEY, SpellingDictionary.build(Counter({'django': 1})).dumps(), None)
+        self.speller.checked_at = 0
+        self.assertEqual(self.speller.suggest('djagno'), 'django')
+
+    def test_new_generation_is_loaded(self):
+        """Workers load the dictionary again once a new index generation is published."""
+        cache.set(DICTIONARY_KEY, SpellingDictionary.build(Counter({'django': 1})).dumps(), None)
+        self.assertIsNone(self.speller.suggest('flaks'))
+
+        cache.set(DICTIONARY_KEY, SpellingDictionary.build(Counter({'django': 1, 'flask': 1})).dumps(), None)
+        bump_generation(SEARCH_INDEX_GENERATION)
+        self.speller.checked_at = 0
+        self.assertEqual(self.speller.suggest('flaks'), 'flask')
@@ -0,0 +1,32 @@
+from django.core.urlresolvers import reverse
+from django.test import SimpleTestCase
+from .. import urlbuilder
+from ..urlbuilder import build_url
+
+
+class BuildUrlTestCase(SimpleTestCase):
+    """build_url gives what reverse gives."""
+
+    def setUp(self):
+        urlbuilder.clear_templates()
+
+    def test_same_as_reverse(self):
+        """Compiled routes, namespaced or not, build the paths reverse builds."""
+        routes = [
+            ('blog:entry_details', {'year': '2016', 'month': '04', 'day': '08', 'slug': 'django-search'}),
+            ('blog:author', {'username': 'ann.lee@example'}),
+            ('api_dispatch_detail', {'api_name': 'v1', 'resource_name': 'entry', 'pk': 12}),
+            ('api_dispatch_detail', {'api_name': 'v1', 'resource_name': 'users', 'username': 'ann lee'}),
+        ]
+        for viewname, kwargs in routes:
+            self.assertEqual(build_url(viewname, **kwargs), reverse(viewname, kwargs=kwargs))
+            self.assertEqual(build_url(viewname, **kwargs), reverse(viewname, kwargs=kwargs))
+
+        self.assertNotIn(urlbuilder.UNCOMPILED, urlbuilder._templates.values())
+
+    def test_template_reused(self):
+        """Other values format the compiled template."""
+        build_url('blog:author', username='first')
+        self.assertEqual(len(urlbuilder._templates), 1)
+        self.assertEqual(build_url('blog:author', username='second'), reverse('blog:author', args=['second']))
+        self.assertEqual(len(urlbuilder._templates), 1)
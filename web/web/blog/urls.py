@@ -47,7 +47,7 @@ urlpatterns = [
     ),
     # URL pattern for Author
     url(
-        regex=r'author/(?P<username>[\w.@+-]+)/$',
+        regex=r'^author/(?P<username>[\w.@+-]+)/$',
         view=views.AuthorView.as_view(),
         name='author',
     ),
@@ -1,7 +1,16 @@
 """Public."""
+import re
 from .models import Blog
 
+TAG_RE = re.compile(r'<[^>]*>')
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
 
 def is_blog_installed():
     """Docstring."""
     return Blog.objects.get_blog()
+
+
+def tokenize(text):
+    """Split a text into lower case words, ignoring the HTML tags."""
+    return WORD_RE.findall(TAG_RE.sub(' ', text or '').lower())
@@ -7,10 +7,11 @@ from datetime import datetime
 from web.users.models import User
 from . import utils
 from . import mixins
-from .models import Blog, Entry, Comment
-from .forms import BlogForm, EntryForm, CommentForm, SearchForm
-from haystack.query import SearchQuerySet
-from haystack.utils import Highlighter
+from .models import Blog, Entry, Comment, RelatedEntry
+from .forms import BlogForm, EntryForm, CommentForm, SearchFilterForm, SearchForm
+from .search import FACET_PARAMS, PAGE_SIZE, search_entries
+from .search_backends import SearchUnavailable
+from .spelling import speller
 
 
 # BEST PRACTICES CBVS
@@ -152,7 +153,11 @@ class DetailsView(DetailView):
         entry = context['entry']
         comment_form = CommentForm(initial=init_data)
         comments = Comment.objects.filter(entry=entry, is_spam=False)
-        context.update({'comments': comments, 'comment_form': comment_form})
+        # Precomputed by compute_related_entries, one query on the (entry, rank) index
+        related_entries = [
+            related.related for related in
+            RelatedEntry.objects.filter(entry=entry).select_related('related').order_by('rank')]
+        context.update({'comments': comments, 'comment_form': comment_form, 'related_entries': related_entries})
         return context
 
     def get_object(self):
@@ -227,23 +232,63 @@ class AuthorView(ListView):
         context['author'] = self.kwargs['author']
         return context
 
+
+def search_page_url(request, number):
+    """Query string of another page of the current search."""
+    params = request.GET.copy()
+    params['page'] = number
+    return '?' + params.urlencode()
+
+
 def entry_search(request):
     form = SearchForm()
     anry = None
     results = None
     total_results = None
+    facets = None
+    suggestion = None
+    previous_page = None
+    next_page = None
+    stale = False
+    unavailable = False
     if 'queryset' in request.GET:
         form = SearchForm(request.GET)
         if form.is_valid():
             anry = form.cleaned_data
-            results = SearchQuerySet().models(Entry).filter(content=anry['queryset']).load_all()
-
-            # Count total results
-            total_results = results.count()
+            page_number = anry['page'] or 1
+            offset = (page_number - 1) * PAGE_SIZE
+            # Hits, count and facets come from a single search request
+            try:
+                page = search_entries(
+                    anry['queryset'],
+                    highlight=True,
+                    offset=offset,
+                    limit=PAGE_SIZE,
+                    **dict((name, anry[name]) for name in SearchFilterForm.base_fields))
+            except SearchUnavailable:
+                unavailable = True
+            else:
+                results = page.hits
+                total_results = page.total
+                stale = page.stale
+                facets = [(param, page.facets.get(field, [])) for field, param in FACET_PARAMS]
+                if not page.total:
+                    suggestion = speller.suggest(anry['queryset'])
+                if page_number > 1:
+                    previous_page = search_page_url(request, page_number - 1)
+                if offset + len(page.hits) < page.total:
+                    next_page = search_page_url(request, page_number + 1)
 
     return render(request, 'blog/search.html', {
         'form': form,
         'cd': anry,
         'results': results,
-        'total_results': total_results}
+        'total_results': total_results,
+        'facets': facets,
+        'suggestion': suggestion,
+        'previous_page': previous_page,
+        'next_page': next_page,
+        'stale': stale,
+        'unavailable': unavailable},
+        status=503 if unavailable else 200
     )
@@ -0,0 +1,48 @@
+"""Create the users of an HR export."""
+import csv
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from ...provisioning import BATCH_SIZE, provision_users
+
+
+class Command(BaseCommand):
+    """Bulk create users, with their profiles and API keys, from a CSV file."""
+
+    help = ("Create the users of a CSV file with a header row: username, email and optionally password, "
+            "first_name, last_name and name. Rows without a password get an unusable one.")
+
+    def add_arguments(self, parser):
+        """Add the options."""
+        parser.add_argument('path', help="CSV file, - for the standard input.")
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Processes hashing the passwords, one per CPU by default.")
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE, dest='batch_size',
+            help="Users per transaction.")
+
+    def handle(self, **options):
+        """Run the import and report its throughput."""
+        if options['path'] == '-':
+            rows = list(csv.DictReader(sys.stdin))
+        else:
+            try:
+                with io.open(options['path'], encoding='utf-8', newline='') as export:
+                    rows = list(csv.DictReader(export))
+            except IOError as e:
+                raise CommandError("Cannot read %s: %s" % (options['path'], e))
+
+        result = provision_users(rows, workers=options['workers'], batch_size=options['batch_size'])
+
+        if options['verbosity'] >= 2:
+            for number, reason in result.skipped:
+                self.stdout.write("Skipped row %d: %s" % (number, reason))
+
+        if options['verbosity'] >= 1:
+            rate = result.created / result.seconds if result.seconds else 0
+            self.stdout.write(
+                "Created %d users in %.2fs (%.0f users/s; hashing %.2fs, inserting %.2fs), skipped %d rows" % (
+                    result.created, result.seconds, rate, result.hashing_seconds, result.insert_seconds,
+                    len(result.skipped)))
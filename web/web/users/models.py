@@ -6,10 +6,12 @@ from django.core.urlresolvers import reverse
 from django.db import models
 from django.db.models import signals
 from django.conf import settings
-from django.utils.encoding import python_2_unicode_compatible
+from django.core.cache import cache
+from django.utils.encoding import force_bytes, python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 from allauth.socialaccount.models import SocialAccount
-from tastypie.models import create_api_key
+from tastypie.models import ApiKey, create_api_key
+from web.blog.cache import UNTRACKED_FIELDS, bump_generation, bump_model_generation, get_generation, model_generation
 
 import hashlib
 
@@ -45,5 +47,48 @@ class Profile(models.Model):
     def __str__(self):
         return 'Profile for user {}'.format(self.user.username)
 
+
+def credentials_generation(user_id):
+    """Name of the generation counter of the API credentials of a user."""
+    return 'credentials:{0}'.format(user_id)
+
+
+def bump_credentials_generation(sender, instance, **kwargs):
+    """Make the API credentials of the user verified so far stale, see core.api.authentication."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and UNTRACKED_FIELDS.issuperset(update_fields):
+        return
+
+    bump_generation(credentials_generation(instance.user_id if sender is ApiKey else instance.pk))
+
+
+# Seconds a username lookup is cached; lookups of missing usernames are kept for less.
+USER_ID_TIMEOUT = 3600
+MISSING_USER_ID_TIMEOUT = 300
+
+
+def get_user_id(username):
+    """Id of the user with a username, None without one; cached, misses included.
+
+    The cache key carries the generation of the users, so creating, renaming
+    or deleting any user makes every cached lookup stale.
+    """
+    generation = get_generation(model_generation(User))
+    key = 'user-id:{0}:{1}'.format(generation, hashlib.md5(force_bytes(username)).hexdigest())
+    user_id = cache.get(key)
+
+    if user_id is None:
+        user_id = User.objects.filter(username=username).values_list('pk', flat=True).first() or 0
+        cache.set(key, user_id, USER_ID_TIMEOUT if user_id else MISSING_USER_ID_TIMEOUT)
+
+    return user_id or None
+
+
 User.profile = property(lambda u: Profile.objects.get_or_create(user=u)[0])
 signals.post_save.connect(create_api_key, sender=User)
+signals.post_save.connect(bump_model_generation, sender=User)
+signals.post_delete.connect(bump_model_generation, sender=User)
+signals.post_save.connect(bump_credentials_generation, sender=User)
+signals.post_delete.connect(bump_credentials_generation, sender=User)
+signals.post_save.connect(bump_credentials_generation, sender=ApiKey)
+signals.post_delete.connect(bump_credentials_generation, sender=ApiKey)
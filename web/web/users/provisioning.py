@@ -0,0 +1,178 @@
+"""Creation of many users at once, for the accounts of the HR exports.
+
+Creating users one by one costs two uniqueness queries, a password hash
+and an insert per user, plus the ApiKey insert of the post_save hook.
+``provision_users`` checks the usernames and emails of a whole batch in
+two queries, hashes the passwords on a pool of processes, then inserts
+the users, their profiles and their API keys with ``bulk_create``, one
+transaction per batch. ``bulk_create`` sends no signals, so the users'
+model generation is bumped once at the end.
+"""
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from tastypie.models import ApiKey
+from web.blog.cache import bump_model_generation
+from .models import Profile, User
+
+BATCH_SIZE = 1000
+
+# Values per IN clause of the uniqueness queries, below the SQL variable limits.
+LOOKUP_BATCH_SIZE = 500
+
+# Optional columns of a row, besides username and email.
+OPTIONAL_FIELDS = ('first_name', 'last_name', 'name')
+
+# created: number of users created; skipped: (row number, reason) of the rows left out;
+# seconds spent in total, hashing and inserting.
+ProvisioningResult = namedtuple(
+    'ProvisioningResult', ['created', 'skipped', 'seconds', 'hashing_seconds', 'insert_seconds'])
+
+
+def hash_password(raw_password):
+    """``make_password`` in a pool process, which may have to set Django up first."""
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    return make_password(raw_password)
+
+
+def hash_passwords(passwords, executor=None, chunksize=1):
+    """Hash passwords, on the processes of ``executor`` when given; blank ones become unusable."""
+    hashed = [make_password(None) if not password else None for password in passwords]
+    pending = [index for index, password in enumerate(passwords) if password]
+
+    if executor is not None and len(pending) > 1:
+        results = executor.map(hash_password, [passwords[index] for index in pending], chunksize=chunksize)
+    else:
+        results = [make_password(passwords[index]) for index in pending]
+
+    for index, result in zip(pending, results):
+        hashed[index] = result
+    return hashed
+
+
+def existing_values(field, values):
+    """Values of ``field`` already taken, looked up ``LOOKUP_BATCH_SIZE`` at a time."""
+    values = list(values)
+    taken = set()
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        chunk = values[start:start + LOOKUP_BATCH_SIZE]
+        taken.update(User.objects.filter(**{field + '__in': chunk}).values_list(field, flat=True))
+    return taken
+
+
+def user_ids(usernames):
+    """Ids of the users of ``usernames``, looked up ``LOOKUP_BATCH_SIZE`` at a time."""
+    usernames = list(usernames)
+    ids = {}
+    for start in range(0, len(usernames), LOOKUP_BATCH_SIZE):
+        chunk = usernames[start:start + LOOKUP_BATCH_SIZE]
+        ids.update(User.objects.filter(username__in=chunk).values_list('username', 'pk'))
+    return ids
+
+
+def clean_rows(rows):
+    """Return the rows to create and the (row number, reason) of the others.
+
+    Rows need a username and an email, neither used by another row of the
+    import nor by an existing user.
+    """
+    accepted = []
+    skipped = []
+    usernames = set()
+    emails = set()
+    max_lengths = dict(
+        (field, User._meta.get_field(field).max_length) for field in ('username', 'email') + OPTIONAL_FIELDS)
+
+    for number, row in enumerate(rows, 1):
+        username = (row.get('username') or '').strip()
+        email = (row.get('email') or '').strip()
+
+        if not username or not email:
+            skipped.append((number, 'missing username or email'))
+        elif any(len((row.get(field) or '').strip()) > length for field, length in max_lengths.items()):
+            skipped.append((number, 'value too long'))
+        elif username in usernames or email in emails:
+            skipped.append((number, 'duplicate in the import'))
+        else:
+            usernames.add(username)
+            emails.add(email)
+            accepted.append((number, dict(row, username=username, email=email)))
+
+    taken_usernames = existing_values('username', usernames)
+    taken_emails = existing_values('email', emails)
+
+    rows = []
+    for number, row in accepted:
+        if row['username'] in taken_usernames:
+            skipped.append((number, 'username already used'))
+        elif row['email'] in taken_emails:
+            skipped.append((number, 'email already used'))
+        else:
+            rows.append(row)
+
+    skipped.sort()
+    return rows, skipped
+
+
+def insert_users(rows, hashed_passwords):
+    """Insert a batch of users with their profiles and API keys; return how many were created."""
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            password=password,
+            **dict((field, (row.get(field) or '').strip()) for field in OPTIONAL_FIELDS))
+        for row, password in zip(rows, hashed_passwords)]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        # bulk_create does not set the primary keys on every backend.
+        ids = user_ids(user.username for user in users)
+        Profile.objects.bulk_create([Profile(user_id=ids[user.username]) for user in users])
+        ApiKey.objects.bulk_create([
+            ApiKey(user_id=ids[user.username], key=ApiKey().generate_key()) for user in users])
+
+    return len(users)
+
+
+def provision_users(rows, workers=None, batch_size=BATCH_SIZE):
+    """Create the users of ``rows``, dictionaries with username, email, password and OPTIONAL_FIELDS.
+
+    Rows without a password get an unusable one. Returns a ProvisioningResult.
+    """
+    started = perf_counter()
+    workers = workers or os.cpu_count() or 1
+    rows, skipped = clean_rows(rows)
+    created = 0
+    hashing_seconds = insert_seconds = 0.0
+
+    # Processes are only worth starting for more than a few passwords.
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(rows) > workers else None
+    # A few chunks per process, so that a slow one does not hold the batch.
+    chunksize = max(1, batch_size // (workers * 4))
+    try:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+
+            hashing_started = perf_counter()
+            hashed = hash_passwords([row.get('password') or '' for row in batch], executor, chunksize)
+            hashing_seconds += perf_counter() - hashing_started
+
+            insert_started = perf_counter()
+            created += insert_users(batch, hashed)
+            insert_seconds += perf_counter() - insert_started
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if created:
+        bump_model_generation(User)
+
+    return ProvisioningResult(created, skipped, perf_counter() - started, hashing_seconds, insert_seconds)
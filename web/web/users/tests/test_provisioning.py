@@ -0,0 +1,84 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils.six import StringIO
+from tastypie.models import ApiKey
+from test_plus.test import TestCase
+
+from ..models import Profile, User
+from ..provisioning import provision_users
+
+
+class TestProvisioning(TestCase):
+
+    def setUp(self):
+        self.existing = self.make_user('taken')
+
+    def test_creates_users_profiles_and_keys(self):
+        result = provision_users([
+            {'username': 'ann', 'email': 'ann@example.com', 'password': 'abc@1234', 'first_name': 'Ann'},
+            {'username': 'bob', 'email': 'bob@example.com', 'password': ''},
+        ], workers=1)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(result.skipped, [])
+
+        ann = User.objects.get(username='ann')
+        self.assertTrue(ann.check_password('abc@1234'))
+        self.assertEqual(ann.first_name, 'Ann')
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertEqual(Profile.objects.filter(user__username__in=['ann', 'bob']).count(), 2)
+        self.assertEqual(ApiKey.objects.filter(user__username__in=['ann', 'bob']).exclude(key='').count(), 2)
+
+    def test_skipped_rows(self):
+        result = provision_users([
+            {'username': 'taken', 'email': 'new@example.com'},
+            {'username': 'fresh', 'email': self.existing.email},
+            {'username': 'ann', 'email': 'ann@example.com'},
+            {'username': 'ann', 'email': 'other@example.com'},
+            {'username': '', 'email': 'nobody@example.com'},
+        ], workers=1)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, reason in result.skipped], [1, 2, 4, 5])
+
+    def test_bulk_queries(self):
+        rows = [{'username': 'user%d' % i, 'email': 'user%d@example.com' % i} for i in range(50)]
+        # Two uniqueness checks, then per batch: users, their ids, profiles and keys, in a savepoint here.
+        with self.assertNumQueries(2 + 2 * (4 + 2)):
+            provision_users(rows, workers=1, batch_size=25)
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 50)
+
+    @mock.patch('web.users.provisioning.LOOKUP_BATCH_SIZE', 10)
+    def test_lookups_in_chunks(self):
+        rows = [{'username': 'user%d' % i, 'email': 'user%d@example.com' % i} for i in range(25)]
+        # Three queries per uniqueness check, then users, their ids in three queries, profiles and keys.
+        with self.assertNumQueries(2 * 3 + (3 + 3) + 2):
+            provision_users(rows, workers=1, batch_size=25)
+        self.assertEqual(User.objects.filter(username__startswith='user').count(), 25)
+
+    def test_hashing_processes(self):
+        rows = [
+            {'username': 'user%d' % i, 'email': 'user%d@example.com' % i, 'password': 'abc@123%d' % i}
+            for i in range(5)]
+        result = provision_users(rows, workers=2)
+
+        self.assertEqual(result.created, 5)
+        for i in range(5):
+            self.assertTrue(User.objects.get(username='user%d' % i).check_password('abc@123%d' % i))
+
+    def test_command(self):
+        out = StringIO()
+        path = self.get_export()
+        call_command('provision_users', path, workers=1, stdout=out)
+        self.assertIn('Created 1 users', out.getvalue())
+        self.assertTrue(User.objects.filter(username='carol').exists())
+
+    def get_export(self):
+        export = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.addCleanup(os.remove, export.name)
+        with export:
+            export.write('username,email,password\ncarol,carol@example.com,abc@1234\n')
+        return export.name